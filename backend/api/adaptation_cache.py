@@ -0,0 +1,86 @@
+import copy
+import datetime
+import hashlib
+import json
+import threading
+import unicodedata
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .cache_service import TTLCache
+from .models import AdaptationCache
+
+# Nivel 1: memoria del proceso (LRU). Nivel 2: tabla AdaptationCache (con TTL).
+_memoria = TTLCache(maxsize=settings.ADAPTATION_CACHE_MAXSIZE, ttl=settings.ADAPTATION_CACHE_TTL)
+_metricas = {"hits_memoria": 0, "hits_bd": 0, "misses": 0}
+_metricas_lock = threading.Lock()
+
+
+def _normalizar(texto):
+    # Mismo texto con distintos espacios o composición Unicode => misma clave
+    texto = unicodedata.normalize('NFC', texto or '')
+    return " ".join(texto.split())
+
+
+def clave_adaptacion(titulo, contenido, prompt_version, modelo):
+    """
+    Hash estable de la entrada de una adaptación.
+    """
+    material = json.dumps(
+        [prompt_version, modelo, _normalizar(titulo), _normalizar(contenido)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _contar(metrica):
+    with _metricas_lock:
+        _metricas[metrica] += 1
+
+
+def obtener(clave):
+    """
+    Devuelve una copia de la adaptación cacheada o None.
+    """
+    resultado = _memoria.get(clave)
+    if resultado is not None:
+        _contar("hits_memoria")
+        return copy.deepcopy(resultado)
+
+    limite = timezone.now() - datetime.timedelta(seconds=settings.ADAPTATION_CACHE_TTL)
+    fila = AdaptationCache.objects.filter(clave=clave).only('resultado', 'created_at').first()
+    if fila is not None and fila.created_at >= limite:
+        AdaptationCache.objects.filter(clave=clave).update(hits=F('hits') + 1)
+        _memoria.set(clave, fila.resultado)
+        _contar("hits_bd")
+        return copy.deepcopy(fila.resultado)
+
+    if fila is not None:
+        # Expirada: la borramos para que se regenere
+        fila.delete()
+
+    _contar("misses")
+    return None
+
+
+def guardar(clave, resultado):
+    """
+    Guarda una adaptación correcta en ambos niveles de la caché.
+    """
+    _memoria.set(clave, copy.deepcopy(resultado))
+    AdaptationCache.objects.update_or_create(
+        clave=clave,
+        defaults={'resultado': resultado, 'created_at': timezone.now()}
+    )
+
+
+def metricas():
+    with _metricas_lock:
+        datos = dict(_metricas)
+    total = datos["hits_memoria"] + datos["hits_bd"] + datos["misses"]
+    datos["hit_rate"] = round((datos["hits_memoria"] + datos["hits_bd"]) / total, 3) if total else 0.0
+    datos["memoria"] = _memoria.stats()
+    datos["entradas_bd"] = AdaptationCache.objects.count()
+    return datos
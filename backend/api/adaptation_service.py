@@ -0,0 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.db import connection, transaction
+
+from .models import Post, Publication
+from .llm_service import adaptar_lote_con_gemini
+from .image_prefetch import url_preferida
+from . import search_service, stats_service
+
+
+def formatear_adaptacion(pub, datos):
+    """
+    Formato de una adaptación en las respuestas de la API.
+    """
+    return {
+        "id": pub.id,
+        "texto": pub.contenido_adaptado,
+        "hashtags": pub.hashtags,
+        "image_prompt": datos.get('suggested_image_prompt'),
+        "generated_image_url": datos.get('generated_image_url'),
+        "generated_video_url": datos.get('generated_video_url'),
+        "video_hook": datos.get('video_hook')
+    }
+
+
+def _nuevas_publicaciones(post, adaptaciones_json):
+    return [
+        Publication(
+            post=post,
+            plataforma=plataforma,
+            contenido_adaptado=datos.get('text', ''),
+            hashtags=datos.get('hashtags', []),
+            estado='draft'
+        )
+        for plataforma, datos in adaptaciones_json.items()
+    ]
+
+
+def crear_borradores(post, adaptaciones_json):
+    """
+    Guarda las adaptaciones de un Post como Borradores (Drafts) con un solo INSERT.
+    Devuelve el dict {plataforma: adaptación formateada}.
+    """
+    pubs = Publication.objects.bulk_create(_nuevas_publicaciones(post, adaptaciones_json))
+    # bulk_create no emite señales
+    search_service.indexar_posts([post.id])
+    stats_service.registrar_creadas(pubs)
+    return {pub.plataforma: formatear_adaptacion(pub, adaptaciones_json[pub.plataforma]) for pub in pubs}
+
+
+def _media_url(plataforma, datos):
+    # TikTok guarda el video; la imagen vertical es solo portada/backup
+    campo = 'generated_video_url' if plataforma == 'tiktok' else 'generated_image_url'
+    return url_preferida(datos[campo]) if datos.get(campo) else None
+
+
+def guardar_adaptacion(titulo, contenido, adaptaciones_json):
+    """
+    Guarda en una transacción el Post y sus Borradores cuando termina una adaptación
+    en streaming, ya con la media resuelta.
+    Devuelve (post, {plataforma: adaptación formateada}).
+    """
+    with transaction.atomic():
+        post = Post.objects.create(titulo=titulo, contenido_original=contenido)
+        nuevas = _nuevas_publicaciones(post, adaptaciones_json)
+        for pub in nuevas:
+            pub.media_url = _media_url(pub.plataforma, adaptaciones_json[pub.plataforma])
+        pubs = Publication.objects.bulk_create(nuevas)
+        # bulk_create no emite señales
+        search_service.indexar_posts([post.id])
+        stats_service.registrar_creadas(pubs)
+    return post, {pub.plataforma: formatear_adaptacion(pub, adaptaciones_json[pub.plataforma]) for pub in pubs}
+
+
+def persistir_lote(items):
+    """
+    Guarda en una transacción los Posts y Borradores de varios elementos adaptados.
+    `items` es una lista de (indice, post_data, adaptaciones_json).
+    Devuelve [(indice, post, {plataforma: adaptación formateada})].
+    """
+    with transaction.atomic():
+        posts = Post.objects.bulk_create([
+            Post(titulo=post_data['titulo'], contenido_original=post_data['contenido'])
+            for _, post_data, _ in items
+        ])
+
+        nuevas = []
+        for post, (_, _, adaptaciones_json) in zip(posts, items):
+            nuevas.extend(_nuevas_publicaciones(post, adaptaciones_json))
+        pubs = Publication.objects.bulk_create(nuevas)
+        # bulk_create no emite señales
+        search_service.indexar_posts([post.id for post in posts])
+        stats_service.registrar_creadas(pubs)
+
+    por_post = {}
+    for pub in pubs:
+        por_post.setdefault(pub.post_id, []).append(pub)
+
+    guardados = []
+    for post, (indice, _, adaptaciones_json) in zip(posts, items):
+        adaptaciones = {
+            pub.plataforma: formatear_adaptacion(pub, adaptaciones_json[pub.plataforma])
+            for pub in por_post.get(post.id, [])
+        }
+        guardados.append((indice, post, adaptaciones))
+    return guardados
+
+
+def _adaptar_grupo(grupo):
+    """
+    Adapta un grupo de (indice, post_data) en un hilo del pool.
+    """
+    try:
+        return adaptar_lote_con_gemini([post_data for _, post_data in grupo])
+    finally:
+        connection.close()
+
+
+def adaptar_y_guardar_lote(posts, posts_por_prompt=1, concurrencia=4):
+    """
+    Generador: adapta `posts` con concurrencia acotada (agrupando `posts_por_prompt`
+    contenidos por llamada a Gemini) y, a medida que termina cada grupo, guarda sus
+    Posts/Borradores con bulk_create y produce un resultado por elemento.
+    """
+    grupos = [
+        list(enumerate(posts))[inicio:inicio + posts_por_prompt]
+        for inicio in range(0, len(posts), posts_por_prompt)
+    ]
+
+    with ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix='adaptar-lote') as executor:
+        futuros = {executor.submit(_adaptar_grupo, grupo): grupo for grupo in grupos}
+
+        for futuro in as_completed(futuros):
+            grupo = futuros[futuro]
+            try:
+                resultados = futuro.result()
+            except Exception as e:
+                resultados = [{"error": f"Error al procesar la solicitud: {e}"}] * len(grupo)
+
+            correctos = []
+            for (indice, post_data), adaptaciones_json in zip(grupo, resultados):
+                if not adaptaciones_json or "error" in adaptaciones_json:
+                    yield {"index": indice, "status": "error", "error": (adaptaciones_json or {}).get("error", "Sin respuesta")}
+                else:
+                    correctos.append((indice, post_data, adaptaciones_json))
+
+            if not correctos:
+                continue
+
+            try:
+                guardados = persistir_lote(correctos)
+            except Exception as e:
+                for indice, _, _ in correctos:
+                    yield {"index": indice, "status": "error", "error": f"Error guardando en BD: {e}"}
+                continue
+
+            for indice, post, adaptaciones in guardados:
+                yield {"index": indice, "status": "ok", "post_id": post.id, "adaptaciones": adaptaciones}
@@ -0,0 +1,58 @@
+import threading
+import time
+
+import cachetools
+
+
+class TTLCache:
+    """
+    Caché en memoria del proceso, thread-safe, con expiración (TTL) y desalojo LRU.
+    Envuelve cachetools (que no es thread-safe) con un lock y lleva contadores de
+    aciertos/fallos para exponer métricas.
+
+    Se usa TLRUCache y no cachetools.TTLCache porque algunas entradas llevan su propio
+    TTL (ej. las búsquedas de Pexels sin resultados caducan antes).
+    """
+    def __init__(self, maxsize=256, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Cada valor se guarda como (ttl, valor); ttu calcula su expiración
+        self._datos = cachetools.TLRUCache(
+            maxsize=maxsize, ttu=lambda clave, entrada, ahora: ahora + entrada[0], timer=time.monotonic
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, clave, default=None):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entrada[1]
+
+    def set(self, clave, valor, ttl=None):
+        with self._lock:
+            self._datos[clave] = (self.ttl if ttl is None else ttl, valor)
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def stats(self):
+        with self._lock:
+            self._datos.expire()
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,42 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def calcular_etag(*partes):
+    """
+    ETag a partir de los valores que cambian con el recurso (max(updated_at), conteos,
+    parámetros de la consulta...), sin serializar la respuesta.
+    """
+    texto = "|".join('' if parte is None else str(parte) for parte in partes)
+    return quote_etag(hashlib.sha256(texto.encode('utf-8')).hexdigest()[:32])
+
+
+class ConditionalGetMixin:
+    """
+    GET condicional para vistas de DRF: `validadores()` devuelve (etag, last_modified)
+    con una consulta agregada pequeña. Si el cliente ya tiene esa versión
+    (If-None-Match / If-Modified-Since) se responde 304 sin ejecutar la vista.
+
+    `validadores()` devuelve (None, None) si el recurso no existe: la vista sigue y da el 404.
+    """
+    def validadores(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.validadores()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        respuesta = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if respuesta is None:
+            respuesta = super().get(request, *args, **kwargs)
+        if respuesta.status_code in (200, 304):
+            if etag:
+                respuesta['ETag'] = etag
+            if timestamp is not None:
+                respuesta['Last-Modified'] = http_date(timestamp)
+
+        # El navegador guarda la copia pero revalida siempre (un 304 no trae cuerpo)
+        patch_cache_control(respuesta, private=True, no_cache=True)
+        return respuesta
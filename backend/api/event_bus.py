@@ -0,0 +1,192 @@
+import asyncio
+import datetime
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import BusEvent
+
+# Bus de eventos de estado de las Publicaciones (queued -> publishing -> published/failed/manual).
+# Publican los hilos síncronos (vistas, workers); consumen las vistas SSE asíncronas, cada
+# una con su propia cola asyncio. El backend se elige con EVENT_BUS_BACKEND.
+
+ESTADOS_NOTIFICADOS = ('queued', 'publishing', 'published', 'failed', 'manual')
+
+
+class Suscripcion:
+    """
+    Cola de eventos de un suscriptor. Se crea dentro del event loop que la consume;
+    los eventos llegan desde cualquier hilo con call_soon_threadsafe.
+    """
+    def __init__(self, bus, filtro=None):
+        self._bus = bus
+        self._filtro = filtro
+        self._loop = asyncio.get_running_loop()
+        self._cola = asyncio.Queue(maxsize=settings.EVENT_BUS_QUEUE_SIZE)
+
+    def entregar(self, evento):
+        if self._filtro and not self._filtro(evento):
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._encolar, evento)
+        except RuntimeError:
+            self.cerrar()  # El event loop ya terminó
+
+    def _encolar(self, evento):
+        try:
+            self._cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            pass  # Cliente demasiado lento: pierde el evento (puede resincronizar con /api/sync/)
+
+    async def siguiente(self, timeout):
+        """
+        Próximo evento, o TimeoutError si no llega ninguno en `timeout` segundos.
+        """
+        return await asyncio.wait_for(self._cola.get(), timeout)
+
+    def cerrar(self):
+        self._bus.cancelar(self)
+
+
+class BusEnMemoria:
+    """
+    Pub/sub dentro del proceso: solo ven los eventos los suscriptores del mismo proceso.
+    """
+    def __init__(self):
+        self._suscriptores = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def publicar(self, evento):
+        self._repartir({**evento, 'id': next(self._ids)})
+
+    def _repartir(self, evento):
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for suscripcion in suscriptores:
+            suscripcion.entregar(evento)
+
+    def suscribir(self, filtro=None):
+        suscripcion = Suscripcion(self, filtro)
+        with self._lock:
+            self._suscriptores.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            self._suscriptores.discard(suscripcion)
+
+    def historial(self, desde_id):
+        """
+        Eventos posteriores a `desde_id` (cabecera Last-Event-ID). En memoria no se guardan.
+        """
+        return []
+
+
+class BusEnBaseDeDatos(BusEnMemoria):
+    """
+    Broker local sobre la tabla BusEvent: cualquier proceso publica con un INSERT y un
+    hilo por proceso (solo mientras haya suscriptores) lee los eventos nuevos y los
+    reparte en memoria. Permite Last-Event-ID mientras los eventos no se purguen.
+    """
+    def __init__(self):
+        super().__init__()
+        self._lector = None
+
+    def publicar(self, evento):
+        registro = BusEvent.objects.create(datos=evento)
+        if registro.id % 100 == 0:
+            limite = timezone.now() - datetime.timedelta(seconds=settings.EVENT_BUS_RETENTION)
+            BusEvent.objects.filter(created_at__lt=limite).delete()
+
+    def suscribir(self, filtro=None):
+        suscripcion = super().suscribir(filtro)
+        with self._lock:
+            if self._lector is None or not self._lector.is_alive():
+                self._lector = threading.Thread(target=self._leer, name='event-bus', daemon=True)
+                self._lector.start()
+        return suscripcion
+
+    def _leer(self):
+        # Los ids no llegan en orden de commit (en Postgres un id menor puede confirmarse
+        # después), así que no basta con leer id > último: cada sondeo vuelve a leer los
+        # últimos EVENT_BUS_POLL_OVERLAP segundos por created_at y descarta los ya vistos.
+        solapamiento = datetime.timedelta(seconds=settings.EVENT_BUS_POLL_OVERLAP)
+        try:
+            desde = timezone.now()
+            # Lo que ya estaba en la tabla al arrancar no es nuevo para nadie
+            vistos = dict(
+                BusEvent.objects.filter(created_at__gte=desde - solapamiento).values_list('id', 'created_at')
+            )
+            while True:
+                with self._lock:
+                    if not self._suscriptores:
+                        self._lector = None
+                        return
+                ahora = timezone.now()
+                recientes = BusEvent.objects.filter(created_at__gte=desde - solapamiento).order_by('created_at', 'id')
+                for registro in recientes:
+                    if registro.id in vistos:
+                        continue
+                    vistos[registro.id] = registro.created_at
+                    self._repartir({**registro.datos, 'id': registro.id})
+                desde = ahora
+                vistos = {id_: creado for id_, creado in vistos.items() if creado >= ahora - 2 * solapamiento}
+                time.sleep(settings.EVENT_BUS_POLL_INTERVAL)
+        except Exception as e:
+            print(f"⚠️ Error leyendo el bus de eventos: {e}")
+            with self._lock:
+                self._lector = None
+        finally:
+            connection.close()
+
+    def historial(self, desde_id):
+        return [
+            {**registro.datos, 'id': registro.id}
+            for registro in BusEvent.objects.filter(id__gt=desde_id).order_by('id')[:500]
+        ]
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def bus():
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = import_string(settings.EVENT_BUS_BACKEND)()
+    return _bus
+
+
+def publicar_transicion(pub, anterior, nuevo):
+    """
+    Publica el cambio de estado de una Publicación cuando se confirma la transacción
+    (los suscriptores no deben ver estados que luego se deshacen).
+    """
+    if nuevo not in ESTADOS_NOTIFICADOS:
+        return
+    evento = {
+        'publication_id': pub.id,
+        'post_id': pub.post_id,
+        'plataforma': pub.plataforma,
+        'estado': nuevo,
+        'anterior': anterior or None,
+        'api_id': pub.api_id if nuevo == 'published' else None,
+        'published_url': pub.published_url if nuevo == 'published' else None,
+        'error': pub.last_error if nuevo == 'failed' else None,
+        'fecha': timezone.now().isoformat(),
+    }
+
+    def enviar():
+        try:
+            bus().publicar(evento)
+        except Exception as e:
+            print(f"⚠️ No se pudo publicar el evento de {pub.plataforma} #{pub.id}: {e}")
+
+    transaction.on_commit(enviar)
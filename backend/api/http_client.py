@@ -0,0 +1,141 @@
+import http.cookiejar
+import socket
+import threading
+import urllib.parse
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from django.conf import settings
+
+# Timeouts por defecto (conexión, lectura) en segundos para cada cliente.
+# Se pueden sobreescribir en cada llamada pasando timeout=...
+TIMEOUTS_POR_PLATAFORMA = {
+    'facebook': (5, 60),
+    'instagram': (5, 30),
+    'linkedin': (5, 20),
+    'whatsapp': (5, 15),
+    'tiktok': (5, 30),
+    'tiktok_upload': (10, 300),  # Subida de binarios de video
+    'pexels': (5, 10),
+    'media': (5, 120),           # Descarga de imágenes/videos de terceros
+}
+TIMEOUT_POR_DEFECTO = (5, 30)
+
+# TCP keep-alive para que las conexiones ociosas del pool no las corte un NAT/proxy
+_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = _SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+# Registro de sesiones por host (LRU acotado). Una sesión = un pool de conexiones reutilizables.
+_sesiones = OrderedDict()
+_sesiones_lock = threading.Lock()
+
+
+def _crear_sesion():
+    sesion = requests.Session()
+    # La sesión la comparten todos los hilos y plataformas del host: sin cookies
+    # persistentes, cada petición solo lleva las que se le pasen explícitamente
+    sesion.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    # Los reintentos los maneja retry_service, no urllib3
+    adapter = _KeepAliveAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+        max_retries=0,
+    )
+    sesion.mount('https://', adapter)
+    sesion.mount('http://', adapter)
+    return sesion
+
+
+def sesion_para_host(host):
+    """
+    Devuelve la sesión compartida para un host, creándola si no existe.
+    Si hay más de HTTP_MAX_HOSTS sesiones se olvida la menos usada (sin cerrarla: otro
+    hilo puede estar usándola; sus conexiones se cierran cuando se libera).
+    """
+    with _sesiones_lock:
+        sesion = _sesiones.get(host)
+        if sesion is not None:
+            _sesiones.move_to_end(host)
+            return sesion
+
+        sesion = _crear_sesion()
+        _sesiones[host] = sesion
+        while len(_sesiones) > settings.HTTP_MAX_HOSTS:
+            _sesiones.popitem(last=False)
+        return sesion
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP de una plataforma: aplica su timeout por defecto y usa la
+    sesión compartida del host de cada URL (conexiones keep-alive reutilizadas).
+    Expone la misma interfaz que `requests` (get, post, put, head).
+    """
+    def __init__(self, plataforma):
+        self.plataforma = plataforma
+        self.timeout = TIMEOUTS_POR_PLATAFORMA.get(plataforma, TIMEOUT_POR_DEFECTO)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        host = urllib.parse.urlparse(url).netloc
+        return sesion_para_host(host).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+
+_clientes = {}
+
+
+def cliente(plataforma):
+    """
+    Devuelve el ClienteHTTP (cacheado) de una plataforma.
+    """
+    cliente_http = _clientes.get(plataforma)
+    if cliente_http is None:
+        cliente_http = _clientes.setdefault(plataforma, ClienteHTTP(plataforma))
+    return cliente_http
+
+
+def pool_stats():
+    """
+    Estadísticas de los pools de conexiones por host:
+    conexiones creadas, peticiones servidas y conexiones ociosas disponibles.
+    """
+    with _sesiones_lock:
+        sesiones = list(_sesiones.items())
+
+    stats = {}
+    for host, sesion in sesiones:
+        adapter = sesion.get_adapter('https://')
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "host": host,
+                "conexiones_creadas": pool.num_connections,
+                "peticiones": pool.num_requests,
+                # La cola del pool se rellena con None; solo cuentan las conexiones reales
+                "conexiones_ociosas": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+                "max_conexiones": pool.pool.maxsize if pool.pool else 0,
+            }
+    return stats
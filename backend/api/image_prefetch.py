@@ -0,0 +1,144 @@
+import hashlib
+import mimetypes
+import tempfile
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection
+from django.utils import timezone
+
+from .http_client import cliente
+from .models import PrefetchedImage, Publication
+
+# Descarga en segundo plano las imágenes de Pollinations justo después de generarlas,
+# para que publicar no tenga que esperar a que Pollinations las renderice.
+_executor = ThreadPoolExecutor(max_workers=settings.IMAGE_PREFETCH_MAX_WORKERS, thread_name_prefix='prefetch-img')
+_en_curso = set()
+_en_curso_lock = threading.Lock()
+
+
+def _clave(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def es_url_pollinations(url):
+    return bool(url) and urllib.parse.urlparse(url).hostname == 'image.pollinations.ai'
+
+
+def programar_prefetch(url):
+    """
+    Encola la descarga de `url` a nuestro storage (si no está ya descargada o en curso).
+    """
+    if not settings.IMAGE_PREFETCH_ENABLED or not es_url_pollinations(url):
+        return
+    with _en_curso_lock:
+        if url in _en_curso:
+            return
+        _en_curso.add(url)
+    _executor.submit(_prefetch, url)
+
+
+def _prefetch(url):
+    try:
+        if PrefetchedImage.objects.filter(clave=_clave(url)).exists():
+            return
+        print(f"📥 Prefetch de imagen: {url}")
+        archivo = _descargar(url)
+        try:
+            PrefetchedImage.objects.create(clave=_clave(url), source_url=url, archivo=archivo)
+        except IntegrityError:
+            return  # Otro proceso la descargó a la vez
+
+        # Las Publicaciones que ya apuntaban a Pollinations pasan a la copia local. Se guarda
+        # la referencia del storage (ej. /media/generated_images/x.jpg) y url_para_publicar
+        # la convierte en URL absoluta al publicar
+        Publication.objects.filter(media_url=url).update(
+            media_url=default_storage.url(archivo), updated_at=timezone.now()
+        )
+    except Exception as e:
+        print(f"⚠️ Error en el prefetch de {url}: {e}")
+    finally:
+        with _en_curso_lock:
+            _en_curso.discard(url)
+        connection.close()
+
+
+def _descargar(url):
+    """
+    Descarga la imagen en streaming a un temporal y la guarda en el storage.
+    Devuelve el nombre guardado.
+    """
+    respuesta = cliente('media').get(url, stream=True)
+    try:
+        tipo = respuesta.headers.get('Content-Type', '').split(';')[0]
+        if respuesta.status_code != 200 or not tipo.startswith('image/'):
+            raise IOError(f"HTTP {respuesta.status_code} ({tipo or 'sin Content-Type'})")
+
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as tmp:
+            for chunk in respuesta.iter_content(chunk_size=64 * 1024):
+                tmp.write(chunk)
+            tmp.seek(0)
+            extension = mimetypes.guess_extension(tipo) or '.jpg'
+            return default_storage.save(f"generated_images/{_clave(url)[:16]}{extension}", File(tmp))
+    finally:
+        respuesta.close()
+
+
+def archivo_local(url):
+    """
+    Nombre en el storage de la copia local de `url`, o None si aún no se descargó.
+    """
+    if not es_url_pollinations(url):
+        return None
+    return PrefetchedImage.objects.filter(clave=_clave(url)).values_list('archivo', flat=True).first()
+
+
+def url_absoluta(archivo):
+    """
+    URL pública de un archivo del storage si conocemos nuestro dominio (PUBLIC_BASE_URL).
+    """
+    if not settings.PUBLIC_BASE_URL:
+        return None
+    return settings.PUBLIC_BASE_URL.rstrip('/') + default_storage.url(archivo)
+
+
+def _archivo_referenciado(url):
+    """
+    Nombre en el storage de una referencia local relativa (ej. /media/generated_images/x.jpg),
+    o None si `url` es absoluta o no está bajo MEDIA_URL.
+    """
+    partes = urllib.parse.urlparse(url or '')
+    if partes.netloc or not partes.path.startswith(settings.MEDIA_URL):
+        return None
+    return urllib.parse.unquote(partes.path[len(settings.MEDIA_URL):])
+
+
+def url_preferida(url):
+    """
+    Valor a guardar en Publication.media_url: la referencia a la copia local si ya existe.
+    """
+    archivo = archivo_local(url)
+    return default_storage.url(archivo) if archivo else url
+
+
+def url_para_publicar(url, plataforma):
+    """
+    Resuelve la URL de la imagen al publicar. Las de Pollinations ya descargadas y las
+    referencias locales de media_url se convierten en URL absoluta con PUBLIC_BASE_URL.
+    Sin ella, Facebook/TikTok leen la copia de disco (media_service) e Instagram, que
+    necesita una URL pública, recibe la de Pollinations (ya renderizada por el prefetch).
+    """
+    archivo = archivo_local(url) if es_url_pollinations(url) else _archivo_referenciado(url)
+    if not archivo:
+        return url
+    absoluta = url_absoluta(archivo)
+    if absoluta:
+        return absoluta
+    if plataforma == 'instagram':
+        origen = PrefetchedImage.objects.filter(archivo=archivo).values_list('source_url', flat=True).first()
+        return origen or url
+    return default_storage.url(archivo)
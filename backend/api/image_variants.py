@@ -0,0 +1,142 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError
+
+from .media_service import resolver_media_local
+from .models import ImageVariant, MediaBlob
+from . import image_prefetch
+
+# Variantes por plataforma: (ancho, alto, modo). 'recortar' rellena el tamaño exacto
+# recortando al centro; 'encajar' reduce sin recortar (miniaturas del dashboard).
+ESPECIFICACIONES = {
+    'instagram': (1080, 1080, 'recortar'),
+    'facebook': (1200, 630, 'recortar'),
+    'tiktok': (1080, 1920, 'recortar'),   # Portada vertical 9:16
+    'thumb': (320, 320, 'encajar'),
+}
+CALIDAD_JPEG = 85
+# Plataformas que publican imágenes (TikTok publica video; su variante es solo portada)
+VARIANTES_PUBLICACION = ('instagram', 'facebook')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def generar_variante(ruta_origen, spec):
+    """
+    Trabajo de CPU (se ejecuta en el pool de procesos): devuelve (bytes JPEG, ancho, alto).
+    """
+    ancho, alto, modo = ESPECIFICACIONES[spec]
+    with Image.open(ruta_origen) as imagen:
+        # draft: los JPEG se decodifican ya reducidos (1/2, 1/4, 1/8) si sobra resolución
+        imagen.draft('RGB', (ancho, alto))
+        imagen = ImageOps.exif_transpose(imagen).convert('RGB')
+        if modo == 'recortar':
+            imagen = ImageOps.fit(imagen, (ancho, alto), Image.LANCZOS)
+        else:
+            imagen.thumbnail((ancho, alto), Image.LANCZOS)
+
+        salida = BytesIO()
+        imagen.save(salida, 'JPEG', quality=CALIDAD_JPEG, optimize=True, progressive=True)
+        return salida.getvalue(), imagen.width, imagen.height
+
+
+def _ejecutar(ruta_origen, spec):
+    """
+    Lanza generar_variante en el pool de procesos (o en el propio hilo si
+    IMAGE_VARIANT_MAX_WORKERS es 0).
+    """
+    global _pool
+    if settings.IMAGE_VARIANT_MAX_WORKERS <= 0:
+        return generar_variante(ruta_origen, spec)
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' y no fork: el proceso web y los workers tienen otros hilos (cola de
+            # publicación, enriquecimiento...) y un fork podría heredar sus locks tomados
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_MAX_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+    return _pool.submit(generar_variante, ruta_origen, spec).result()
+
+
+def _hash_origen(ruta):
+    """
+    SHA-256 del archivo de origen: si está en el storage por contenido ya lo conocemos.
+    """
+    nombre = os.path.relpath(ruta, settings.MEDIA_ROOT).replace(os.sep, '/')
+    blob = MediaBlob.objects.filter(path=nombre).only('sha256').first()
+    if blob is not None:
+        return blob.sha256
+    sha256 = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(bloque)
+    return sha256.hexdigest()
+
+
+def obtener_variante(ruta_origen, spec):
+    """
+    Devuelve el ImageVariant (source_hash, spec) de un archivo local, generándolo si no existe.
+    """
+    if spec not in ESPECIFICACIONES:
+        raise ValueError(f"Variante desconocida: {spec}")
+
+    source_hash = _hash_origen(ruta_origen)
+    variante = ImageVariant.objects.filter(source_hash=source_hash, spec=spec).first()
+    if variante is not None:
+        return variante
+
+    datos, ancho, alto = _ejecutar(ruta_origen, spec)
+    archivo = default_storage.save(f"variants/{spec}/{source_hash[:16]}.jpg", ContentFile(datos))
+    try:
+        return ImageVariant.objects.create(
+            source_hash=source_hash, spec=spec, archivo=archivo,
+            width=ancho, height=alto, size=len(datos)
+        )
+    except IntegrityError:
+        # Otro hilo/proceso la generó a la vez
+        return ImageVariant.objects.get(source_hash=source_hash, spec=spec)
+
+
+def ruta_local(url):
+    """
+    Archivo local de una URL: media propia o copia prefetch de Pollinations.
+    """
+    ruta = resolver_media_local(url)
+    if ruta:
+        return ruta
+    archivo = image_prefetch.archivo_local(url)
+    return default_storage.path(archivo) if archivo else None
+
+
+def url_variante_para_publicar(url, plataforma):
+    """
+    Cambia la imagen por su variante de la plataforma (si la tenemos en local).
+    Instagram necesita una URL pública: sin PUBLIC_BASE_URL se publica la original.
+    """
+    if plataforma not in VARIANTES_PUBLICACION:
+        return url
+    if plataforma == 'instagram' and not settings.PUBLIC_BASE_URL:
+        return url
+    ruta = ruta_local(url)
+    if not ruta:
+        return url
+    try:
+        variante = obtener_variante(ruta, plataforma)
+    except Exception as e:
+        print(f"⚠️ No se pudo generar la variante {plataforma} de {url}: {e}")
+        return url
+
+    return image_prefetch.url_absoluta(variante.archivo) or default_storage.url(variante.archivo)
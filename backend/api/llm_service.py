@@ -2,11 +2,19 @@
 
 import google.generativeai as genai
 import os
-import requests
 import urllib.parse
+import hashlib
+import itertools
 import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from io import BytesIO
 from PIL import Image
+from django.conf import settings
+from django.db import connection
+from .http_client import cliente
+from . import adaptation_cache, pexels_cache, image_prefetch
 # Ya no necesitamos 'asyncio' ni librerías externas de video
 
 # --- Configuración de la API de Gemini (desde .env) ---
@@ -17,54 +25,93 @@ else:
     print("ADVERTENCIA: GEMINI_API_KEY no encontrada en el entorno. La generación de contenido fallará.")
 # --- FIN Configuración ---
 
+# Modelo de texto y versión del prompt: forman parte de la clave de la caché de
+# adaptaciones. Sube PROMPT_VERSION cada vez que cambie crear_prompt().
+GEMINI_TEXT_MODEL = 'models/gemini-flash-latest'
+PROMPT_VERSION = 'v1'
 
-def crear_prompt(titulo, contenido):
-    """
-    Genera el prompt para el modelo de lenguaje de Gemini, solicitando adaptaciones JSON.
-    """
-    return f"""
-    Eres un experto en marketing de redes sociales. Tu tarea es adaptar el siguiente contenido para 5 plataformas.
-    Para Instagram, también debes sugerir un prompt para una IA de generación de imágenes.
-    Para TikTok, también debes sugerir un "gancho" para el video, un prompt para imagen de portada, Y 3 palabras clave (en inglés) para buscar un video de stock de fondo.
 
-    Contenido Original:
-    Título: "{titulo}"
-    Contenido: "{contenido}"
-
-    Debes retornar ÚNICAMENTE un objeto JSON válido, sin ningún texto antes o después. La estructura debe ser la siguiente:
-
-    {{
-      "facebook": {{
+# Estructura JSON que se pide a Gemini para cada contenido
+ESTRUCTURA_ADAPTACIONES = """    {
+      "facebook": {
         "text": "Texto adaptado para Facebook (tono casual/informativo, máximo 500 caracteres).",
         "hashtags": ["#Innovacion", "#Tecnologia"],
         "character_count": 0
-      }},
-      "instagram": {{
+      },
+      "instagram": {
         "text": "Texto adaptado para Instagram (tono visual/casual, máximo 200 caracteres, con emojis).",
         "hashtags": ["#Tech", "#Innovation", "#NewFeature"],
         "character_count": 0,
         "suggested_image_prompt": "Prompt para IA de imagen (ej. 'Modern tech interface, abstract lines, vibrant colors, high detail')"
-      }},
-      "linkedin": {{
+      },
+      "linkedin": {
         "text": "Texto adaptado para LinkedIn (tono profesional, máximo 600 caracteres, con estructura profesional).",
         "hashtags": ["#Technology", "#Innovation", "#Negocios"],
         "character_count": 0,
         "tone": "professional"
-      }},
-      "tiktok": {{
+      },
+      "tiktok": {
         "text": "Texto adaptado para TikTok (tono joven/trending, máximo 150 caracteres, con emojis).",
         "hashtags": ["#Tech", "#Viral", "#NewFeature"],
         "character_count": 0,
         "video_hook": "Frase corta y muy llamativa para el inicio de un video de TikTok (max 15 palabras).",
         "suggested_image_prompt": "Prompt para imagen vertical de portada (ej. 'Neon cyberpunk city vertical, 9:16 ratio, dynamic lighting')",
         "stock_video_keywords": "technology, futuristic, coding"
-      }},
-      "whatsapp": {{
+      },
+      "whatsapp": {
         "text": "Texto adaptado para WhatsApp (tono conversacional/directo, máximo 300 caracteres, con emojis).",
         "character_count": 0,
         "format": "conversational"
-      }}
-    }}
+      }
+    }"""
+
+
+def crear_prompt(titulo, contenido):
+    """
+    Genera el prompt para el modelo de lenguaje de Gemini, solicitando adaptaciones JSON.
+    """
+    return f"""
+    Eres un experto en marketing de redes sociales. Tu tarea es adaptar el siguiente contenido para 5 plataformas.
+    Para Instagram, también debes sugerir un prompt para una IA de generación de imágenes.
+    Para TikTok, también debes sugerir un "gancho" para el video, un prompt para imagen de portada, Y 3 palabras clave (en inglés) para buscar un video de stock de fondo.
+
+    Contenido Original:
+    Título: "{titulo}"
+    Contenido: "{contenido}"
+
+    Debes retornar ÚNICAMENTE un objeto JSON válido, sin ningún texto antes o después. La estructura debe ser la siguiente:
+
+{ESTRUCTURA_ADAPTACIONES}
+
+    Instrucciones Adicionales:
+    - Reemplaza los textos de ejemplo con el contenido real adaptado.
+    - Calcula el 'character_count' real para cada texto.
+    - NO incluyas '```json' ni '```' en la respuesta. Solo el JSON.
+    """
+
+
+def crear_prompt_lote(posts):
+    """
+    Genera un único prompt para adaptar varios contenidos a la vez.
+    `posts` es una lista de dicts con 'titulo' y 'contenido'. Gemini debe devolver
+    un array JSON con un objeto (misma estructura que crear_prompt) por contenido.
+    """
+    contenidos = "\n".join(
+        f'''    [{i}] Título: "{post['titulo']}"
+        Contenido: "{post['contenido']}"'''
+        for i, post in enumerate(posts)
+    )
+    return f"""
+    Eres un experto en marketing de redes sociales. Tu tarea es adaptar CADA UNO de los siguientes {len(posts)} contenidos para 5 plataformas.
+    Para Instagram, también debes sugerir un prompt para una IA de generación de imágenes.
+    Para TikTok, también debes sugerir un "gancho" para el video, un prompt para imagen de portada, Y 3 palabras clave (en inglés) para buscar un video de stock de fondo.
+
+    Contenidos Originales:
+{contenidos}
+
+    Debes retornar ÚNICAMENTE un array JSON válido con {len(posts)} objetos, uno por contenido y en el MISMO orden, sin ningún texto antes o después. Cada objeto debe tener la siguiente estructura:
+
+{ESTRUCTURA_ADAPTACIONES}
 
     Instrucciones Adicionales:
     - Reemplaza los textos de ejemplo con el contenido real adaptado.
@@ -76,20 +123,23 @@ def crear_prompt(titulo, contenido):
 def generar_imagen_con_pollinations(prompt_imagen: str, width: int = 1024, height: int = 1024):
     """
     Genera una URL de imagen usando la API gratuita de Pollinations.ai.
-    Devuelve la URL pública directa de Pollinations.
+    Devuelve la URL pública directa de Pollinations y programa su prefetch.
     """
     print(f"Generando URL de imagen con Pollinations.ai para: {prompt_imagen} ({width}x{height})")
     try:
         # 1. Construir la URL (Pollinations usa GET con el prompt en la URL)
         # Es importante codificar el prompt para URL
         encoded_prompt = urllib.parse.quote(prompt_imagen)
-        # Añadimos seed aleatoria para variedad y nologo para evitar marcas de agua si es posible
+        # Seed determinista (prompt + dimensiones): el mismo prompt reutiliza la misma imagen
+        # y su copia local. nologo para evitar marcas de agua si es posible
         # Usamos una URL absoluta directa con dimensiones
-        image_url = f"https://image.pollinations.ai/prompt/{encoded_prompt}?width={width}&height={height}&nologo=true&seed={os.urandom(2).hex()}"
+        seed = int(hashlib.sha256(f"{prompt_imagen}|{width}|{height}".encode('utf-8')).hexdigest()[:8], 16) % 1_000_000
+        image_url = f"https://image.pollinations.ai/prompt/{encoded_prompt}?width={width}&height={height}&nologo=true&seed={seed}"
         
         print(f"URL de imagen generada: {image_url}")
         
-        # Devolvemos la URL directa. NO descargamos la imagen.
+        # Devolvemos la URL directa; la descarga a nuestro storage se hace en segundo plano
+        image_prefetch.programar_prefetch(image_url)
         return image_url
 
     except Exception as e:
@@ -102,127 +152,442 @@ def generar_audio_con_gemini(texto: str):
 # --- Fin de funciones desactivadas ---
 
 # --- NUEVO: Función para Pexels (Búsqueda de Video) ---
+def _elegir_archivo_video(video):
+    """
+    Elige de 'video_files' el archivo a usar: preferimos HD pero no 4K para que
+    cargue rápido, y formato mp4.
+    """
+    video_files = video.get('video_files', [])
+    for f in video_files:
+        if f.get('quality') == 'hd' and f.get('file_type') == 'video/mp4':
+            return f
+    return video_files[0] if video_files else None  # Fallback al primero
+
+
+def _buscar_videos_en_pexels(api_key, query, cantidad):
+    """
+    Llama a /videos/search y devuelve la lista de archivos elegidos (uno por video).
+    Lanza excepción si la petición falla (los errores NO se cachean).
+    """
+    url = "https://api.pexels.com/videos/search"
+    headers = {
+        "Authorization": api_key
+    }
+    params = {
+        "query": query,
+        "orientation": "portrait", # IMPORTANTE: Vertical para TikTok (9:16)
+        "size": "medium",
+        "per_page": cantidad
+    }
+
+    response = cliente('pexels').get(url, headers=headers, params=params)
+    response.raise_for_status()
+    data = response.json()
+
+    elegidos = []
+    for video in data.get('videos', []):
+        best_file = _elegir_archivo_video(video)
+        if best_file:
+            elegidos.append({
+                "link": best_file['link'],
+                "quality": best_file.get('quality'),
+                "file_type": best_file.get('file_type'),
+                "width": best_file.get('width'),
+                "height": best_file.get('height'),
+            })
+    return elegidos
+
+
 def buscar_video_pexels(keywords: str):
     """
     Busca un video vertical (portrait) en Pexels usando keywords.
     Requiere PEXELS_API_KEY en .env.
+
+    Los resultados se cachean por keywords normalizadas (también "sin resultados").
+    Con PEXELS_ROTATE_TOP_N > 1 se alterna al azar entre los N mejores videos.
     """
     api_key = os.getenv('PEXELS_API_KEY')
     if not api_key:
         print("ADVERTENCIA: PEXELS_API_KEY no encontrada. Saltando búsqueda de video.")
         return None
 
-    print(f"🔍 Buscando video en Pexels para: {keywords}")
-    try:
-        url = "https://api.pexels.com/videos/search"
-        headers = {
-            "Authorization": api_key
-        }
-        params = {
-            "query": keywords,
-            "orientation": "portrait", # IMPORTANTE: Vertical para TikTok (9:16)
-            "size": "medium",
-            "per_page": 1
-        }
-        
-        response = requests.get(url, headers=headers, params=params)
-        data = response.json()
-        
-        if 'videos' in data and len(data['videos']) > 0:
-            video = data['videos'][0]
-            # Buscamos el archivo de video con mejor calidad/tamaño adecuado
-            video_files = video.get('video_files', [])
-            
-            # Preferimos HD pero no 4K para que cargue rápido, y formato mp4
-            best_file = None
-            for f in video_files:
-                if f['quality'] == 'hd' and f['file_type'] == 'video/mp4':
-                    best_file = f
-                    break
-            
-            if not best_file and video_files:
-                best_file = video_files[0] # Fallback al primero
-                
-            if best_file:
-                video_url = best_file['link']
-                print(f"✅ Video encontrado en Pexels: {video_url}")
-                return video_url
-        
-        print("❌ No se encontraron videos relevantes en Pexels.")
+    clave = pexels_cache.normalizar_keywords(keywords)
+    if not clave:
         return None
 
-    except Exception as e:
-        print(f"❌ Error buscando video en Pexels: {e}")
+    videos = pexels_cache.obtener(clave)
+    if videos is None:
+        print(f"🔍 Buscando video en Pexels para: {clave}")
+        try:
+            videos = _buscar_videos_en_pexels(api_key, clave, max(1, settings.PEXELS_ROTATE_TOP_N))
+        except Exception as e:
+            print(f"❌ Error buscando video en Pexels: {e}")
+            return None
+        pexels_cache.guardar(clave, videos)
+    else:
+        print(f"⚡ Pexels (caché) para: {clave}")
+
+    if not videos:
+        print("❌ No se encontraron videos relevantes en Pexels.")
         return None
 
+    top = videos[:max(1, settings.PEXELS_ROTATE_TOP_N)]
+    video_url = random.choice(top)['link']
+    print(f"✅ Video encontrado en Pexels: {video_url}")
+    return video_url
+
+
+# --- PIPELINE DE ENRIQUECIMIENTO (imágenes y videos) ---
+# Cada enriquecedor recibe el JSON de adaptaciones (solo lectura) y devuelve una
+# lista de (plataforma, campo, url). Todos corren en paralelo con su propio timeout:
+# uno lento o fallido no bloquea el texto ni al resto. `plataforma` es el objeto del
+# JSON que necesita: en streaming se lanza en cuanto ese objeto llega.
+ENRIQUECEDORES = []
+_executor_enriquecimiento = ThreadPoolExecutor(
+    max_workers=settings.ENRICHMENT_MAX_WORKERS,
+    thread_name_prefix='enriquecer'
+)
+
+
+def registrar_enriquecedor(nombre, plataforma, timeout=None):
+    """
+    Decorador para añadir un enriquecedor al pipeline.
+    """
+    def decorator(func):
+        ENRIQUECEDORES.append((nombre, plataforma, func, timeout or settings.ENRICHMENT_TIMEOUT))
+        return func
+    return decorator
+
+
+@registrar_enriquecedor('imagen_instagram', 'instagram')
+def _enriquecer_imagen_instagram(respuesta_json):
+    # A) Para Instagram (Cuadrada 1024x1024), compartida con Facebook. En streaming
+    # Facebook puede llegar después: su resultado se aplica solo si la plataforma existe
+    instagram = respuesta_json.get('instagram') or {}
+    if 'suggested_image_prompt' not in instagram:
+        return []
+
+    image_prompt = instagram['suggested_image_prompt']
+    print(f"Prompt de imagen sugerido (IG): {image_prompt}")
+    image_url = generar_imagen_con_pollinations(image_prompt, width=1024, height=1024)
+    if not image_url:
+        return []
+
+    return [('instagram', 'generated_image_url', image_url), ('facebook', 'generated_image_url', image_url)]
+
+
+@registrar_enriquecedor('portada_tiktok', 'tiktok')
+def _enriquecer_portada_tiktok(respuesta_json):
+    # B) Para TikTok: imagen vertical 720x1280 (9:16) como portada / backup
+    tiktok_data = respuesta_json.get('tiktok') or {}
+    if 'suggested_image_prompt' not in tiktok_data:
+        return []
+
+    tiktok_image_url = generar_imagen_con_pollinations(tiktok_data['suggested_image_prompt'], width=720, height=1280)
+    return [('tiktok', 'generated_image_url', tiktok_image_url)] if tiktok_image_url else []
+
+
+@registrar_enriquecedor('video_tiktok', 'tiktok')
+def _enriquecer_video_tiktok(respuesta_json):
+    # C) VIDEO REAL (Pexels - Stock). Usamos las keywords sugeridas o el hook como fallback
+    tiktok_data = respuesta_json.get('tiktok') or {}
+    video_keywords = tiktok_data.get('stock_video_keywords') or tiktok_data.get('video_hook')
+    if not video_keywords:
+        return []
+
+    video_url = buscar_video_pexels(video_keywords)
+    return [('tiktok', 'generated_video_url', video_url)] if video_url else []
+
+
+def _ejecutar_enriquecedor(func, respuesta_json):
+    try:
+        return func(respuesta_json)
+    finally:
+        # Algunos enriquecedores consultan la BD desde el hilo del pool
+        connection.close()
+
+
+class Enriquecimiento:
+    """
+    Enriquecedores en curso. lanzar() los envía al pool (todos o solo los de una
+    plataforma) y resultados() produce (plataforma, campo, url) en el orden en que
+    terminan. Los que fallan o exceden su timeout se registran y se omiten.
+    """
+    def __init__(self):
+        self._pendientes = {}  # futuro -> (nombre, límite)
+
+    def lanzar(self, respuesta_json, plataforma=None):
+        for nombre, origen, func, timeout in ENRIQUECEDORES:
+            if plataforma is None or origen == plataforma:
+                futuro = _executor_enriquecimiento.submit(_ejecutar_enriquecedor, func, respuesta_json)
+                self._pendientes[futuro] = (nombre, time.monotonic() + timeout)
+
+    def resultados(self, esperar=True):
+        """
+        Con esperar=False solo devuelve los ya terminados, sin bloquear.
+        """
+        while self._pendientes:
+            # Esperamos hasta que termine alguno o venza el timeout más próximo
+            proximo_vencimiento = min(limite for _, limite in self._pendientes.values())
+            terminados, _ = wait(
+                self._pendientes,
+                timeout=max(proximo_vencimiento - time.monotonic(), 0) if esperar else 0,
+                return_when=FIRST_COMPLETED
+            )
+
+            for futuro in terminados:
+                nombre, _ = self._pendientes.pop(futuro)
+                try:
+                    for resultado in futuro.result():
+                        yield resultado
+                except Exception as e:
+                    print(f"❌ Enriquecedor '{nombre}' falló: {e}")
+
+            ahora = time.monotonic()
+            for futuro, (nombre, limite) in list(self._pendientes.items()):
+                if limite <= ahora and not futuro.done():
+                    # Sigue corriendo en el pool, pero ya no lo esperamos
+                    print(f"⏱️ Enriquecedor '{nombre}' excedió su timeout, se descarta.")
+                    del self._pendientes[futuro]
+
+            if not esperar:
+                return
+
+
+def iterar_enriquecimiento(respuesta_json):
+    """
+    Generador: lanza todos los ENRIQUECEDORES en paralelo y produce
+    (plataforma, campo, url) en el orden en que terminan. No modifica respuesta_json.
+    """
+    enriquecimiento = Enriquecimiento()
+    enriquecimiento.lanzar(respuesta_json)
+    for plataforma, campo, url in enriquecimiento.resultados():
+        if plataforma in respuesta_json:
+            yield plataforma, campo, url
+
+
+def _aplicar_media(resultados, respuesta_json, en_espera):
+    """
+    Streaming: aplica a respuesta_json los resultados cuya plataforma ya llegó y produce
+    sus eventos 'media'. Los de plataformas que aún no llegaron quedan en `en_espera`.
+    """
+    anteriores = list(en_espera)
+    en_espera.clear()
+    for plataforma, campo, url in itertools.chain(anteriores, resultados):
+        if plataforma in respuesta_json:
+            respuesta_json[plataforma][campo] = url
+            yield 'media', plataforma, (campo, url)
+        else:
+            en_espera.append((plataforma, campo, url))
+
+
+def enriquecer_adaptacion(respuesta_json):
+    """
+    Añade a las adaptaciones de texto las URLs de imagen (Pollinations) y video (Pexels).
+    Modifica y devuelve el mismo dict.
+    """
+    for plataforma, campo, url in iterar_enriquecimiento(respuesta_json):
+        respuesta_json[plataforma][campo] = url
+    return respuesta_json
+
+
+def _generar_json_con_gemini(prompt):
+    """
+    Llama a Gemini con un prompt y devuelve la respuesta parseada como JSON.
+    """
+    text_model = genai.GenerativeModel(GEMINI_TEXT_MODEL)
+    generation_config = genai.types.GenerationConfig(
+        response_mime_type="application/json"
+    )
+    # Llamada síncrona (sin 'await')
+    text_response = text_model.generate_content(prompt, generation_config=generation_config)
+    return json.loads(text_response.text)
+
 
 # Función principal VUELVE A SER SÍNCRONA (sin 'async def')
 def adaptar_contenido_con_gemini(titulo: str, contenido: str):
     """
     Función principal SÍNCRONA que coordina la adaptación de texto.
+    Las adaptaciones correctas se cachean por (título, contenido, prompt, modelo):
+    un reenvío del mismo texto no vuelve a llamar a Gemini.
     """
+    clave = adaptation_cache.clave_adaptacion(titulo, contenido, PROMPT_VERSION, GEMINI_TEXT_MODEL)
+    cacheado = adaptation_cache.obtener(clave)
+    if cacheado is not None:
+        print(f"♻️ Adaptación servida desde caché ({clave[:12]})")
+        return cacheado
+
     if not api_key_from_env:
         return {"error": "API Key de Gemini no configurada."}
 
     try:
         # --- 1. Generar el texto JSON primero (siempre usa el modelo flash para esto) ---
-        text_model = genai.GenerativeModel('models/gemini-flash-latest')
-        
-        prompt = crear_prompt(titulo, contenido)
-        
+        respuesta_json = _generar_json_con_gemini(crear_prompt(titulo, contenido))
+
+        enriquecer_adaptacion(respuesta_json)
+
+        adaptation_cache.guardar(clave, respuesta_json)
+        return respuesta_json
+
+    except Exception as e:
+        print(f"Error en adaptar_contenido_con_gemini: {e}")
+        return {"error": f"Error al procesar la solicitud: {e}"}
+
+
+def adaptar_lote_con_gemini(posts):
+    """
+    Adapta varios contenidos con UNA sola llamada a Gemini (crear_prompt_lote).
+    `posts` es una lista de dicts con 'titulo' y 'contenido'.
+    Devuelve una lista de resultados en el mismo orden (cada uno como en
+    adaptar_contenido_con_gemini, con "error" si falló).
+
+    Los contenidos ya cacheados no se envían. Si Gemini devuelve un array con un
+    número de elementos distinto, se adapta cada contenido por separado.
+    """
+    resultados = [None] * len(posts)
+    pendientes = []
+    for i, post in enumerate(posts):
+        clave = adaptation_cache.clave_adaptacion(post['titulo'], post['contenido'], PROMPT_VERSION, GEMINI_TEXT_MODEL)
+        cacheado = adaptation_cache.obtener(clave)
+        if cacheado is not None:
+            resultados[i] = cacheado
+        else:
+            pendientes.append((i, clave))
+
+    if not pendientes:
+        return resultados
+
+    if len(pendientes) == 1 or not api_key_from_env:
+        for i, _ in pendientes:
+            resultados[i] = adaptar_contenido_con_gemini(posts[i]['titulo'], posts[i]['contenido'])
+        return resultados
+
+    try:
+        respuesta = _generar_json_con_gemini(crear_prompt_lote([posts[i] for i, _ in pendientes]))
+    except Exception as e:
+        print(f"Error en adaptar_lote_con_gemini: {e}")
+        respuesta = None
+
+    if not isinstance(respuesta, list) or len(respuesta) != len(pendientes):
+        print("⚠️ Respuesta de lote inválida, adaptando uno por uno.")
+        for i, _ in pendientes:
+            resultados[i] = adaptar_contenido_con_gemini(posts[i]['titulo'], posts[i]['contenido'])
+        return resultados
+
+    for (i, clave), respuesta_json in zip(pendientes, respuesta):
+        try:
+            enriquecer_adaptacion(respuesta_json)
+            adaptation_cache.guardar(clave, respuesta_json)
+            resultados[i] = respuesta_json
+        except Exception as e:
+            print(f"Error enriqueciendo el elemento {i} del lote: {e}")
+            resultados[i] = {"error": f"Error al procesar la solicitud: {e}"}
+
+    return resultados
+
+
+class ParserObjetosJSON:
+    """
+    Parser incremental para el objeto JSON de adaptaciones que llega por partes.
+    feed() devuelve los pares (clave, valor) de primer nivel cuyo valor (objeto o
+    array) ya está completo, sin esperar a que termine el objeto entero.
+    """
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+
+    def feed(self, texto):
+        self.buffer += texto
+        completos = []
+        while self.pos < len(self.buffer):
+            c = self.buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.value_start is None:
+                        self.key = json.loads(self.buffer[self.key_start:self.pos + 1])
+            elif c == '"':
+                self.in_string = True
+                if self.depth == 1 and self.value_start is None:
+                    self.key_start = self.pos
+            elif c in '{[':
+                if self.depth == 1 and self.key is not None and self.value_start is None:
+                    self.value_start = self.pos
+                self.depth += 1
+            elif c in '}]':
+                self.depth -= 1
+                if self.depth == 1 and self.value_start is not None:
+                    valor = json.loads(self.buffer[self.value_start:self.pos + 1])
+                    completos.append((self.key, valor))
+                    self.key = None
+                    self.value_start = None
+            self.pos += 1
+        return completos
+
+
+def adaptar_contenido_en_streaming(titulo: str, contenido: str):
+    """
+    Versión en streaming de adaptar_contenido_con_gemini. Generador de eventos:
+      ('plataforma', nombre, datos)      en cuanto el objeto de una plataforma está completo
+      ('media', nombre, (campo, url))    a medida que se resuelven imágenes y videos
+      ('fin', None, respuesta_json)      al terminar (el resultado se guarda en la caché)
+      ('error', None, mensaje)
+    """
+    clave = adaptation_cache.clave_adaptacion(titulo, contenido, PROMPT_VERSION, GEMINI_TEXT_MODEL)
+    cacheado = adaptation_cache.obtener(clave)
+    if cacheado is not None:
+        for plataforma, datos in cacheado.items():
+            yield 'plataforma', plataforma, datos
+        # Las URLs de media ya resueltas viajan en el JSON cacheado
+        for plataforma, datos in cacheado.items():
+            for campo in ('generated_image_url', 'generated_video_url'):
+                if isinstance(datos, dict) and datos.get(campo):
+                    yield 'media', plataforma, (campo, datos[campo])
+        yield 'fin', None, cacheado
+        return
+
+    if not api_key_from_env:
+        yield 'error', None, "API Key de Gemini no configurada."
+        return
+
+    try:
+        text_model = genai.GenerativeModel(GEMINI_TEXT_MODEL)
         generation_config = genai.types.GenerationConfig(
             response_mime_type="application/json"
         )
-        
-        # Llamada síncrona (sin 'await')
-        text_response = text_model.generate_content(prompt, generation_config=generation_config)
-        respuesta_json = json.loads(text_response.text)
+        respuesta_json = {}
+        parser = ParserObjetosJSON()
+        # Los enriquecedores de cada plataforma arrancan en cuanto llega su objeto,
+        # mientras Gemini sigue generando el resto
+        enriquecimiento = Enriquecimiento()
+        en_espera = []
 
-        # --- 2. GENERACIÓN DE IMAGEN (POLLINATIONS) ---
-        
-        # A) Para Instagram (Cuadrada 1024x1024)
-        if 'instagram' in respuesta_json and 'suggested_image_prompt' in respuesta_json['instagram']:
-            image_prompt = respuesta_json['instagram']['suggested_image_prompt']
-            print(f"Prompt de imagen sugerido (IG): {image_prompt}")
-            
-            image_url = generar_imagen_con_pollinations(image_prompt, width=1024, height=1024)
-            
-            if image_url:
-                respuesta_json['instagram']['generated_image_url'] = image_url
-                print(f"Imagen generada para Instagram y añadida al JSON: {image_url}")
-                
-                # Compartir con Facebook
-                if 'facebook' in respuesta_json:
-                    respuesta_json['facebook']['generated_image_url'] = image_url
-                    print("Imagen de Instagram compartida con Facebook.")
-
-        # B) Para TikTok (Vertical 720x1280 - 9:16)
-        if 'tiktok' in respuesta_json:
-            tiktok_data = respuesta_json['tiktok']
-            
-            # 1. Imagen Vertical (Backup / Portada)
-            if 'suggested_image_prompt' in tiktok_data:
-                tiktok_prompt = tiktok_data['suggested_image_prompt']
-                tiktok_image_url = generar_imagen_con_pollinations(tiktok_prompt, width=720, height=1280)
-                if tiktok_image_url:
-                    tiktok_data['generated_image_url'] = tiktok_image_url
-            
-            # 2. VIDEO REAL (Pexels - Stock)
-            # Usamos las keywords sugeridas o el hook como fallback
-            video_keywords = tiktok_data.get('stock_video_keywords') or tiktok_data.get('video_hook')
-            if video_keywords:
-                video_url = buscar_video_pexels(video_keywords)
-                if video_url:
-                    tiktok_data['generated_video_url'] = video_url # Campo nuevo para video real
-
-        # --- 3. GENERACIÓN DE AUDIO (DESACTIVADA) ---
-        # (Sección comentada para evitar el error de cuota 429)
-        # if 'tiktok' in respuesta_json and 'video_hook' in respuesta_json['tiktok']:
-        #     audio_text = respuesta_json['tiktok']['video_hook']
-        #     ...
+        for chunk in text_model.generate_content(crear_prompt(titulo, contenido), generation_config=generation_config, stream=True):
+            for plataforma, datos in parser.feed(chunk.text):
+                respuesta_json[plataforma] = datos
+                yield 'plataforma', plataforma, datos
+                enriquecimiento.lanzar(respuesta_json, plataforma)
+            yield from _aplicar_media(enriquecimiento.resultados(esperar=False), respuesta_json, en_espera)
 
-        return respuesta_json
+        if not respuesta_json:
+            yield 'error', None, "Gemini no devolvió adaptaciones válidas."
+            return
+
+        yield from _aplicar_media(enriquecimiento.resultados(), respuesta_json, en_espera)
+
+        adaptation_cache.guardar(clave, respuesta_json)
+        yield 'fin', None, respuesta_json
 
     except Exception as e:
-        print(f"Error en adaptar_contenido_con_gemini: {e}")
-        return {"error": f"Error al procesar la solicitud: {e}"}
\ No newline at end of file
+        print(f"Error en adaptar_contenido_en_streaming: {e}")
+        yield 'error', None, f"Error al procesar la solicitud: {e}"
@@ -0,0 +1,69 @@
+import os
+import urllib.parse
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage, storages
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Publication
+from api.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve los archivos antiguos de MEDIA_ROOT (nombres originales, directorios planos) "
+        "al storage direccionado por contenido y actualiza las media_url que los referencian."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Solo muestra lo que haría.")
+
+    def handle(self, *args, **options):
+        if not isinstance(storages['default'], ContentAddressedStorage):
+            raise CommandError("El storage por defecto no es ContentAddressedStorage (MEDIA_CONTENT_ADDRESSED=False).")
+
+        raiz = settings.MEDIA_ROOT
+        importados = duplicados = bytes_liberados = 0
+        vistos = set()
+
+        for directorio, subdirs, archivos in os.walk(raiz):
+            relativo_dir = os.path.relpath(directorio, raiz)
+            if relativo_dir.split(os.sep)[0] == ContentAddressedStorage.prefijo:
+                subdirs[:] = []
+                continue
+
+            for archivo in archivos:
+                ruta = os.path.join(directorio, archivo)
+                relativo = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+                size = os.path.getsize(ruta)
+
+                if options['dry_run']:
+                    self.stdout.write(f"  {relativo} ({size} bytes)")
+                    continue
+
+                with open(ruta, 'rb') as f:
+                    nuevo = default_storage.save(relativo, File(f))
+                duplicados += nuevo in vistos
+                vistos.add(nuevo)
+
+                # Publicaciones que apuntaban al archivo antiguo (con cualquier host)
+                viejo_path = settings.MEDIA_URL + urllib.parse.quote(relativo)
+                for pub in Publication.objects.filter(media_url__contains=viejo_path):
+                    pub.media_url = pub.media_url.replace(viejo_path, settings.MEDIA_URL + nuevo)
+                    pub.save(update_fields=['media_url', 'updated_at'])
+
+                os.remove(ruta)
+                importados += 1
+                bytes_liberados += size
+                self.stdout.write(f"  {relativo} -> {nuevo}")
+
+        if options['dry_run']:
+            return
+
+        # Espacio real ahorrado = lo borrado menos lo que ocupan los archivos únicos nuevos
+        ocupado = sum(default_storage.size(nombre) for nombre in vistos)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {importados} archivos importados ({duplicados} duplicados), "
+            f"{bytes_liberados - ocupado} bytes liberados."
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api import stats_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde cero el rollup de estadísticas (PublicationStat) y el resumen de "
+        "estados de cada Post a partir de las Publicaciones. Útil si se modificaron estados "
+        "fuera de la aplicación."
+    )
+
+    def handle(self, *args, **options):
+        filas = stats_service.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"✅ Rollup reconstruido: {filas} filas; resumen de Posts recalculado."))
@@ -0,0 +1,54 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.publish_queue import run_worker_loop
+
+
+class Command(BaseCommand):
+    help = "Arranca un pool de workers que consumen la cola de publicación (PublishJob)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.PUBLISH_WORKERS,
+            help="Número de hilos worker (por defecto PUBLISH_WORKERS)."
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.PUBLISH_WORKER_POLL_INTERVAL,
+            help="Segundos de espera cuando la cola está vacía."
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        stop_event = threading.Event()
+
+        def detener(signum, frame):
+            self.stdout.write(self.style.WARNING("Señal recibida, terminando los jobs en curso..."))
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, detener)
+        signal.signal(signal.SIGTERM, detener)
+
+        hilos = [
+            threading.Thread(
+                target=run_worker_loop,
+                args=(stop_event, poll_interval),
+                name=f"publish-worker-{i}",
+                daemon=True,
+            )
+            for i in range(workers)
+        ]
+        for hilo in hilos:
+            hilo.start()
+
+        self.stdout.write(self.style.SUCCESS(f"🚀 {workers} workers de publicación escuchando la cola."))
+
+        # Esperamos con timeout para que las señales se atiendan en el hilo principal
+        while any(hilo.is_alive() for hilo in hilos):
+            for hilo in hilos:
+                hilo.join(timeout=1)
+
+        self.stdout.write(self.style.SUCCESS("Workers detenidos."))
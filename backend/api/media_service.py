@@ -0,0 +1,94 @@
+import mimetypes
+import mmap
+import os
+import urllib.parse
+
+from django.conf import settings
+
+
+def es_url_de_media(url):
+    """
+    True si la ruta de la URL está bajo MEDIA_URL (exista o no el archivo).
+    """
+    return bool(url) and urllib.parse.urlparse(url).path.startswith(settings.MEDIA_URL)
+
+
+def resolver_media_local(url):
+    """
+    Si `url` apunta a un archivo nuestro (ruta bajo MEDIA_URL, con cualquier host:
+    localhost, ngrok, dominio propio...) devuelve la ruta absoluta dentro de MEDIA_ROOT.
+    Devuelve None si no es media local o el archivo no existe.
+
+    Ej: http://localhost:8000/media/generated_images/img.jpg -> <MEDIA_ROOT>/generated_images/img.jpg
+    """
+    if not es_url_de_media(url):
+        return None
+
+    ruta_url = urllib.parse.urlparse(url).path
+    # Decodificar URL (por si tiene espacios o caracteres especiales)
+    relativa = urllib.parse.unquote(ruta_url[len(settings.MEDIA_URL):])
+    raiz = os.path.realpath(settings.MEDIA_ROOT)
+    ruta = os.path.realpath(os.path.join(raiz, relativa))
+
+    # Evitar path traversal (../) fuera de MEDIA_ROOT
+    if os.path.commonpath([raiz, ruta]) != raiz or not os.path.isfile(ruta):
+        return None
+    return ruta
+
+
+def tipo_mime(ruta, por_defecto='application/octet-stream'):
+    return mimetypes.guess_type(ruta)[0] or por_defecto
+
+
+class ArchivoMapeado:
+    """
+    Archivo local mapeado en memoria (mmap) para subirlo sin copias intermedias:
+    `leer(n)` devuelve un memoryview de los siguientes n bytes, que se envía tal cual
+    por el socket. Misma interfaz que la descarga remota (abrir/leer/cerrar).
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.posicion = 0
+        self._archivo = None
+        self._mapa = None
+        self._vista = None
+
+    def abrir(self):
+        """
+        Mapea el archivo y devuelve su tamaño en bytes.
+        """
+        self._archivo = open(self.ruta, 'rb')
+        tamano = os.fstat(self._archivo.fileno()).st_size
+        if not tamano:
+            self.cerrar()
+            raise IOError(f"El archivo está vacío: {self.ruta}")
+        self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._vista = memoryview(self._mapa)
+        return tamano
+
+    def leer(self, n):
+        datos = self._vista[self.posicion:self.posicion + n]
+        self.posicion += len(datos)
+        return datos
+
+    def cerrar(self):
+        if self._vista is not None:
+            self._vista.release()
+            self._vista = None
+        if self._mapa is not None:
+            try:
+                self._mapa.close()
+            except BufferError:
+                # Aún hay slices vivos (ej. una petición en curso); el GC lo cerrará
+                pass
+            self._mapa = None
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def __enter__(self):
+        self.abrir()
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_socialcredential'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='publication',
+            name='estado',
+            field=models.CharField(choices=[('draft', 'Borrador'), ('queued', 'En Cola'), ('publishing', 'Publicando'), ('published', 'Publicado'), ('failed', 'Fallido'), ('manual', 'Manual Pendiente')], default='draft', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PublishJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En Ejecución'), ('done', 'Terminado'), ('failed', 'Fallido')], default='pending', max_length=20)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('run_after', models.DateTimeField()),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('locked_by', models.CharField(blank=True, max_length=100, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('publication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='api.publication')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'run_after'], name='publishjob_estado_run_idx')],
+            },
+        ),
+    ]
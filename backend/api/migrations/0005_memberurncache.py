@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_publishjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberURNCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plataforma', models.CharField(choices=[('tiktok', 'TikTok'), ('facebook', 'Facebook'), ('instagram', 'Instagram'), ('linkedin', 'LinkedIn')], max_length=20)),
+                ('token_hash', models.CharField(max_length=64, unique=True)),
+                ('urn', models.CharField(max_length=200)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_adaptationcache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='publication',
+            name='media_url',
+            field=models.URLField(blank=True, max_length=1000, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_publication_media_url_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockVideoCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=255, unique=True)),
+                ('videos', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_stockvideocache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='upload_mode',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrefetchedImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('source_url', models.URLField(max_length=1000)),
+                ('archivo', models.CharField(max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import migrations
+
+# DDL congelado: search_service usa estas mismas tablas, pero la migración no debe
+# depender del código vivo (que puede cambiar después).
+
+
+def crear_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS api_post_fts "
+            "USING fts5(titulo, contenido_original, adaptaciones, tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS api_post_search ("
+            "post_id bigint PRIMARY KEY REFERENCES api_post(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "documento tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS api_post_search_documento_gin ON api_post_search USING GIN (documento)"
+        )
+    else:
+        return
+
+    # Indexar los posts existentes
+    Post = apps.get_model('api', 'Post')
+    Publication = apps.get_model('api', 'Publication')
+    config = settings.FULLTEXT_SEARCH_CONFIG
+    for post in Post.objects.all().iterator():
+        adaptaciones = "\n".join(
+            Publication.objects.filter(post_id=post.id).values_list('contenido_adaptado', flat=True)
+        )
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                "INSERT INTO api_post_fts (rowid, titulo, contenido_original, adaptaciones) "
+                "VALUES (%s, %s, %s, %s)",
+                [post.id, post.titulo, post.contenido_original, adaptaciones]
+            )
+        else:
+            schema_editor.execute(
+                "INSERT INTO api_post_search (post_id, documento) VALUES (%s, "
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'C') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B'))",
+                [post.id, config, post.titulo, config, post.contenido_original, config, adaptaciones]
+            )
+
+
+def eliminar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS api_post_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS api_post_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_indices_filtros_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:23
+
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def poblar_rollup(apps, schema_editor):
+    # Consulta congelada (no usa stats_service): filas por (día del Post, plataforma, estado)
+    Publication = apps.get_model('api', 'Publication')
+    PublicationStat = apps.get_model('api', 'PublicationStat')
+
+    duracion = ExpressionWrapper(F('fecha_publicacion') - F('post__fecha_creacion'), output_field=DurationField())
+    publicadas = {
+        (fila['dia'], fila['plataforma']): fila['duracion']
+        for fila in (
+            Publication.objects
+            .filter(estado='published', fecha_publicacion__isnull=False)
+            .annotate(dia=TruncDate('post__fecha_creacion'))
+            .values('dia', 'plataforma')
+            .annotate(duracion=Sum(duracion))
+            .order_by()
+        )
+    }
+    filas = (
+        Publication.objects
+        .annotate(dia=TruncDate('post__fecha_creacion'))
+        .values('dia', 'plataforma', 'estado')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+    nuevas = []
+    for fila in filas:
+        segundos = 0
+        if fila['estado'] == 'published':
+            duracion_total = publicadas.get((fila['dia'], fila['plataforma']))
+            segundos = max(int(duracion_total.total_seconds()), 0) if duracion_total else 0
+        nuevas.append(PublicationStat(
+            dia=fila['dia'], plataforma=fila['plataforma'], estado=fila['estado'],
+            total=fila['total'], segundos_hasta_publicar=segundos,
+        ))
+    PublicationStat.objects.bulk_create(nuevas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_busqueda_texto_completo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicationStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('plataforma', models.CharField(choices=[('facebook', 'Facebook'), ('instagram', 'Instagram'), ('linkedin', 'LinkedIn'), ('tiktok', 'TikTok'), ('whatsapp', 'WhatsApp')], max_length=20)),
+                ('estado', models.CharField(choices=[('draft', 'Borrador'), ('queued', 'En Cola'), ('publishing', 'Publicando'), ('published', 'Publicado'), ('failed', 'Fallido'), ('manual', 'Manual Pendiente')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('segundos_hasta_publicar', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('dia', 'plataforma', 'estado')},
+            },
+        ),
+        migrations.RunPython(poblar_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:25
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Estados que existían al crear los contadores (congelados: no se lee Publication.ESTADOS)
+ESTADOS = ('draft', 'queued', 'publishing', 'published', 'failed', 'manual')
+
+
+def poblar_resumen(apps, schema_editor):
+    Post = apps.get_model('api', 'Post')
+    Publication = apps.get_model('api', 'Publication')
+
+    def contar(estado):
+        total = (
+            Publication.objects.filter(post=OuterRef('pk'), estado=estado)
+            .order_by().values('post').annotate(total=Count('id')).values('total')
+        )
+        return Coalesce(Subquery(total, output_field=IntegerField()), 0)
+
+    ultima = (
+        Publication.objects.filter(post=OuterRef('pk'), estado='published')
+        .order_by().values('post').annotate(ultima=Max('fecha_publicacion')).values('ultima')
+    )
+    ultimo_error = (
+        Publication.objects.filter(post=OuterRef('pk'), estado='failed')
+        .order_by('-id').values('plataforma')[:1]
+    )
+    Post.objects.update(
+        **{f'total_{estado}': contar(estado) for estado in ESTADOS},
+        ultima_publicacion=Subquery(ultima),
+        ultimo_error_plataforma=Subquery(ultimo_error),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_estadisticas_publicaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='total_draft',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='total_failed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='total_manual',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='total_published',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='total_publishing',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='total_queued',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='ultima_publicacion',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='ultimo_error_plataforma',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 
 class Post(models.Model):
@@ -7,52 +9,27 @@ class Post(models.Model):
     titulo = models.CharField(max_length=200)
     contenido_original = models.TextField()
     fecha_creacion = models.DateTimeField(auto_now_add=True)
-    
-    def __str__(self):
-        return self.titulo
-
-class Publication(models.Model):
-    """
-    Representa la adaptación específica para cada red social.
-    """
-    PLATAFORMAS = [
-        ('facebook', 'Facebook'),
-        ('instagram', 'Instagram'),
-        ('linkedin', 'LinkedIn'),
-        ('tiktok', 'TikTok'),
-        ('whatsapp', 'WhatsApp'),
-    ]
-
-    ESTADOS = [
-        ('draft', 'Borrador'),            # Generado por Gemini pero no publicado
-        ('published', 'Publicado'),       # Enviado exitosamente a la API
-        ('failed', 'Fallido'),            # Error al enviar
-        ('manual', 'Manual Pendiente'),   # Para TikTok (copiar y pegar)
-    ]
-
-    post = models.ForeignKey(Post, related_name='publications', on_delete=models.CASCADE)
-    plataforma = models.CharField(max_length=20, choices=PLATAFORMAS)
-    contenido_adaptado = models.TextField()
-    
-    # Campos opcionales para metadatos
-    hashtags = models.JSONField(default=list, blank=True) # Guardamos hashtags como lista
-    media_url = models.URLField(blank=True, null=True)    # Para URLs de imagen/video
-    
-    # Estado del envío
-    estado = models.CharField(max_length=20, choices=ESTADOS, default='draft')
-    api_id = models.CharField(max_length=100, blank=True, null=True) # ID que nos devuelve Facebook/Twilio
-    error_log = models.TextField(blank=True, null=True)   # Para guardar errores si falla
+    # Cambia con el Post o su resumen: ETag/Last-Modified del listado (ver conditional.py)
+    updated_at = models.DateTimeField(auto_now=True)
 
-    # Nuevos campos para tracking mejorado
-from django.db import models
+    # Resumen desnormalizado de sus Publicaciones (lo mantiene stats_service con
+    # UPDATEs F() en cada cambio de estado): el listado no necesita cargarlas.
+    total_draft = models.IntegerField(default=0)
+    total_queued = models.IntegerField(default=0)
+    total_publishing = models.IntegerField(default=0)
+    total_published = models.IntegerField(default=0)
+    total_failed = models.IntegerField(default=0)
+    total_manual = models.IntegerField(default=0)
+    ultima_publicacion = models.DateTimeField(blank=True, null=True)
+    ultimo_error_plataforma = models.CharField(max_length=20, blank=True, null=True)  # Mientras haya alguna fallida
 
-class Post(models.Model):
-    """
-    Representa el contenido original (semilla) que el usuario quiere publicar.
-    """
-    titulo = models.CharField(max_length=200)
-    contenido_original = models.TextField()
-    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [
+            # Orden del listado/cursor y filtro por rango de fechas
+            models.Index(fields=['fecha_creacion', 'id'], name='post_fecha_id_idx'),
+            # Feed de cambios (GET /api/sync/)
+            models.Index(fields=['updated_at', 'id'], name='post_updated_idx'),
+        ]
     
     def __str__(self):
         return self.titulo
@@ -71,6 +48,8 @@ class Publication(models.Model):
 
     ESTADOS = [
         ('draft', 'Borrador'),            # Generado por Gemini pero no publicado
+        ('queued', 'En Cola'),            # Esperando a un worker de publicación
+        ('publishing', 'Publicando'),     # Un worker la está enviando a la API
         ('published', 'Publicado'),       # Enviado exitosamente a la API
         ('failed', 'Fallido'),            # Error al enviar
         ('manual', 'Manual Pendiente'),   # Para TikTok (copiar y pegar)
@@ -82,7 +61,7 @@ class Publication(models.Model):
     
     # Campos opcionales para metadatos
     hashtags = models.JSONField(default=list, blank=True) # Guardamos hashtags como lista
-    media_url = models.URLField(blank=True, null=True)    # Para URLs de imagen/video
+    media_url = models.URLField(max_length=1000, blank=True, null=True)  # Para URLs de imagen/video
     
     # Estado del envío
     estado = models.CharField(max_length=20, choices=ESTADOS, default='draft')
@@ -93,8 +72,29 @@ class Publication(models.Model):
     published_url = models.URLField(blank=True, null=True)  # URL de la publicación en la red social
     retry_count = models.IntegerField(default=0)            # Contador de reintentos
     last_error = models.TextField(blank=True, null=True)    # Último error registrado
+    upload_mode = models.CharField(max_length=20, blank=True, null=True)  # TikTok: PULL_FROM_URL o FILE_UPLOAD
 
     fecha_publicacion = models.DateTimeField(null=True, blank=True)
+    # Los .update() y save(update_fields=...) deben incluirlo (auto_now solo actúa en save())
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Filtros del listado de posts (ver ListaPostsView)
+            models.Index(fields=['plataforma', 'estado'], name='publication_plat_estado_idx'),
+            models.Index(fields=['post', 'estado'], name='publication_post_estado_idx'),
+            # Feed de cambios (GET /api/sync/)
+            models.Index(fields=['updated_at', 'id'], name='publication_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Texto tal como está en BD: las señales solo reindexan si cambia (ver signals.py)
+        instance._contenido_bd = instance.__dict__.get('contenido_adaptado')
+        # Estado tal como está en BD: el rollup de estadísticas mueve el conteo desde él
+        instance._estado_bd = instance.__dict__.get('estado')
+        return instance
 
     def __str__(self):
         return f"{self.plataforma} - {self.post.titulo}"
@@ -117,4 +117,195 @@ class SocialCredential(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Credential for {self.plataforma}"
\ No newline at end of file
+        return f"Credential for {self.plataforma}"
+
+class MemberURNCache(models.Model):
+    """
+    Caché persistente del URN del miembro (ej. urn:li:person:XXXX) asociado a un token.
+    Se indexa por el hash del token: si el token cambia, la entrada deja de coincidir.
+    """
+    plataforma = models.CharField(max_length=20, choices=SocialCredential.PLATAFORMAS)
+    token_hash = models.CharField(max_length=64, unique=True)  # SHA-256 del access token
+    urn = models.CharField(max_length=200)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.plataforma}: {self.urn}"
+
+class AdaptationCache(models.Model):
+    """
+    Caché persistente de las adaptaciones de Gemini.
+    La clave es el hash normalizado de (título, contenido, versión del prompt, modelo).
+    """
+    clave = models.CharField(max_length=64, unique=True)
+    resultado = models.JSONField()
+    hits = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Adaptación cacheada {self.clave[:12]}"
+
+class StockVideoCache(models.Model):
+    """
+    Caché persistente de búsquedas de video de stock (Pexels) por keywords normalizadas.
+    Una lista vacía es una caché negativa ("sin resultados").
+    """
+    clave = models.CharField(max_length=255, unique=True)  # Keywords normalizadas
+    videos = models.JSONField(default=list)                 # Archivos elegidos de 'video_files'
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Pexels: {self.clave} ({len(self.videos)} videos)"
+
+class UploadSession(models.Model):
+    """
+    Subida reanudable por chunks (estilo tus): el cliente envía el archivo en trozos
+    con su offset y, si se corta, consulta el offset guardado y continúa desde ahí.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)   # Bytes recibidos hasta ahora
+    completado = models.BooleanField(default=False)
+    archivo = models.CharField(max_length=500, blank=True, null=True)  # Nombre final en default_storage
+    sha256 = models.CharField(max_length=64, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.offset}/{self.total_size})"
+
+class MediaBlob(models.Model):
+    """
+    Índice del storage direccionado por contenido (api/storage.py): un archivo por hash.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    mime = models.CharField(max_length=100, blank=True)
+    path = models.CharField(max_length=255, db_index=True)  # Nombre en el storage: cas/ab/cd/<hash>.<ext>
+    ref_count = models.IntegerField(default=1)              # Subidas que apuntan a este archivo
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+
+class PrefetchedImage(models.Model):
+    """
+    Copia local (en default_storage) de una imagen generada por Pollinations.
+    """
+    clave = models.CharField(max_length=64, unique=True)  # SHA-256 de la URL de origen
+    source_url = models.URLField(max_length=1000)
+    archivo = models.CharField(max_length=500)             # Nombre en el storage
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.archivo} <- {self.source_url[:60]}"
+
+class ImageVariant(models.Model):
+    """
+    Variante derivada de una imagen (por plataforma o miniatura), cacheada por
+    hash del archivo de origen + especificación (ver api/image_variants.py).
+    """
+    source_hash = models.CharField(max_length=64)
+    spec = models.CharField(max_length=20)       # instagram, facebook, tiktok, thumb
+    archivo = models.CharField(max_length=500)   # Nombre en el storage
+    width = models.IntegerField()
+    height = models.IntegerField()
+    size = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('source_hash', 'spec')
+
+    def __str__(self):
+        return f"{self.spec} {self.width}x{self.height} ({self.source_hash[:12]})"
+
+class PublicationStat(models.Model):
+    """
+    Rollup de estadísticas (ver api/stats_service.py): número de Publicaciones por
+    día de creación del Post, plataforma y estado actual. Se actualiza de forma
+    incremental en cada cambio de estado; `manage.py reconstruir_estadisticas` lo
+    recalcula desde cero.
+    """
+    dia = models.DateField()
+    plataforma = models.CharField(max_length=20, choices=Publication.PLATAFORMAS)
+    estado = models.CharField(max_length=20, choices=Publication.ESTADOS)
+    total = models.IntegerField(default=0)
+    # Solo en 'published': suma de segundos entre la creación del Post y la publicación
+    segundos_hasta_publicar = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('dia', 'plataforma', 'estado')
+
+    def __str__(self):
+        return f"{self.dia} {self.plataforma} {self.estado}: {self.total}"
+
+class Tombstone(models.Model):
+    """
+    Registro de un Post o Publicación eliminado, para que el feed de cambios
+    (api/sync_service.py) pueda avisar del borrado. Se purgan tras
+    SYNC_TOMBSTONE_RETENTION_DAYS.
+    """
+    MODELOS = [
+        ('post', 'Post'),
+        ('publication', 'Publication'),
+    ]
+
+    modelo = models.CharField(max_length=20, choices=MODELOS)
+    objeto_id = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now_add=True)  # Momento del borrado (mismo nombre que en Post/Publication)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='tombstone_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} #{self.objeto_id} eliminado"
+
+class BusEvent(models.Model):
+    """
+    Evento del bus en base de datos (api/event_bus.py, BusEnBaseDeDatos): hace de
+    broker local entre los workers de publicación y los procesos que sirven SSE.
+    """
+    datos = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Evento #{self.id}: {self.datos.get('estado')}"
+
+class PublishJob(models.Model):
+    """
+    Trabajo de publicación en segundo plano (cola persistida en BD).
+    Lo crea PublicarContenidoView y lo consume `manage.py run_publish_workers`.
+    """
+    ESTADOS = [
+        ('pending', 'Pendiente'),     # Esperando a ser tomado por un worker
+        ('running', 'En Ejecución'),  # Tomado por un worker (con lease)
+        ('done', 'Terminado'),        # Se obtuvo un resultado de la plataforma
+        ('failed', 'Fallido'),        # Excepción no controlada tras agotar intentos
+    ]
+
+    publication = models.ForeignKey(Publication, related_name='jobs', on_delete=models.CASCADE)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pending')
+
+    # Parámetros del request original (image_url, video_url, whatsapp_number)
+    payload = models.JSONField(default=dict, blank=True)
+    resultado = models.JSONField(blank=True, null=True)
+
+    attempts = models.IntegerField(default=0)
+    run_after = models.DateTimeField()                      # No se ejecuta antes de esta fecha
+    locked_at = models.DateTimeField(blank=True, null=True)  # Inicio del lease del worker
+    locked_by = models.CharField(max_length=100, blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'run_after'], name='publishjob_estado_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.id} ({self.estado}) - {self.publication}"
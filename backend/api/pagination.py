@@ -0,0 +1,14 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class PostCursorPagination(CursorPagination):
+    """
+    Paginación por cursor sobre (fecha_creacion, id): cada página es una consulta
+    con LIMIT sobre el índice, sin OFFSET ni COUNT(*) de toda la tabla.
+    Respuesta: {"next": url|null, "previous": url|null, "results": [...]}
+    """
+    ordering = ('-fecha_creacion', '-id')
+    page_size = settings.POSTS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.POSTS_MAX_PAGE_SIZE
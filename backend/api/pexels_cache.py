@@ -0,0 +1,71 @@
+import copy
+import datetime
+import re
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache_service import TTLCache
+from .models import StockVideoCache
+
+# Nivel 1: memoria del proceso (LRU). Nivel 2: tabla StockVideoCache.
+# Las búsquedas sin resultados se cachean (lista vacía) con un TTL más corto.
+_memoria = TTLCache(maxsize=settings.PEXELS_CACHE_MAXSIZE, ttl=settings.PEXELS_CACHE_TTL)
+_metricas = {"hits_memoria": 0, "hits_bd": 0, "misses": 0}
+_metricas_lock = threading.Lock()
+
+
+def normalizar_keywords(keywords):
+    """
+    'Technology,  futuristic , coding' y 'coding, technology, futuristic'
+    dan la misma clave: 'coding, futuristic, technology'.
+    """
+    partes = {" ".join(parte.split()) for parte in re.split(r'[,;\n]', (keywords or '').lower())}
+    return ", ".join(sorted(parte for parte in partes if parte))[:255]
+
+
+def _ttl(videos):
+    return settings.PEXELS_CACHE_TTL if videos else settings.PEXELS_NEGATIVE_CACHE_TTL
+
+
+def _contar(metrica):
+    with _metricas_lock:
+        _metricas[metrica] += 1
+
+
+def obtener(clave):
+    """
+    Devuelve la lista de archivos cacheada (posiblemente vacía) o None si no hay entrada.
+    """
+    videos = _memoria.get(clave)
+    if videos is not None:
+        _contar("hits_memoria")
+        return copy.deepcopy(videos)
+
+    fila = StockVideoCache.objects.filter(clave=clave).first()
+    if fila is not None and fila.created_at >= timezone.now() - datetime.timedelta(seconds=_ttl(fila.videos)):
+        _memoria.set(clave, fila.videos, ttl=_ttl(fila.videos))
+        _contar("hits_bd")
+        return copy.deepcopy(fila.videos)
+
+    _contar("misses")
+    return None
+
+
+def guardar(clave, videos):
+    _memoria.set(clave, copy.deepcopy(videos), ttl=_ttl(videos))
+    StockVideoCache.objects.update_or_create(
+        clave=clave,
+        defaults={'videos': videos, 'created_at': timezone.now()}
+    )
+
+
+def metricas():
+    with _metricas_lock:
+        datos = dict(_metricas)
+    total = datos["hits_memoria"] + datos["hits_bd"] + datos["misses"]
+    datos["hit_rate"] = round((datos["hits_memoria"] + datos["hits_bd"]) / total, 3) if total else 0.0
+    datos["memoria"] = _memoria.stats()
+    datos["entradas_bd"] = StockVideoCache.objects.count()
+    return datos
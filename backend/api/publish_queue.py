@@ -0,0 +1,247 @@
+import logging
+import os
+import socket
+import threading
+import datetime
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PublishJob
+from .publish_service import ejecutar_publicacion, continuar_publicacion, registrar_resultado, validar_parametros
+from . import stats_service
+
+logger = logging.getLogger(__name__)
+
+
+def encolar_publicacion(pub, image_url=None, video_url=None, whatsapp_number=None):
+    """
+    Crea un PublishJob para la Publicación y la marca como 'queued'.
+    Devuelve el job creado. No llama a ninguna API externa.
+    """
+    with transaction.atomic():
+        job = PublishJob.objects.create(
+            publication=pub,
+            payload={
+                'image_url': image_url,
+                'video_url': video_url,
+                'whatsapp_number': whatsapp_number,
+            },
+            run_after=timezone.now(),
+        )
+        stats_service.actualizar_estado(pub, 'queued')
+    return job
+
+
+def encolar_todo(post, opciones_por_plataforma, plataformas=None):
+    """
+    Variante en segundo plano de publicar_todo: encola un job por plataforma y vuelve
+    enseguida. El progreso se sigue por el stream de eventos (o GET /api/publicar/jobs/<id>/).
+    Devuelve ({plataforma: job_id}, {plataforma: error de validación}).
+    """
+    pubs = list(post.publications.all())
+    if plataformas:
+        pubs = [pub for pub in pubs if pub.plataforma in plataformas]
+
+    jobs = {}
+    errores = {}
+    for pub in pubs:
+        opciones = opciones_por_plataforma.get(pub.plataforma, {})
+        error = validar_parametros(pub, opciones.get('image_url'), opciones.get('video_url'), opciones.get('whatsapp_number'))
+        if error:
+            errores[pub.plataforma] = error
+            continue
+        pub.retry_count += 1
+        pub.save(update_fields=['retry_count', 'updated_at'])
+        job = encolar_publicacion(pub, opciones.get('image_url'), opciones.get('video_url'), opciones.get('whatsapp_number'))
+        jobs[pub.plataforma] = job.id
+    return jobs, errores
+
+
+def _worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def reclamar_siguiente_job(worker_id=None):
+    """
+    Toma el siguiente job disponible de forma atómica.
+
+    Un job está disponible si está 'pending' y su run_after ya pasó, o si está
+    'running' pero su lease expiró (el worker que lo tenía murió o se reinició).
+    El claim es un UPDATE condicional, así que funciona igual en SQLite y Postgres
+    sin depender de SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    worker_id = worker_id or _worker_id()
+    ahora = timezone.now()
+    lease_vencido = ahora - datetime.timedelta(seconds=settings.PUBLISH_JOB_LEASE_SECONDS)
+
+    candidatos = (
+        PublishJob.objects
+        .filter(estado='pending', run_after__lte=ahora)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    huerfanos = (
+        PublishJob.objects
+        .filter(estado='running', locked_at__lt=lease_vencido)
+        .order_by('locked_at')
+        .values_list('id', flat=True)[:10]
+    )
+
+    for job_id in list(huerfanos) + list(candidatos):
+        tomado = (
+            PublishJob.objects
+            .filter(id=job_id)
+            .filter(
+                Q(estado='pending', run_after__lte=ahora) |
+                Q(estado='running', locked_at__lt=lease_vencido)
+            )
+            .update(estado='running', locked_at=ahora, locked_by=worker_id, updated_at=ahora)
+        )
+        if tomado:
+            return PublishJob.objects.select_related('publication', 'publication__post').get(id=job_id)
+    return None
+
+
+def _renovar_lease(job, parar):
+    """
+    Latido: mientras el job se ejecuta renueva locked_at (solo si el lease sigue siendo
+    de este worker) para que otro worker no lo tome como huérfano y publique dos veces.
+    """
+    intervalo = max(settings.PUBLISH_JOB_LEASE_SECONDS / 3, 1)
+    try:
+        while not parar.wait(intervalo):
+            renovado = (
+                PublishJob.objects
+                .filter(id=job.id, estado='running', locked_by=job.locked_by)
+                .update(locked_at=timezone.now())
+            )
+            if not renovado:
+                logger.warning(f"PublishJob #{job.id}: el lease ya no es de {job.locked_by}")
+                return
+    except Exception:
+        logger.exception(f"Error renovando el lease del PublishJob #{job.id}")
+    finally:
+        connection.close()
+
+
+def procesar_job(job):
+    """
+    Ejecuta un job ya reclamado: publica, actualiza la Publicación y cierra el job.
+    Si ocurre una excepción no controlada se reprograma con backoff hasta
+    PUBLISH_JOB_MAX_ATTEMPTS. Si la plataforma devuelve 'pending' el job vuelve a
+    la cola con la continuación guardada en el payload.
+    """
+    parar = threading.Event()
+    latido = threading.Thread(target=_renovar_lease, args=(job, parar), name=f"lease-job-{job.id}", daemon=True)
+    latido.start()
+    try:
+        _ejecutar_job(job)
+    finally:
+        parar.set()
+        latido.join()
+
+    # Solo se guarda si el lease sigue siendo nuestro: si otro worker tomó el job,
+    # su estado manda y este resultado no lo pisa
+    guardado = (
+        PublishJob.objects
+        .filter(id=job.id, locked_by=job.locked_by)
+        .update(
+            estado=job.estado,
+            payload=job.payload,
+            resultado=job.resultado,
+            attempts=job.attempts,
+            run_after=job.run_after,
+            last_error=job.last_error,
+            locked_at=None,
+            locked_by=None,
+            updated_at=timezone.now(),
+        )
+    )
+    if not guardado:
+        logger.warning(f"PublishJob #{job.id}: lease perdido, no se guarda el resultado de {job.locked_by}")
+    job.locked_at = None
+    job.locked_by = None
+    return job
+
+
+def _ejecutar_job(job):
+    pub = job.publication
+    payload = job.payload or {}
+    continuacion = payload.get('continuacion')
+
+    # Las continuaciones de una publicación diferida no cuentan como intento nuevo
+    if not continuacion:
+        job.attempts += 1
+    stats_service.actualizar_estado(pub, 'publishing')
+
+    try:
+        if continuacion:
+            resultado = continuar_publicacion(pub, continuacion)
+        else:
+            resultado = ejecutar_publicacion(
+                pub,
+                image_url=payload.get('image_url'),
+                video_url=payload.get('video_url'),
+                whatsapp_number=payload.get('whatsapp_number'),
+                diferido=settings.INSTAGRAM_PUBLISH_MODE == 'deferred',
+            )
+
+        if resultado.get('status') == 'pending':
+            # Paso intermedio listo (ej. contenedor de Instagram creado): liberamos
+            # el worker y reprogramamos el job para cuando se espera que esté listo.
+            payload['continuacion'] = resultado
+            job.payload = payload
+            job.estado = 'pending'
+            job.run_after = timezone.now() + datetime.timedelta(seconds=resultado.get('retry_after') or 1)
+            job.resultado = resultado
+        else:
+            registrar_resultado(pub, resultado)
+            job.estado = 'done'
+            job.resultado = resultado
+            job.last_error = None
+
+    except Exception as e:
+        logger.exception(f"Excepción procesando PublishJob #{job.id}")
+        job.last_error = str(e)
+        if continuacion:
+            job.attempts += 1
+
+        if job.attempts < settings.PUBLISH_JOB_MAX_ATTEMPTS:
+            delay = settings.PUBLISH_JOB_RETRY_DELAY * (2 ** (job.attempts - 1))
+            job.estado = 'pending'
+            job.run_after = timezone.now() + datetime.timedelta(seconds=delay)
+            stats_service.actualizar_estado(pub, 'queued')
+        else:
+            job.estado = 'failed'
+            job.resultado = {"platform": pub.plataforma, "status": "error", "message": str(e)}
+            registrar_resultado(pub, job.resultado)
+
+
+def run_worker_loop(stop_event, poll_interval=None):
+    """
+    Bucle de un worker: reclama y procesa jobs hasta que se active stop_event.
+    """
+    poll_interval = poll_interval or settings.PUBLISH_WORKER_POLL_INTERVAL
+    worker_id = _worker_id()
+    logger.info(f"Worker de publicación iniciado ({worker_id})")
+
+    while not stop_event.is_set():
+        close_old_connections()
+        try:
+            job = reclamar_siguiente_job(worker_id)
+        except Exception:
+            logger.exception("Error reclamando jobs de publicación")
+            job = None
+
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+
+        logger.info(f"Worker {worker_id} procesando PublishJob #{job.id} ({job.publication.plataforma})")
+        procesar_job(job)
+
+    close_old_connections()
+    logger.info(f"Worker de publicación detenido ({worker_id})")
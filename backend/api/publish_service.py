@@ -0,0 +1,179 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Publication
+
+from .social_service import publicar_en_facebook, publicar_en_linkedin, publicar_en_whatsapp, publicar_en_instagram, publicar_en_tiktok, continuar_publicacion_instagram
+from .notification_service import notify_success, notify_error, notify_manual_action
+from .image_prefetch import url_para_publicar
+from .image_variants import url_variante_para_publicar
+from . import stats_service
+
+
+def validar_parametros(pub, image_url=None, video_url=None, whatsapp_number=None):
+    """
+    Valida los parámetros requeridos por cada plataforma ANTES de encolar o publicar.
+    Devuelve un mensaje de error o None si todo está bien.
+    """
+    if pub.plataforma == 'whatsapp' and not whatsapp_number:
+        return "WhatsApp requiere número destino"
+    if pub.plataforma == 'tiktok' and not (video_url or image_url):
+        return "TikTok requiere video_url"
+    return None
+
+
+def ejecutar_publicacion(pub, image_url=None, video_url=None, whatsapp_number=None, diferido=False):
+    """
+    Lanza la publicación a la API real de la plataforma correspondiente.
+    NO toca la base de datos: solo devuelve el dict de resultado del servicio social.
+
+    Con diferido=True las plataformas de varios pasos (Instagram) pueden devolver
+    status 'pending' para continuarse más tarde con continuar_publicacion().
+    """
+    # Imágenes de Pollinations: usar la copia local descargada en segundo plano
+    # y, si la tenemos en local, su variante al tamaño de la plataforma
+    if image_url:
+        image_url = url_para_publicar(image_url, pub.plataforma)
+        image_url = url_variante_para_publicar(image_url, pub.plataforma)
+
+    # --- SWITCH DE PLATAFORMAS ---
+    if pub.plataforma == 'facebook':
+        # Facebook soporta imagen opcional
+        return publicar_en_facebook(pub.contenido_adaptado, image_url)
+
+    elif pub.plataforma == 'whatsapp':
+        return publicar_en_whatsapp(pub.contenido_adaptado, whatsapp_number)
+
+    elif pub.plataforma == 'instagram':
+        return publicar_en_instagram(pub.contenido_adaptado, image_url, diferido=diferido)
+
+    elif pub.plataforma == 'linkedin':
+        return publicar_en_linkedin(pub.contenido_adaptado)
+
+    elif pub.plataforma == 'tiktok':
+        # Usar video_url si viene en el request, sino intentar usar image_url
+        return publicar_en_tiktok(video_url or image_url, pub.contenido_adaptado)
+
+    return {"platform": pub.plataforma, "status": "error", "message": f"Plataforma no soportada: {pub.plataforma}"}
+
+
+def continuar_publicacion(pub, continuacion):
+    """
+    Retoma una publicación diferida a partir del resultado 'pending' anterior.
+    """
+    if pub.plataforma == 'instagram':
+        return continuar_publicacion_instagram(
+            continuacion['creation_id'],
+            continuacion['started_at'],
+            size_key=continuacion.get('size_key', 'desconocido'),
+            retry_after=continuacion.get('retry_after'),
+        )
+    return {"platform": pub.plataforma, "status": "error", "message": "La plataforma no soporta publicación diferida"}
+
+
+def registrar_resultado(pub, resultado):
+    """
+    Actualiza el estado de la Publicación según el resultado y notifica.
+    """
+    # Solo las columnas del resultado: la instancia puede llevar minutos en memoria y
+    # escribirla entera desharía cambios concurrentes (ej. media_url del prefetch)
+    campos = {}
+    if resultado.get('status') == 'success':
+        estado = 'published'
+        campos = {
+            'api_id': str(resultado.get('id') or resultado.get('sid')),
+            'published_url': resultado.get('url', ''),
+            'fecha_publicacion': timezone.now(),
+            'last_error': None,
+        }
+        if resultado.get('upload_mode'):
+            campos['upload_mode'] = resultado['upload_mode']
+
+        # Notificar éxito
+        notify_success(pub.plataforma, pub.post_id, campos['api_id'])
+
+    elif resultado.get('status') == 'manual_action_required':
+        estado = 'manual'
+        notify_manual_action(pub.plataforma, pub.post_id)
+
+    else:
+        estado = 'failed'
+        error_msg = str(resultado.get('message'))
+        campos = {'error_log': error_msg, 'last_error': error_msg}
+
+        # Notificar error
+        notify_error(pub.plataforma, pub.post_id, error_msg)
+
+    # UPDATE condicional sobre el estado de BD, en la misma transacción que el resumen
+    # del Post y el rollup
+    stats_service.actualizar_estado(pub, estado, **campos)
+    return pub
+
+
+def _publicar_en_hilo(pub, opciones):
+    """
+    Ejecuta una publicación dentro de un hilo del pool y cierra la conexión a BD
+    que el hilo haya podido abrir (ej. TikTok lee su token de SocialCredential).
+    """
+    try:
+        return ejecutar_publicacion(
+            pub,
+            image_url=opciones.get('image_url'),
+            video_url=opciones.get('video_url'),
+            whatsapp_number=opciones.get('whatsapp_number'),
+        )
+    except Exception as e:
+        return {"platform": pub.plataforma, "status": "error", "message": str(e)}
+    finally:
+        connection.close()
+
+
+def publicar_todo(post, opciones_por_plataforma, plataformas=None):
+    """
+    Publica en paralelo todas las Publicaciones de un Post (o solo las de `plataformas`)
+    sobre un pool de hilos acotado. El tiempo total es el de la plataforma más lenta.
+
+    Las llamadas a las APIs corren en los hilos; la actualización de la BD y las
+    notificaciones se hacen en el hilo que llama, a medida que terminan.
+    Devuelve un dict {plataforma: resultado}.
+    """
+    pubs = list(post.publications.all())
+    if plataformas:
+        pubs = [pub for pub in pubs if pub.plataforma in plataformas]
+
+    resultados = {}
+    a_publicar = []
+    for pub in pubs:
+        opciones = opciones_por_plataforma.get(pub.plataforma, {})
+        error = validar_parametros(pub, opciones.get('image_url'), opciones.get('video_url'), opciones.get('whatsapp_number'))
+        if error:
+            resultados[pub.plataforma] = {"platform": pub.plataforma, "status": "error", "message": error}
+        else:
+            a_publicar.append((pub, opciones))
+
+    if not a_publicar:
+        return resultados
+
+    # Un solo UPDATE para el contador de reintentos; el estado cambia con un UPDATE
+    # condicional por Publicación para que el resumen del Post parta del estado real
+    ids = [pub.id for pub, _ in a_publicar]
+    with transaction.atomic():
+        Publication.objects.filter(id__in=ids).update(retry_count=F('retry_count') + 1, updated_at=timezone.now())
+        for pub, _ in a_publicar:
+            stats_service.actualizar_estado(pub, 'publishing')
+
+    max_workers = min(len(a_publicar), settings.PUBLISH_FANOUT_MAX_WORKERS)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='publicar-todo') as executor:
+        futuros = {executor.submit(_publicar_en_hilo, pub, opciones): pub for pub, opciones in a_publicar}
+        for futuro in as_completed(futuros):
+            pub = futuros[futuro]
+            resultado = futuro.result()
+            pub.refresh_from_db(fields=['retry_count'])
+            registrar_resultado(pub, resultado)
+            resultados[pub.plataforma] = resultado
+
+    return resultados
@@ -0,0 +1,160 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Post, Publication
+
+# Índice de texto completo por Post (título, contenido original y todas sus adaptaciones):
+# - SQLite: tabla virtual FTS5 (rowid = post_id), ranking bm25.
+# - PostgreSQL: tabla con tsvector + índice GIN, ranking ts_rank.
+# - Otros motores (o si la tabla no existe): icontains, sin ranking.
+TABLA_FTS = 'api_post_fts'
+TABLA_PG = 'api_post_search'
+
+# Pesos por columna (título > adaptaciones > contenido original)
+_PESOS_BM25 = (10.0, 1.0, 2.0)
+
+
+_motor_disponible = {}
+
+
+def motor():
+    """
+    'sqlite', 'postgresql' o None si no hay índice de texto completo disponible.
+    Se comprueba una vez por proceso (se reinicia tras cada migrate).
+    """
+    vendor = connection.vendor
+    if vendor not in _motor_disponible:
+        tabla = {'sqlite': TABLA_FTS, 'postgresql': TABLA_PG}.get(vendor)
+        _motor_disponible[vendor] = bool(tabla) and tabla in connection.introspection.table_names()
+    return vendor if _motor_disponible[vendor] else None
+
+
+def reiniciar_motor(**kwargs):
+    """
+    Olvida la comprobación de motor() (conectado a post_migrate: la migración 0015
+    crea o elimina la tabla del índice).
+    """
+    _motor_disponible.clear()
+
+
+# --- SINCRONIZACIÓN ---
+
+def _documento(post_id):
+    post = Post.objects.filter(id=post_id).values('titulo', 'contenido_original').first()
+    if post is None:
+        return None
+    adaptaciones = Publication.objects.filter(post_id=post_id).values_list('contenido_adaptado', flat=True)
+    return post['titulo'], post['contenido_original'], "\n".join(adaptaciones)
+
+
+def indexar_posts(post_ids):
+    """
+    (Re)indexa los Posts indicados. Se llama desde las señales y tras los bulk_create.
+    """
+    vendor = motor()
+    if vendor is None:
+        return
+
+    with connection.cursor() as cursor:
+        for post_id in set(post_ids):
+            documento = _documento(post_id)
+            if documento is None:
+                desindexar_post(post_id)
+                continue
+            if vendor == 'sqlite':
+                cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", [post_id])
+                cursor.execute(
+                    f"INSERT INTO {TABLA_FTS} (rowid, titulo, contenido_original, adaptaciones) VALUES (%s, %s, %s, %s)",
+                    [post_id, *documento]
+                )
+            else:
+                config = settings.FULLTEXT_SEARCH_CONFIG
+                cursor.execute(
+                    f"INSERT INTO {TABLA_PG} (post_id, documento) VALUES (%s, "
+                    "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                    "setweight(to_tsvector(%s::regconfig, %s), 'C') || "
+                    "setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+                    "ON CONFLICT (post_id) DO UPDATE SET documento = EXCLUDED.documento",
+                    [post_id, config, documento[0], config, documento[1], config, documento[2]]
+                )
+
+
+def desindexar_post(post_id):
+    vendor = motor()
+    if vendor is None:
+        return
+    tabla, columna = (TABLA_FTS, 'rowid') if vendor == 'sqlite' else (TABLA_PG, 'post_id')
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {tabla} WHERE {columna} = %s", [post_id])
+
+
+def reindexar_todo():
+    """
+    Reconstruye el índice completo (ej. tras importar datos con SQL).
+    """
+    vendor = motor()
+    if vendor is None:
+        return 0
+    tabla = TABLA_FTS if vendor == 'sqlite' else TABLA_PG
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {tabla}")
+    ids = list(Post.objects.values_list('id', flat=True))
+    indexar_posts(ids)
+    return len(ids)
+
+
+# --- BÚSQUEDA ---
+
+def _consulta_fts5(q):
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: cada palabra entre
+    comillas (sin operadores) y con prefijo, todas obligatorias.
+    """
+    palabras = re.findall(r'\w+', q, flags=re.UNICODE)
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+
+def buscar(q, limit, offset=0):
+    """
+    Devuelve los IDs de Post que coinciden con `q`, ordenados por relevancia.
+    """
+    vendor = motor()
+
+    if vendor == 'sqlite':
+        consulta = _consulta_fts5(q)
+        if not consulta:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s "
+                f"ORDER BY bm25({TABLA_FTS}, {', '.join(str(p) for p in _PESOS_BM25)}) LIMIT %s OFFSET %s",
+                [consulta, limit, offset]
+            )
+            return [fila[0] for fila in cursor.fetchall()]
+
+    if vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT post_id FROM {TABLA_PG}, websearch_to_tsquery(%s::regconfig, %s) consulta "
+                "WHERE documento @@ consulta ORDER BY ts_rank(documento, consulta) DESC, post_id DESC "
+                "LIMIT %s OFFSET %s",
+                [settings.FULLTEXT_SEARCH_CONFIG, q, limit, offset]
+            )
+            return [fila[0] for fila in cursor.fetchall()]
+
+    # Sin índice: búsqueda lineal (solo para motores sin soporte)
+    filtro = Q()
+    for palabra in q.split():
+        filtro &= (
+            Q(titulo__icontains=palabra)
+            | Q(contenido_original__icontains=palabra)
+            | Q(publications__contenido_adaptado__icontains=palabra)
+        )
+    ids = (
+        Post.objects.filter(filtro).distinct()
+        .order_by('-fecha_creacion', '-id').values_list('id', flat=True)
+    )
+    return list(ids[offset:offset + limit])
@@ -1,14 +1,49 @@
+import urllib.parse
+
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Post, Publication
 
 class PublicationSerializer(serializers.ModelSerializer):
+    # Miniatura para el dashboard (se genera al pedirla, no al serializar)
+    thumbnail_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Publication
         fields = '__all__'
 
+    def get_thumbnail_url(self, obj):
+        if not obj.media_url:
+            return None
+        url = f"{reverse('variante_media')}?{urllib.parse.urlencode({'url': obj.media_url, 'spec': 'thumb'})}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
 class PostSerializer(serializers.ModelSerializer):
     publications = PublicationSerializer(many=True, read_only=True)
 
     class Meta:
         model = Post
-        fields = ['id', 'titulo', 'contenido_original', 'fecha_creacion', 'publications']
\ No newline at end of file
+        fields = ['id', 'titulo', 'contenido_original', 'fecha_creacion', 'publications']
+
+
+class PostListSerializer(serializers.ModelSerializer):
+    """
+    Versión ligera para el listado: usa el resumen desnormalizado del Post en vez
+    de serializar sus Publicaciones (el detalle sigue usando PostSerializer).
+    """
+    estados = serializers.SerializerMethodField()
+    total_publicaciones = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = [
+            'id', 'titulo', 'contenido_original', 'fecha_creacion',
+            'estados', 'total_publicaciones', 'ultima_publicacion', 'ultimo_error_plataforma',
+        ]
+
+    def get_estados(self, obj):
+        return {estado: getattr(obj, f'total_{estado}') for estado, _ in Publication.ESTADOS}
+
+    def get_total_publicaciones(self, obj):
+        return sum(self.get_estados(obj).values())
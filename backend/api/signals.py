@@ -0,0 +1,77 @@
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Post, Publication
+from . import search_service, stats_service, sync_service
+
+
+# --- ÍNDICE DE BÚSQUEDA (ver search_service) ---
+# Los bulk_create no emiten señales: quien los use llama a search_service.indexar_posts().
+
+@receiver(post_save, sender=Post)
+def indexar_post_guardado(sender, instance, **kwargs):
+    search_service.indexar_posts([instance.id])
+
+
+@receiver(post_delete, sender=Post)
+def desindexar_post_eliminado(sender, instance, **kwargs):
+    search_service.desindexar_post(instance.id)
+
+
+@receiver(post_save, sender=Publication)
+def indexar_publicacion_guardada(sender, instance, created, update_fields=None, **kwargs):
+    # Los cambios de estado (publicar, fallar...) no cambian el texto indexado
+    if not created:
+        if update_fields is not None and 'contenido_adaptado' not in update_fields:
+            return
+        if instance.contenido_adaptado == getattr(instance, '_contenido_bd', None):
+            return
+    search_service.indexar_posts([instance.post_id])
+    instance._contenido_bd = instance.contenido_adaptado
+
+
+@receiver(post_delete, sender=Publication)
+def indexar_publicacion_eliminada(sender, instance, **kwargs):
+    search_service.indexar_posts([instance.post_id])
+
+
+post_migrate.connect(search_service.reiniciar_motor, dispatch_uid='api.reiniciar_motor_busqueda')
+
+
+# --- ROLLUP DE ESTADÍSTICAS (ver stats_service) ---
+# Igual que arriba: bulk_create y .update() registran el cambio explícitamente.
+
+@receiver(post_save, sender=Publication)
+def registrar_estado_guardado(sender, instance, created, **kwargs):
+    if created:
+        stats_service.registrar_cambio(instance, instance.estado, anterior='')
+    elif hasattr(instance, '_estado_bd'):
+        stats_service.registrar_cambio(instance, instance.estado)
+
+
+@receiver(pre_delete, sender=Publication)
+def leer_estado_antes_de_borrar(sender, instance, **kwargs):
+    # La instancia puede estar desfasada: se resta el estado que hay en BD (el borrado
+    # corre en una transacción, así que la fila queda bloqueada hasta el DELETE)
+    estado = Publication.objects.select_for_update().filter(id=instance.id).values_list('estado', flat=True).first()
+    if estado is not None:
+        instance._estado_bd = estado
+
+
+@receiver(post_delete, sender=Publication)
+def registrar_publicacion_eliminada(sender, instance, **kwargs):
+    stats_service.registrar_cambio(instance, '', anterior=getattr(instance, '_estado_bd', instance.estado))
+
+
+# --- FEED DE CAMBIOS (ver sync_service) ---
+# Los borrados (EliminarPostView y sus Publicaciones en cascada) dejan un tombstone.
+
+@receiver(post_delete, sender=Post)
+def registrar_post_eliminado(sender, instance, **kwargs):
+    sync_service.registrar_borrado('post', instance.id)
+    sync_service.purgar_tombstones()
+
+
+@receiver(post_delete, sender=Publication)
+def registrar_tombstone_publicacion(sender, instance, **kwargs):
+    sync_service.registrar_borrado('publication', instance.id)
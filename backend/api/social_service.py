@@ -1,16 +1,25 @@
-import requests
 import os
 import json
 import time
+import threading
+import hashlib
+import datetime
+import urllib.parse
+import requests
+from django.conf import settings
+from django.utils import timezone
 from .retry_service import retry_with_backoff
 from .notification_service import log_api_call
+from .http_client import cliente
+from .cache_service import TTLCache
+from .media_service import ArchivoMapeado, es_url_de_media, resolver_media_local, tipo_mime
 
 # --- FACEBOOK ---
 @retry_with_backoff(max_attempts=3, initial_delay=2)
 def publicar_en_facebook(texto, image_url=None):
     """
     Publica texto o imagen con texto en una Página de Facebook usando Graph API.
-    Soporta URLs remotas y archivos locales (si la URL contiene '/media/').
+    Soporta URLs remotas y archivos locales (URLs bajo MEDIA_URL, ver media_service).
     """
     page_id = os.getenv('FACEBOOK_PAGE_ID')
     token = os.getenv('FACEBOOK_ACCESS_TOKEN')
@@ -30,31 +39,15 @@ def publicar_en_facebook(texto, image_url=None):
         # Cambiamos al endpoint de fotos
         url = f"https://graph.facebook.com/v19.0/{page_id}/photos"
         
-        # Lógica para detectar si es un archivo local (generado por nosotros)
-        # Asumimos que si tiene '/media/' es local y tratamos de buscar el archivo
-        local_path = None
-        if '/media/' in image_url:
-            try:
-                # Extraer la parte relativa desde /media/
-                # Ej: http://localhost:8000/media/generated_images/img.jpg -> generated_images/img.jpg
-                relative_path = image_url.split('/media/')[-1]
-                # Construir ruta absoluta en el sistema de archivos
-                # Asumimos que 'media' está en la raíz del proyecto (donde corre manage.py)
-                possible_path = os.path.join('media', relative_path)
-                # Decodificar URL (por si tiene espacios o caracteres especiales)
-                possible_path = urllib.parse.unquote(possible_path)
-                
-                if os.path.exists(possible_path):
-                    local_path = possible_path
-            except Exception as e:
-                print(f"Error resolviendo ruta local: {e}")
+        # Si es un archivo nuestro (bajo MEDIA_URL) se sube desde disco, sin pasar por la red
+        local_path = resolver_media_local(image_url)
 
         if local_path:
             # SUBIDA DE ARCHIVO BINARIO (Multipart)
             print(f"   📂 (FB) Subiendo archivo local: {local_path}")
             # 'source' es el campo para subir archivos en Graph API
             files = {
-                'source': open(local_path, 'rb')
+                'source': (os.path.basename(local_path), open(local_path, 'rb'), tipo_mime(local_path, 'image/jpeg'))
             }
             # Quitamos 'message' y usamos 'caption' para fotos
             del payload['message']
@@ -68,11 +61,12 @@ def publicar_en_facebook(texto, image_url=None):
 
     try:
         # Si hay files, requests usa multipart/form-data automáticamente
-        response = requests.post(url, data=payload, files=files)
-        
-        # Importante: Cerrar el archivo si lo abrimos
-        if files:
-            files['source'].close()
+        try:
+            response = cliente('facebook').post(url, data=payload, files=files)
+        finally:
+            # Importante: Cerrar el archivo si lo abrimos
+            if files:
+                files['source'][1].close()
             
         data = response.json()
         
@@ -92,12 +86,110 @@ def publicar_en_facebook(texto, image_url=None):
     except Exception as e:
         return {"platform": "facebook", "status": "error", "message": str(e)}
 
-# --- INSTAGRAM (MODIFICADA CON PAUSA) ---
+# --- INSTAGRAM ---
+# Tiempos de procesamiento observados por Meta, por tamaño de imagen (EWMA en segundos).
+# Se usan para elegir el primer delay del polling del contenedor.
+_tiempos_contenedor_ig = {}
+_tiempos_contenedor_lock = threading.Lock()
+_EWMA_ALPHA = 0.3
+_DELAY_INICIAL_IG = 3.0
+
+
+def _clave_tamano_imagen(image_url):
+    """
+    Agrupa las imágenes por tamaño (ej: '1024x1024') a partir de los parámetros
+    width/height de la URL (Pollinations los incluye). Si no hay, 'desconocido'.
+    """
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(image_url or '').query)
+    width = query.get('width', [None])[0]
+    height = query.get('height', [None])[0]
+    if width and height:
+        return f"{width}x{height}"
+    return "desconocido"
+
+
+def _estimar_procesamiento_ig(clave):
+    with _tiempos_contenedor_lock:
+        estimado = _tiempos_contenedor_ig.get(clave, _DELAY_INICIAL_IG)
+    # Nunca consultamos antes de 1s ni esperamos más de 30s para la primera consulta
+    return min(max(estimado, 1.0), 30.0)
+
+
+def _registrar_procesamiento_ig(clave, segundos):
+    with _tiempos_contenedor_lock:
+        previo = _tiempos_contenedor_ig.get(clave)
+        if previo is None:
+            _tiempos_contenedor_ig[clave] = segundos
+        else:
+            _tiempos_contenedor_ig[clave] = _EWMA_ALPHA * segundos + (1 - _EWMA_ALPHA) * previo
+
+
+def tiempos_procesamiento_instagram():
+    """
+    Devuelve una copia de los tiempos de procesamiento observados por tamaño.
+    """
+    with _tiempos_contenedor_lock:
+        return dict(_tiempos_contenedor_ig)
+
+
+def _consultar_contenedor_ig(creation_id, token):
+    """
+    Consulta el status_code del contenedor (IN_PROGRESS, FINISHED, ERROR, EXPIRED, PUBLISHED).
+    """
+    url = f"https://graph.facebook.com/v19.0/{creation_id}"
+    response = cliente('instagram').get(url, params={'fields': 'status_code', 'access_token': token})
+    data = response.json()
+    log_api_call("instagram", url, response.status_code, data)
+    return data.get('status_code'), data
+
+
+def _publicar_contenedor_ig(ig_user_id, token, creation_id):
+    """
+    PASO 2: Publica un contenedor ya procesado.
+    """
+    print("   🚀 (IG) Publicando ahora...")
+    url_step_2 = f"https://graph.facebook.com/v19.0/{ig_user_id}/media_publish"
+    payload_2 = {
+        'creation_id': creation_id,
+        'access_token': token
+    }
+
+    response_2 = cliente('instagram').post(url_step_2, data=payload_2)
+    data_2 = response_2.json()
+
+    log_api_call("instagram", url_step_2, response_2.status_code, data_2)
+
+    if response_2.status_code == 200:
+        media_id = data_2.get("id")
+        published_url = f"https://www.instagram.com/p/{media_id}/"
+        return {"platform": "instagram", "status": "success", "id": media_id, "url": published_url}
+    else:
+        return {"platform": "instagram", "status": "error", "step": "2", "message": data_2}
+
+
+def _siguiente_delay_ig(delay):
+    return min(delay * 1.5, 10.0)
+
+
+def _contenedor_ya_publicado_ig(creation_id):
+    """
+    El contenedor ya está PUBLISHED (ej. un intento anterior publicó pero no recibió la
+    respuesta): no se vuelve a llamar a media_publish.
+    """
+    print(f"   ✅ (IG) El contenedor {creation_id} ya estaba publicado.")
+    return {"platform": "instagram", "status": "success", "id": creation_id, "url": ""}
+
+
 @retry_with_backoff(max_attempts=2, initial_delay=3)
-def publicar_en_instagram(texto, image_url):
+def publicar_en_instagram(texto, image_url, diferido=False):
     """
     Publica una imagen con descripción en Instagram Business.
-    Flujo de 2 pasos con PAUSA de seguridad.
+    Flujo de 2 pasos: crear el contenedor y publicarlo cuando Meta termina de procesarlo.
+
+    En lugar de una pausa fija se consulta el status_code del contenedor con
+    backoff adaptativo. Con diferido=True (solo desde los workers de la cola) no se
+    espera: se devuelve status 'pending' con el creation_id para continuar luego
+    con continuar_publicacion_instagram().
     """
     ig_user_id = os.getenv('INSTAGRAM_ACCOUNT_ID')
     token = os.getenv('FACEBOOK_ACCESS_TOKEN')
@@ -112,6 +204,10 @@ def publicar_en_instagram(texto, image_url):
     if not image_url:
          return {"platform": "instagram", "status": "error", "message": "Instagram requiere una URL de imagen"}
 
+    # Meta descarga la imagen desde la URL pública; si es nuestra, comprobamos antes que exista
+    if es_url_de_media(image_url) and not resolver_media_local(image_url):
+        return {"platform": "instagram", "status": "error", "message": f"La imagen local no existe: {image_url}"}
+
     # PASO 1: Crear el contenedor (Subir la foto)
     url_step_1 = f"https://graph.facebook.com/v19.0/{ig_user_id}/media"
     payload_1 = {
@@ -122,7 +218,7 @@ def publicar_en_instagram(texto, image_url):
 
     try:
         print("   📸 (IG) Subiendo imagen a servidores de Meta...")
-        response_1 = requests.post(url_step_1, data=payload_1)
+        response_1 = cliente('instagram').post(url_step_1, data=payload_1)
         data_1 = response_1.json()
         
         log_api_call("instagram", url_step_1, response_1.status_code, data_1)
@@ -131,44 +227,163 @@ def publicar_en_instagram(texto, image_url):
              return {"platform": "instagram", "status": "error", "step": "1", "message": data_1}
         
         creation_id = data_1['id']
-        print(f"   ✅ (IG) Imagen subida (ID: {creation_id}).")
-
-        # --- PAUSA DE SEGURIDAD (EL FIX) ---
-        # Esperamos 25 segundos para asegurar que Meta procese la imagen
-        print("   ⏳ (IG) Esperando 25 segundos a que Meta procese la imagen...")
-        time.sleep(25) 
-        # -----------------------------------
-
-        # PASO 2: Publicar el contenedor
-        print("   🚀 (IG) Publicando ahora...")
-        url_step_2 = f"https://graph.facebook.com/v19.0/{ig_user_id}/media_publish"
-        payload_2 = {
-            'creation_id': creation_id,
-            'access_token': token
-        }
+        inicio = time.time()
+        clave = _clave_tamano_imagen(image_url)
+        delay = _estimar_procesamiento_ig(clave)
+        print(f"   ✅ (IG) Imagen subida (ID: {creation_id}). Procesamiento estimado: {delay:.1f}s")
 
-        response_2 = requests.post(url_step_2, data=payload_2)
-        data_2 = response_2.json()
-        
-        log_api_call("instagram", url_step_2, response_2.status_code, data_2)
+        if diferido:
+            return {
+                "platform": "instagram",
+                "status": "pending",
+                "creation_id": creation_id,
+                "started_at": inicio,
+                "size_key": clave,
+                "retry_after": delay
+            }
 
-        if response_2.status_code == 200:
-            media_id = data_2.get("id")
-            published_url = f"https://www.instagram.com/p/{media_id}/"
-            return {"platform": "instagram", "status": "success", "id": media_id, "url": published_url}
-        else:
-             return {"platform": "instagram", "status": "error", "step": "2", "message": data_2}
+        # Polling del contenedor hasta que Meta lo marque como FINISHED
+        max_wait = settings.INSTAGRAM_CONTAINER_MAX_WAIT
+        while True:
+            time.sleep(delay)
+            status_code, data_status = _consultar_contenedor_ig(creation_id, token)
+
+            if status_code == 'FINISHED':
+                _registrar_procesamiento_ig(clave, time.time() - inicio)
+                return _publicar_contenedor_ig(ig_user_id, token, creation_id)
+
+            if status_code == 'PUBLISHED':
+                return _contenedor_ya_publicado_ig(creation_id)
+
+            if status_code in ('ERROR', 'EXPIRED'):
+                return {"platform": "instagram", "status": "error", "step": "1_status", "message": data_status}
+
+            if time.time() - inicio + delay > max_wait:
+                return {
+                    "platform": "instagram",
+                    "status": "error",
+                    "step": "1_status",
+                    "message": f"El contenedor {creation_id} no terminó de procesarse en {max_wait}s"
+                }
+
+            print(f"   ⏳ (IG) Contenedor en estado {status_code}, reintentando en {delay:.1f}s...")
+            delay = _siguiente_delay_ig(delay)
+
+    except Exception as e:
+        return {"platform": "instagram", "status": "error", "message": str(e)}
+
+
+def continuar_publicacion_instagram(creation_id, started_at, size_key="desconocido", retry_after=None):
+    """
+    Continuación del modo diferido: consulta una vez el contenedor y lo publica si
+    ya está listo. Si sigue procesándose devuelve 'pending' con el siguiente delay.
+    """
+    ig_user_id = os.getenv('INSTAGRAM_ACCOUNT_ID')
+    token = os.getenv('FACEBOOK_ACCESS_TOKEN')
+
+    try:
+        status_code, data_status = _consultar_contenedor_ig(creation_id, token)
+
+        if status_code == 'FINISHED':
+            _registrar_procesamiento_ig(size_key, time.time() - started_at)
+            return _publicar_contenedor_ig(ig_user_id, token, creation_id)
+
+        if status_code == 'PUBLISHED':
+            return _contenedor_ya_publicado_ig(creation_id)
+
+        if status_code in ('ERROR', 'EXPIRED'):
+            return {"platform": "instagram", "status": "error", "step": "1_status", "message": data_status}
+
+        if time.time() - started_at > settings.INSTAGRAM_CONTAINER_MAX_WAIT:
+            return {
+                "platform": "instagram",
+                "status": "error",
+                "step": "1_status",
+                "message": f"El contenedor {creation_id} no terminó de procesarse a tiempo"
+            }
+
+        return {
+            "platform": "instagram",
+            "status": "pending",
+            "creation_id": creation_id,
+            "started_at": started_at,
+            "size_key": size_key,
+            "retry_after": _siguiente_delay_ig(retry_after or _DELAY_INICIAL_IG)
+        }
 
     except Exception as e:
         return {"platform": "instagram", "status": "error", "message": str(e)}
 
 # --- LINKEDIN ---
+# URN del miembro por token: memoria del proceso + respaldo en BD (MemberURNCache)
+_urn_linkedin_cache = TTLCache(maxsize=16, ttl=settings.LINKEDIN_URN_CACHE_TTL)
+
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def obtener_urn_linkedin(token, headers):
+    """
+    Devuelve (urn, error). Solo llama a /v2/userinfo si el URN del token no está
+    en memoria ni en la BD (o ya expiró).
+    """
+    from .models import MemberURNCache
+
+    token_hash = _hash_token(token)
+    urn = _urn_linkedin_cache.get(token_hash)
+    if urn:
+        return urn, None
+
+    ttl = settings.LINKEDIN_URN_CACHE_TTL
+    cacheado = MemberURNCache.objects.filter(
+        token_hash=token_hash,
+        fetched_at__gte=timezone.now() - datetime.timedelta(seconds=ttl)
+    ).first()
+    if cacheado:
+        _urn_linkedin_cache.set(token_hash, cacheado.urn)
+        return cacheado.urn, None
+
+    # PASO 1: OBTENER DATOS DEL USUARIO (getUserInfo)
+    # Documentación: https://learn.microsoft.com/en-us/linkedin/consumer/integrations/self-serve/sign-in-with-linkedin-v2#api-request-to-retreive-member-details
+    user_info_url = "https://api.linkedin.com/v2/userinfo"
+    resp_user = cliente('linkedin').get(user_info_url, headers=headers)
+
+    log_api_call("linkedin", user_info_url, resp_user.status_code)
+
+    if resp_user.status_code != 200:
+        return None, resp_user.json()
+
+    user_data = resp_user.json()
+    urn = f"urn:li:person:{user_data['sub']}" # Construimos el URN: urn:li:person:ID
+
+    # Guardamos el nuevo URN y descartamos los de tokens anteriores
+    MemberURNCache.objects.update_or_create(
+        token_hash=token_hash,
+        defaults={'plataforma': 'linkedin', 'urn': urn, 'fetched_at': timezone.now()}
+    )
+    MemberURNCache.objects.filter(plataforma='linkedin').exclude(token_hash=token_hash).delete()
+    _urn_linkedin_cache.set(token_hash, urn)
+    return urn, None
+
+
+def invalidar_urn_linkedin(token):
+    """
+    Borra el URN cacheado del token (ej. cuando LinkedIn responde 401).
+    """
+    from .models import MemberURNCache
+
+    token_hash = _hash_token(token)
+    _urn_linkedin_cache.delete(token_hash)
+    MemberURNCache.objects.filter(token_hash=token_hash).delete()
+
+
 @retry_with_backoff(max_attempts=3, initial_delay=2)
 def publicar_en_linkedin(texto):
     """
-    Publica en LinkedIn en 2 pasos:
-    1. Obtiene el ID del usuario (URN) dinámicamente.
-    2. Crea el post UGC (User Generated Content).
+    Publica en LinkedIn creando un post UGC (User Generated Content).
+    El URN del autor se obtiene de la caché (ver obtener_urn_linkedin), así que
+    normalmente basta una sola llamada a la API.
     """
     token = os.getenv('LINKEDIN_ACCESS_TOKEN')
 
@@ -182,42 +397,21 @@ def publicar_en_linkedin(texto):
     }
 
     try:
-        # PASO 1: OBTENER DATOS DEL USUARIO (getUserInfo)
-        # Documentación: https://learn.microsoft.com/en-us/linkedin/consumer/integrations/self-serve/sign-in-with-linkedin-v2#api-request-to-retreive-member-details
-        user_info_url = "https://api.linkedin.com/v2/userinfo"
-        resp_user = requests.get(user_info_url, headers=headers)
-        
-        log_api_call("linkedin", user_info_url, resp_user.status_code)
-        
-        if resp_user.status_code != 200:
-            return {"platform": "linkedin", "status": "error", "step": "1_user_info", "message": resp_user.json()}
-        
-        user_data = resp_user.json()
-        person_urn = f"urn:li:person:{user_data['sub']}" # Construimos el URN: urn:li:person:ID
-        
-        # PASO 2: PUBLICAR ARTÍCULO (postArticle)
-        post_url = "https://api.linkedin.com/v2/ugcPosts"
-        
-        payload = {
-            "author": person_urn,
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {
-                        "text": texto
-                    },
-                    "shareMediaCategory": "NONE"
-                }
-            },
-            "visibility": {
-                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
-            }
-        }
+        person_urn, error = obtener_urn_linkedin(token, headers)
+        if error:
+            return {"platform": "linkedin", "status": "error", "step": "1_user_info", "message": error}
+
+        resp_post = _crear_ugc_post_linkedin(texto, person_urn, headers)
+
+        if resp_post.status_code == 401:
+            # Token revocado o URN obsoleto: invalidamos la caché y reintentamos una vez
+            invalidar_urn_linkedin(token)
+            person_urn, error = obtener_urn_linkedin(token, headers)
+            if error:
+                return {"platform": "linkedin", "status": "error", "step": "1_user_info", "message": error}
+            resp_post = _crear_ugc_post_linkedin(texto, person_urn, headers)
 
-        resp_post = requests.post(post_url, headers=headers, json=payload)
         post_data = resp_post.json()
-        
-        log_api_call("linkedin", post_url, resp_post.status_code, post_data)
 
         if resp_post.status_code == 201:
             post_id = post_data.get("id")
@@ -228,6 +422,32 @@ def publicar_en_linkedin(texto):
 
     except Exception as e:
         return {"platform": "linkedin", "status": "error", "message": str(e)}
+
+
+def _crear_ugc_post_linkedin(texto, person_urn, headers):
+    # PASO 2: PUBLICAR ARTÍCULO (postArticle)
+    post_url = "https://api.linkedin.com/v2/ugcPosts"
+    
+    payload = {
+        "author": person_urn,
+        "lifecycleState": "PUBLISHED",
+        "specificContent": {
+            "com.linkedin.ugc.ShareContent": {
+                "shareCommentary": {
+                    "text": texto
+                },
+                "shareMediaCategory": "NONE"
+            }
+        },
+        "visibility": {
+            "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
+        }
+    }
+
+    resp_post = cliente('linkedin').post(post_url, headers=headers, json=payload)
+    log_api_call("linkedin", post_url, resp_post.status_code, resp_post.json())
+    return resp_post
+
 # --- WHATSAPP (Twilio) ---
 @retry_with_backoff(max_attempts=3, initial_delay=1)
 def publicar_en_whatsapp(texto, numero_destino):
@@ -249,7 +469,7 @@ def publicar_en_whatsapp(texto, numero_destino):
     }
 
     try:
-        response = requests.post(url, data=data, auth=(account_sid, auth_token))
+        response = cliente('whatsapp').post(url, data=data, auth=(account_sid, auth_token))
         response_data = response.json()
         
         log_api_call("whatsapp", url, response.status_code, response_data)
@@ -262,11 +482,9 @@ def publicar_en_whatsapp(texto, numero_destino):
         return {"platform": "whatsapp", "status": "error", "message": str(e)}
 
 # --- TIKTOK ---
-import hashlib
 import base64
 import secrets
 import string
-import urllib.parse
 
 def generate_pkce_pair():
     """
@@ -339,17 +557,282 @@ def get_tiktok_access_token(code, code_verifier):
     }
     
     try:
-        response = requests.post(url, headers=headers, data=data)
+        response = cliente('tiktok').post(url, headers=headers, data=data)
         data = response.json()
         log_api_call("tiktok_auth", url, response.status_code, data)
         return data
     except Exception as e:
         return {"error": str(e)}
 
+# Reglas de FILE_UPLOAD de TikTok: chunks de 5 MB a 64 MB; el último absorbe el resto
+# (hasta 128 MB). Los videos de menos de 5 MB se suben en un solo chunk.
+TIKTOK_MIN_CHUNK = 5 * 1024 * 1024
+TIKTOK_MAX_CHUNK = 64 * 1024 * 1024
+_TAMANO_LECTURA = 256 * 1024
+
+
+def planificar_chunks_tiktok(video_size, chunk_preferido=None):
+    """
+    Devuelve (chunk_size, total_chunk_count) para un video de `video_size` bytes.
+    """
+    if video_size < TIKTOK_MIN_CHUNK:
+        return video_size, 1
+
+    chunk_size = chunk_preferido or settings.TIKTOK_CHUNK_SIZE
+    chunk_size = min(max(chunk_size, TIKTOK_MIN_CHUNK), TIKTOK_MAX_CHUNK, video_size)
+    return chunk_size, video_size // chunk_size
+
+
+class _DescargaReanudable:
+    """
+    Descarga en streaming de un video remoto. `leer(n)` devuelve los siguientes n bytes
+    sin cargar el resto del archivo en memoria; si la conexión se corta, la descarga
+    se reanuda con una cabecera Range desde el último byte recibido.
+    """
+    def __init__(self, url, max_reanudaciones=None):
+        self.url = url
+        self.max_reanudaciones = settings.TIKTOK_DOWNLOAD_MAX_RESUMES if max_reanudaciones is None else max_reanudaciones
+        self.recibidos = 0
+        self.reanudaciones = 0
+        self._respuesta = None
+        self._trozos = None
+        self._pendiente = b''
+
+    def abrir(self):
+        """
+        Abre la conexión y devuelve el tamaño total del video (Content-Length).
+        """
+        self._conectar()
+        video_size = int(self._respuesta.headers.get('Content-Length') or 0)
+        if not video_size:
+            self.cerrar()
+            raise IOError("El servidor no informa el tamaño del video (Content-Length)")
+        return video_size
+
+    def _conectar(self):
+        headers = {'Range': f'bytes={self.recibidos}-'} if self.recibidos else {}
+        respuesta = cliente('media').get(self.url, headers=headers, stream=True)
+        esperado = 206 if self.recibidos else 200
+        if respuesta.status_code != esperado:
+            respuesta.close()
+            raise IOError(f"No se pudo descargar el video (HTTP {respuesta.status_code})")
+        self._respuesta = respuesta
+        self._trozos = respuesta.iter_content(chunk_size=_TAMANO_LECTURA)
+
+    def leer(self, n):
+        buffer = bytearray(self._pendiente)
+        self._pendiente = b''
+        while len(buffer) < n:
+            try:
+                trozo = next(self._trozos, None)
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                if self.reanudaciones >= self.max_reanudaciones:
+                    raise
+                self.reanudaciones += 1
+                print(f"   🔁 Descarga interrumpida ({e}); reanudando desde el byte {self.recibidos}...")
+                self._respuesta.close()
+                self._conectar()
+                continue
+            if trozo is None:
+                break
+            self.recibidos += len(trozo)
+            buffer += trozo
+
+        if len(buffer) > n:
+            self._pendiente = bytes(buffer[n:])
+            del buffer[n:]
+        return buffer
+
+    def cerrar(self):
+        if self._respuesta is not None:
+            self._respuesta.close()
+            self._respuesta = None
+
+
+def _put_chunk_tiktok(upload_url, datos, inicio, fin, video_size):
+    """
+    Sube un chunk con su Content-Range. Si falla se reintenta SOLO ese chunk.
+    """
+    max_intentos = settings.TIKTOK_CHUNK_MAX_RETRIES
+    for intento in range(1, max_intentos + 1):
+        upload_headers = {
+            'Content-Type': 'video/mp4',
+            'Content-Length': str(fin - inicio + 1),
+            'Content-Range': f'bytes {inicio}-{fin}/{video_size}'
+        }
+        try:
+            upload_resp = cliente('tiktok_upload').put(upload_url, headers=upload_headers, data=datos)
+            # 206: chunk recibido, faltan más; 200/201: subida completa
+            if upload_resp.status_code in [200, 201, 206]:
+                return
+            error = f"HTTP {upload_resp.status_code}: {upload_resp.text}"
+            if upload_resp.status_code < 500 and upload_resp.status_code != 429:
+                raise RuntimeError(error)
+        except requests.exceptions.RequestException as e:
+            error = str(e)
+
+        if intento < max_intentos:
+            print(f"   🔁 Chunk bytes {inicio}-{fin} falló ({error}); reintento {intento}/{max_intentos - 1}...")
+            time.sleep(2 * intento)
+
+    raise RuntimeError(f"Chunk bytes {inicio}-{fin}: {error}")
+
+
+def _subir_chunks_tiktok(upload_url, lector, video_size, chunk_size, total_chunks):
+    """
+    Lee cada chunk del origen y lo sube de inmediato: en memoria solo hay un chunk a la vez.
+    """
+    for indice in range(total_chunks):
+        inicio = indice * chunk_size
+        fin = video_size - 1 if indice == total_chunks - 1 else inicio + chunk_size - 1
+        datos = lector.leer(fin - inicio + 1)
+        if len(datos) != fin - inicio + 1:
+            raise IOError(f"Descarga incompleta: se esperaban {fin + 1} bytes y llegaron {inicio + len(datos)}")
+        _put_chunk_tiktok(upload_url, datos, inicio, fin, video_size)
+        print(f"   ⬆️ Chunk {indice + 1}/{total_chunks} subido.")
+        del datos
+
+
+def _dominio_verificado_tiktok(video_url):
+    """
+    True si el host de la URL está en TIKTOK_PULL_DOMAINS (dominios verificados en el
+    portal de TikTok). Se aceptan también subdominios: 'pexels.com' cubre 'videos.pexels.com'.
+    """
+    host = (urllib.parse.urlparse(video_url or '').hostname or '').lower()
+    return any(host == dominio or host.endswith(f".{dominio}") for dominio in settings.TIKTOK_PULL_DOMAINS)
+
+
+def _modo_origen_tiktok(video_url):
+    """
+    Elige la fuente del video según TIKTOK_SOURCE_MODE:
+    'file' siempre FILE_UPLOAD, 'pull' siempre PULL_FROM_URL y
+    'auto' PULL_FROM_URL solo para dominios verificados.
+    """
+    modo = settings.TIKTOK_SOURCE_MODE
+    if resolver_media_local(video_url):
+        return 'FILE_UPLOAD'  # Archivo nuestro: se sube desde disco
+    if modo == 'pull' or (modo == 'auto' and _dominio_verificado_tiktok(video_url)):
+        return 'PULL_FROM_URL'
+    return 'FILE_UPLOAD'
+
+
+def _error_tiktok(data):
+    """
+    Traduce el error de la respuesta de TikTok al dict de resultado.
+    """
+    error_msg = data.get('error', {}).get('message', 'Error desconocido')
+    error_code = data.get('error', {}).get('code', 'unknown')
+
+    # Mensajes de error específicos
+    if error_code == 'access_token_invalid':
+        message = "Token expirado. Vuelve a autenticarte en /api/tiktok/auth/"
+    elif error_code == 'scope_not_authorized':
+        message = "Falta el permiso 'video.publish'. Solicítalo en el Portal de TikTok y re-autentícate."
+    else:
+        message = f"Error de TikTok: {error_msg} (Código: {error_code})"
+    return {"platform": "tiktok", "status": "error", "code": error_code, "message": message}
+
+
+def _iniciar_publicacion_tiktok(headers, source_info, post_info):
+    """
+    Paso 1: Inicializa la publicación (DIRECT POST). Devuelve (data, error).
+    """
+    # Endpoint para publicación directa (NO inbox)
+    init_url = "https://open.tiktokapis.com/v2/post/publish/video/init/"
+    init_payload = {"source_info": source_info}
+    if post_info:
+        init_payload["post_info"] = post_info
+
+    print(f"   🎬 (TikTok) Inicializando publicación ({source_info['source']})...")
+    response = cliente('tiktok').post(init_url, headers=headers, json=init_payload)
+    data = response.json()
+
+    log_api_call("tiktok_publish_init", init_url, response.status_code, data)
+
+    if response.status_code == 200 and data.get('data'):
+        return data['data'], None
+    return None, _error_tiktok(data)
+
+
+def _exito_tiktok(publish_id, upload_mode):
+    return {
+        "platform": "tiktok",
+        "status": "success",
+        "id": publish_id,
+        "upload_mode": upload_mode,
+        "message": "Video publicado exitosamente en TikTok (Direct Post).",
+        "url": f"https://www.tiktok.com/@me/video/{publish_id}" if publish_id else None
+    }
+
+
+def _publicar_tiktok_pull_from_url(video_url, headers, post_info):
+    """
+    TikTok descarga el video directamente desde `video_url` (dominio verificado):
+    una sola llamada a la API, sin pasar el binario por nuestro servidor.
+    """
+    source_info = {"source": "PULL_FROM_URL", "video_url": video_url}
+    datos, error = _iniciar_publicacion_tiktok(headers, source_info, post_info)
+    if error:
+        return error
+    return _exito_tiktok(datos.get('publish_id'), 'PULL_FROM_URL')
+
+
+def _publicar_tiktok_file_upload(video_url, headers, post_info):
+    """
+    Sube el video por chunks con FILE_UPLOAD. Si es un archivo nuestro se lee de disco
+    con mmap; si no, se descarga en streaming (evita problemas de verificación de dominio, ej. ngrok).
+    """
+    local_path = resolver_media_local(video_url)
+    if local_path:
+        print(f"   📂 Usando archivo local: {local_path}")
+        descarga = ArchivoMapeado(local_path)
+    else:
+        # Solo se abre la conexión: el contenido se va leyendo chunk a chunk durante la subida.
+        print(f"   📥 Abriendo descarga del video desde {video_url}...")
+        descarga = _DescargaReanudable(video_url)
+
+    try:
+        video_size = descarga.abrir()
+    except Exception as e:
+        return {"platform": "tiktok", "status": "error", "message": f"Error descargando video: {str(e)}"}
+
+    try:
+        chunk_size, total_chunks = planificar_chunks_tiktok(video_size)
+        print(f"   📦 Video de {video_size} bytes: {total_chunks} chunk(s) de {chunk_size} bytes.")
+
+        source_info = {
+            "source": "FILE_UPLOAD",
+            "video_size": video_size,
+            "chunk_size": chunk_size,
+            "total_chunk_count": total_chunks
+        }
+        datos, error = _iniciar_publicacion_tiktok(headers, source_info, post_info)
+        if error:
+            return error
+
+        # Paso 2: Subir el archivo binario por chunks (Content-Range)
+        print(f"   ⬆️ Subiendo archivo a TikTok...")
+        try:
+            _subir_chunks_tiktok(datos.get('upload_url'), descarga, video_size, chunk_size, total_chunks)
+        except Exception as e:
+            return {
+                "platform": "tiktok", 
+                "status": "error", 
+                "message": f"Error subiendo binario: {e}"
+            }
+
+        return _exito_tiktok(datos.get('publish_id'), 'FILE_UPLOAD')
+    finally:
+        descarga.cerrar()
+
+
 def publicar_en_tiktok(video_url, titulo="", descripcion=""):
     """
     Publica un video en TikTok usando la Content Posting API (Direct Post).
     Requiere el scope 'video.publish'.
+
+    Usa PULL_FROM_URL para dominios verificados (ver TIKTOK_SOURCE_MODE y
+    TIKTOK_PULL_DOMAINS) y, si no aplica o falla, FILE_UPLOAD por chunks.
     
     Args:
         video_url: URL del video a publicar (debe ser accesible públicamente)
@@ -357,7 +840,7 @@ def publicar_en_tiktok(video_url, titulo="", descripcion=""):
         descripcion: Descripción/caption del video (opcional)
     
     Returns:
-        dict con status y detalles de la publicación
+        dict con status, detalles de la publicación y 'upload_mode' usado
     """
     from .models import SocialCredential
     
@@ -371,41 +854,17 @@ def publicar_en_tiktok(video_url, titulo="", descripcion=""):
             "status": "error",
             "message": "No hay token de TikTok. Debes autenticarte primero en /api/tiktok/auth/"
         }
-    
-    # Descargar el video primero para evitar problemas de verificación de dominio (ngrok)
-    print(f"   📥 Descargando video desde {video_url}...")
-    try:
-        video_response = requests.get(video_url)
-        if video_response.status_code != 200:
-             return {"platform": "tiktok", "status": "error", "message": "No se pudo descargar el video de la URL proporcionada."}
-        video_content = video_response.content
-        video_size = len(video_content)
-        print(f"   📦 Video descargado ({video_size} bytes).")
-    except Exception as e:
-        return {"platform": "tiktok", "status": "error", "message": f"Error descargando video: {str(e)}"}
 
-    # Paso 1: Inicializar el upload (DIRECT POST)
-    # Endpoint para publicación directa (NO inbox)
-    init_url = "https://open.tiktokapis.com/v2/post/publish/video/init/"
     headers = {
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json; charset=UTF-8'
     }
-    
-    # Preparar el payload de inicialización para FILE_UPLOAD
-    init_payload = {
-        "source_info": {
-            "source": "FILE_UPLOAD",
-            "video_size": video_size,
-            "chunk_size": video_size,
-            "total_chunk_count": 1
-        }
-    }
-    
+
     # Si hay título o descripción, agregarlos
+    post_info = None
     if titulo or descripcion:
         caption = f"{titulo}\n\n{descripcion}" if titulo and descripcion else (titulo or descripcion)
-        init_payload["post_info"] = {
+        post_info = {
             "title": caption[:150],  # TikTok limita a 150 caracteres
             "privacy_level": "SELF_ONLY",  # Restricción de TikTok para Apps no auditadas: Solo Privado
             "disable_duet": False,
@@ -413,66 +872,17 @@ def publicar_en_tiktok(video_url, titulo="", descripcion=""):
             "disable_stitch": False,
             "video_cover_timestamp_ms": 1000
         }
-    
+
     try:
-        print(f"   🎬 (TikTok) Inicializando carga de video...")
-        response = requests.post(init_url, headers=headers, json=init_payload)
-        data = response.json()
-        
-        log_api_call("tiktok_publish_init", init_url, response.status_code, data)
-        
-        if response.status_code == 200 and data.get('data'):
-            publish_id = data['data'].get('publish_id')
-            upload_url = data['data'].get('upload_url')
-            
-            # Paso 2: Subir el archivo binario
-            print(f"   ⬆️ Subiendo archivo a TikTok...")
-            upload_headers = {
-                'Content-Type': 'video/mp4',
-                'Content-Length': str(video_size),
-                'Content-Range': f'bytes 0-{video_size-1}/{video_size}'
-            }
-            
-            upload_resp = requests.put(upload_url, headers=upload_headers, data=video_content)
-            
-            if upload_resp.status_code not in [200, 201]:
-                return {
-                    "platform": "tiktok", 
-                    "status": "error", 
-                    "message": f"Error subiendo binario: {upload_resp.text}"
-                }
+        if _modo_origen_tiktok(video_url) == 'PULL_FROM_URL':
+            resultado = _publicar_tiktok_pull_from_url(video_url, headers, post_info)
+            # Errores de token/permisos fallarían igual con FILE_UPLOAD
+            if resultado['status'] == 'success' or resultado.get('code') in ('access_token_invalid', 'scope_not_authorized'):
+                return resultado
+            print(f"   ↩️ PULL_FROM_URL falló ({resultado['message']}); usando FILE_UPLOAD...")
+
+        return _publicar_tiktok_file_upload(video_url, headers, post_info)
 
-            return {
-                "platform": "tiktok",
-                "status": "success",
-                "id": publish_id,
-                "message": "Video publicado exitosamente en TikTok (Direct Post).",
-                "url": f"https://www.tiktok.com/@me/video/{publish_id}" if publish_id else None
-            }
-        else:
-            error_msg = data.get('error', {}).get('message', 'Error desconocido')
-            error_code = data.get('error', {}).get('code', 'unknown')
-            
-            # Mensajes de error específicos
-            if error_code == 'access_token_invalid':
-                return {
-                    "platform": "tiktok",
-                    "status": "error",
-                    "message": "Token expirado. Vuelve a autenticarte en /api/tiktok/auth/"
-                }
-            elif error_code == 'scope_not_authorized':
-                return {
-                    "platform": "tiktok",
-                    "status": "error",
-                    "message": "Falta el permiso 'video.publish'. Solicítalo en el Portal de TikTok y re-autentícate."
-                }
-            else:
-                return {
-                    "platform": "tiktok",
-                    "status": "error",
-                    "message": f"Error de TikTok: {error_msg} (Código: {error_code})"
-                }
-                
     except Exception as e:
         return {
             "platform": "tiktok",
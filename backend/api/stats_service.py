@@ -0,0 +1,288 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DurationField, ExpressionWrapper, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Post, Publication, PublicationStat
+from . import event_bus
+
+# Rollup de estadísticas: PublicationStat guarda cuántas Publicaciones hay en cada
+# (día de creación del Post, plataforma, estado). Cada cambio de estado resta 1 a la
+# fila del estado anterior y suma 1 a la del nuevo, así que consultar las estadísticas
+# cuesta O(días × plataformas × estados) y no depende del número de Publicaciones.
+#
+# Además se mantiene el resumen desnormalizado de cada Post (total_<estado>,
+# ultima_publicacion, ultimo_error_plataforma) para que el listado no cargue Publicaciones.
+#
+# Los save() se registran desde las señales (signals.py); los bulk_create y los
+# .update() no emiten señales y llaman aquí explícitamente. Al ser el único punto por
+# el que pasan todos los cambios de estado, también se publican en el bus de eventos.
+
+
+def _fecha_post(pub):
+    if Publication.post.is_cached(pub):
+        return pub.post.fecha_creacion
+    return Post.objects.filter(id=pub.post_id).values_list('fecha_creacion', flat=True).first()
+
+
+def _segundos_hasta_publicar(pub, fecha_post):
+    if not pub.fecha_publicacion:
+        return 0
+    return max(int((pub.fecha_publicacion - fecha_post).total_seconds()), 0)
+
+
+def _sumar(dia, plataforma, estado, total, segundos=0):
+    filtro = {'dia': dia, 'plataforma': plataforma, 'estado': estado}
+    cambios = {
+        'total': F('total') + total,
+        'segundos_hasta_publicar': F('segundos_hasta_publicar') + segundos,
+    }
+    if PublicationStat.objects.filter(**filtro).update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            PublicationStat.objects.create(**filtro, total=total, segundos_hasta_publicar=segundos)
+    except IntegrityError:
+        # Otro proceso creó la fila a la vez
+        PublicationStat.objects.filter(**filtro).update(**cambios)
+
+
+def registrar_cambio(pub, nuevo, anterior=None):
+    """
+    Mueve la Publicación en el rollup de `anterior` (por defecto, el estado leído de BD)
+    a `nuevo`. Un estado vacío ('') significa "no existía" / "ya no existe".
+    """
+    if anterior is None:
+        anterior = getattr(pub, '_estado_bd', None)
+    pub._estado_bd = nuevo
+    if anterior == nuevo:
+        return
+
+    _actualizar_resumen_post(pub, anterior, nuevo)
+    event_bus.publicar_transicion(pub, anterior, nuevo)
+
+    fecha_post = _fecha_post(pub)
+    if fecha_post is None:
+        return  # El Post ya no existe: lo corregirá reconstruir()
+    dia = timezone.localdate(fecha_post)
+    segundos = _segundos_hasta_publicar(pub, fecha_post)
+
+    if anterior:
+        _sumar(dia, pub.plataforma, anterior, -1, -segundos if anterior == 'published' else 0)
+    if nuevo:
+        _sumar(dia, pub.plataforma, nuevo, 1, segundos if nuevo == 'published' else 0)
+
+
+def registrar_creadas(pubs):
+    """
+    Suma al rollup las Publicaciones creadas con bulk_create (un UPDATE por grupo).
+    """
+    grupos = {}
+    por_post = {}
+    for pub in pubs:
+        fecha_post = _fecha_post(pub)
+        clave = (timezone.localdate(fecha_post), pub.plataforma, pub.estado)
+        grupos[clave] = grupos.get(clave, 0) + 1
+        estados = por_post.setdefault(pub.post_id, {})
+        estados[pub.estado] = estados.get(pub.estado, 0) + 1
+        pub._estado_bd = pub.estado
+    for (dia, plataforma, estado), total in grupos.items():
+        _sumar(dia, plataforma, estado, total)
+    for post_id, estados in por_post.items():
+        Post.objects.filter(id=post_id).update(updated_at=timezone.now(), **{
+            campo_total(estado): F(campo_total(estado)) + total for estado, total in estados.items()
+        })
+
+
+def actualizar_estado(pub, estado, **campos):
+    """
+    Cambia el estado (y `campos`) con un UPDATE condicional sobre el estado leído de BD,
+    no el de la instancia en memoria, y mueve el rollup desde ese estado: si dos procesos
+    cambian la misma Publicación a la vez, cada uno resta del estado que de verdad
+    reemplazó. Devuelve el estado anterior (None si la Publicación ya no existe).
+    """
+    with transaction.atomic():
+        while True:
+            anterior = Publication.objects.filter(id=pub.id).values_list('estado', flat=True).first()
+            if anterior is None:
+                return None
+            actualizadas = (
+                Publication.objects.filter(id=pub.id, estado=anterior)
+                .update(estado=estado, updated_at=timezone.now(), **campos)
+            )
+            if actualizadas:
+                break
+            # Otro proceso cambió el estado entre la lectura y el UPDATE: se vuelve a leer
+
+        pub.estado = estado
+        for campo, valor in campos.items():
+            setattr(pub, campo, valor)
+        registrar_cambio(pub, estado, anterior=anterior)
+    return anterior
+
+
+# --- RESUMEN POR POST ---
+
+def campo_total(estado):
+    return f'total_{estado}'
+
+
+def _actualizar_resumen_post(pub, anterior, nuevo):
+    cambios = {'updated_at': timezone.now()}
+    if anterior:
+        cambios[campo_total(anterior)] = F(campo_total(anterior)) - 1
+    if nuevo:
+        cambios[campo_total(nuevo)] = F(campo_total(nuevo)) + 1
+
+    if nuevo == 'published' and pub.fecha_publicacion:
+        fecha = pub.fecha_publicacion
+        cambios['ultima_publicacion'] = Case(
+            When(Q(ultima_publicacion__isnull=True) | Q(ultima_publicacion__lt=fecha), then=Value(fecha)),
+            default=F('ultima_publicacion'),
+        )
+    if nuevo == 'failed':
+        cambios['ultimo_error_plataforma'] = pub.plataforma
+    elif anterior == 'failed':
+        # Era la última fallida (los F() del UPDATE ven el valor anterior)
+        cambios['ultimo_error_plataforma'] = Case(
+            When(total_failed__lte=1, then=Value(None)),
+            default=F('ultimo_error_plataforma'),
+        )
+
+    Post.objects.filter(id=pub.post_id).update(**cambios)
+
+
+def expresiones_resumen_posts(publicaciones):
+    """
+    Expresiones para recalcular con un solo UPDATE el resumen de todos los Posts
+    (`publicaciones` es un queryset de Publication).
+    """
+    def contar(estado):
+        total = (
+            publicaciones.filter(post=OuterRef('pk'), estado=estado)
+            .order_by().values('post').annotate(total=Count('id')).values('total')
+        )
+        return Coalesce(Subquery(total, output_field=IntegerField()), 0)
+
+    ultima = (
+        publicaciones.filter(post=OuterRef('pk'), estado='published')
+        .order_by().values('post').annotate(ultima=Max('fecha_publicacion')).values('ultima')
+    )
+    ultimo_error = (
+        publicaciones.filter(post=OuterRef('pk'), estado='failed')
+        .order_by('-id').values('plataforma')[:1]
+    )
+    return {
+        **{campo_total(estado): contar(estado) for estado, _ in Publication.ESTADOS},
+        'ultima_publicacion': Subquery(ultima),
+        'ultimo_error_plataforma': Subquery(ultimo_error),
+    }
+
+
+# --- RECONSTRUCCIÓN ---
+
+def calcular_rollup(publicaciones):
+    """
+    Filas del rollup calculadas desde cero con un GROUP BY sobre `publicaciones`
+    (un queryset de Publication).
+    """
+    duracion = ExpressionWrapper(F('fecha_publicacion') - F('post__fecha_creacion'), output_field=DurationField())
+    filas = (
+        publicaciones
+        .annotate(dia=TruncDate('post__fecha_creacion'))
+        .values('dia', 'plataforma', 'estado')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    publicadas = {
+        (fila['dia'], fila['plataforma']): fila['duracion']
+        for fila in (
+            publicaciones
+            .filter(estado='published', fecha_publicacion__isnull=False)
+            .annotate(dia=TruncDate('post__fecha_creacion'))
+            .values('dia', 'plataforma')
+            .annotate(duracion=Sum(duracion))
+            .order_by()
+        )
+    }
+
+    resultado = []
+    for fila in filas:
+        segundos = 0
+        if fila['estado'] == 'published':
+            duracion_total = publicadas.get((fila['dia'], fila['plataforma']))
+            segundos = max(int(duracion_total.total_seconds()), 0) if duracion_total else 0
+        resultado.append({**fila, 'segundos_hasta_publicar': segundos})
+    return resultado
+
+
+def reconstruir():
+    """
+    Recalcula el rollup completo y el resumen de cada Post (ej. tras cambios hechos
+    con SQL). Devuelve el número de filas del rollup.
+    """
+    filas = calcular_rollup(Publication.objects.all())
+    with transaction.atomic():
+        PublicationStat.objects.all().delete()
+        PublicationStat.objects.bulk_create([PublicationStat(**fila) for fila in filas])
+        Post.objects.update(updated_at=timezone.now(), **expresiones_resumen_posts(Publication.objects.all()))
+    return len(filas)
+
+
+# --- CONSULTA ---
+
+def _resumen(por_estado, segundos):
+    publicadas = por_estado.get('published', 0)
+    terminadas = publicadas + por_estado.get('failed', 0)
+    return {
+        "total": sum(por_estado.values()),
+        "por_estado": por_estado,
+        # Publicadas sobre las que ya terminaron (publicadas + fallidas)
+        "tasa_exito": round(publicadas / terminadas, 4) if terminadas else None,
+        "tiempo_medio_publicacion": round(segundos / publicadas, 1) if publicadas else None,
+    }
+
+
+def estadisticas(desde=None, hasta=None, plataforma=None):
+    """
+    Totales por plataforma, estado y día a partir del rollup.
+    """
+    filas = PublicationStat.objects.exclude(total=0)
+    if desde:
+        filas = filas.filter(dia__gte=desde)
+    if hasta:
+        filas = filas.filter(dia__lte=hasta)
+    if plataforma:
+        filas = filas.filter(plataforma=plataforma)
+
+    por_estado = {}
+    por_plataforma = {}
+    por_dia = {}
+    segundos = 0
+    segundos_plataforma = {}
+    for fila in filas.order_by('dia').values('dia', 'plataforma', 'estado', 'total', 'segundos_hasta_publicar'):
+        estado, total = fila['estado'], fila['total']
+        por_estado[estado] = por_estado.get(estado, 0) + total
+
+        estados_plataforma = por_plataforma.setdefault(fila['plataforma'], {})
+        estados_plataforma[estado] = estados_plataforma.get(estado, 0) + total
+
+        estados_dia = por_dia.setdefault(fila['dia'], {})
+        estados_dia[estado] = estados_dia.get(estado, 0) + total
+
+        segundos += fila['segundos_hasta_publicar']
+        segundos_plataforma[fila['plataforma']] = (
+            segundos_plataforma.get(fila['plataforma'], 0) + fila['segundos_hasta_publicar']
+        )
+
+    return {
+        **_resumen(por_estado, segundos),
+        "por_plataforma": {
+            nombre: _resumen(estados, segundos_plataforma[nombre])
+            for nombre, estados in por_plataforma.items()
+        },
+        "por_dia": [
+            {"dia": dia.isoformat(), "total": sum(estados.values()), "por_estado": estados}
+            for dia, estados in por_dia.items()
+        ],
+    }
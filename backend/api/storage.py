@@ -0,0 +1,90 @@
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Storage direccionado por contenido: cada archivo se guarda por su SHA-256 en
+    subdirectorios repartidos (cas/ab/cd/<hash>.<ext>), así que un archivo idéntico
+    se guarda una sola vez y devuelve la misma URL.
+
+    La tabla MediaBlob indexa hash -> tamaño, mime y número de referencias;
+    delete() solo borra el archivo cuando nadie más lo referencia.
+    """
+    prefijo = 'cas'
+
+    def ruta_para_hash(self, sha256, extension=''):
+        return f"{self.prefijo}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final lo decide el contenido: no hace falta buscar uno libre
+        return name
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        extension = os.path.splitext(name)[1].lower()
+        directorio_tmp = self.path(f"{self.prefijo}/tmp")
+        os.makedirs(directorio_tmp, exist_ok=True)
+
+        # Una sola pasada: se escribe a un temporal mientras se calcula el hash
+        sha256 = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=directorio_tmp, delete=False) as tmp:
+            for chunk in content.chunks():
+                sha256.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        sha256 = sha256.hexdigest()
+
+        # Mismo contenido con otra extensión: se reutiliza el archivo ya indexado
+        existente = MediaBlob.objects.filter(sha256=sha256).only('path').first()
+        nombre = existente.path if existente else self.ruta_para_hash(sha256, extension)
+        destino = self.path(nombre)
+        if os.path.exists(destino):
+            os.remove(tmp.name)  # Duplicado: ya lo tenemos
+        else:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(tmp.name, destino)
+            if self.file_permissions_mode is not None:
+                os.chmod(destino, self.file_permissions_mode)
+
+        self._registrar_referencia(MediaBlob, sha256, size, mimetypes.guess_type(name)[0], nombre)
+        return nombre
+
+    def _registrar_referencia(self, MediaBlob, sha256, size, mime, nombre):
+        try:
+            with transaction.atomic():
+                _, creado = MediaBlob.objects.get_or_create(
+                    sha256=sha256,
+                    defaults={'size': size, 'mime': mime or '', 'path': nombre, 'ref_count': 1},
+                )
+        except IntegrityError:
+            creado = False  # Otro proceso lo creó a la vez
+        if not creado:
+            MediaBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        from .models import MediaBlob
+
+        blob = MediaBlob.objects.filter(path=name).first()
+        if blob is not None:
+            MediaBlob.objects.filter(id=blob.id).update(ref_count=F('ref_count') - 1)
+            blob.refresh_from_db(fields=['ref_count'])
+            if blob.ref_count > 0:
+                return
+            blob.delete()
+        super().delete(name)
+
+    def buscar(self, sha256):
+        """
+        Devuelve el MediaBlob de un hash (o None) sin tocar el disco.
+        """
+        from .models import MediaBlob
+        return MediaBlob.objects.filter(sha256=sha256).first()
@@ -0,0 +1,95 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Post, Publication, Tombstone
+
+# Feed de cambios incrementales: el cursor es un instante (microsegundos desde epoch) y
+# cada respuesta devuelve los Posts, Publicaciones y borrados (Tombstone) con
+# cursor < updated_at <= nuevo cursor, leídos por los índices (updated_at, id).
+#
+# El nuevo cursor se queda SYNC_SAFETY_WINDOW segundos por detrás del reloj para no
+# saltarse filas de transacciones que aún no han hecho commit. Una misma fila puede
+# llegar dos veces: el cliente aplica los cambios por id (upsert), así que no importa.
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSEGUNDO = datetime.timedelta(microseconds=1)
+
+
+def codificar_cursor(instante):
+    return str((instante - _EPOCH) // _MICROSEGUNDO)
+
+
+def decodificar_cursor(cursor):
+    """
+    Instante de un cursor. Lanza ValueError si no es válido.
+    """
+    return _EPOCH + int(cursor) * _MICROSEGUNDO
+
+
+def registrar_borrado(modelo, objeto_id):
+    Tombstone.objects.create(modelo=modelo, objeto_id=objeto_id)
+
+
+def purgar_tombstones():
+    limite = timezone.now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    return Tombstone.objects.filter(updated_at__lt=limite).delete()[0]
+
+
+def cambios(desde=None, limite=None):
+    """
+    Cambios con desde < updated_at <= hasta. Sin `desde` solo devuelve el cursor actual
+    (el cliente carga el listado completo una vez y sincroniza a partir de ahí).
+
+    Devuelve un dict con 'posts', 'publicaciones' y 'eliminados' (querysets), 'cursor',
+    'mas' (hay más cambios: volver a llamar enseguida con el nuevo cursor) y
+    'reiniciar' (el cursor es anterior a los tombstones conservados: recargar todo).
+    """
+    limite = limite or settings.SYNC_MAX_ROWS
+    hasta = timezone.now() - datetime.timedelta(seconds=settings.SYNC_SAFETY_WINDOW)
+    vacio = {
+        'posts': Post.objects.none(),
+        'publicaciones': Publication.objects.none(),
+        'eliminados': Tombstone.objects.none(),
+        'mas': False,
+        'reiniciar': False,
+    }
+
+    if desde is None:
+        return {**vacio, 'cursor': codificar_cursor(hasta)}
+    retencion = timezone.now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if desde < retencion:
+        return {**vacio, 'cursor': codificar_cursor(hasta), 'reiniciar': True}
+    if desde >= hasta:
+        return {**vacio, 'cursor': codificar_cursor(desde)}
+
+    tablas = {
+        'posts': Post.objects.all(),
+        'publicaciones': Publication.objects.all(),
+        'eliminados': Tombstone.objects.all(),
+    }
+
+    # Si una tabla tiene más de `limite` cambios, el corte se adelanta hasta justo antes
+    # de la primera fila que no cabe (y se aplica a todas las tablas).
+    corte = hasta
+    for queryset in tablas.values():
+        siguiente = (
+            queryset.filter(updated_at__gt=desde, updated_at__lte=hasta)
+            .order_by('updated_at', 'id').values_list('updated_at', flat=True)[limite:limite + 1]
+        )
+        for instante in siguiente:
+            corte = min(corte, instante - _MICROSEGUNDO)
+    if corte <= desde:
+        # Más de `limite` filas con el mismo updated_at: se envían todas para poder avanzar
+        corte = desde + _MICROSEGUNDO
+
+    return {
+        **{
+            nombre: queryset.filter(updated_at__gt=desde, updated_at__lte=corte).order_by('updated_at', 'id')
+            for nombre, queryset in tablas.items()
+        },
+        'cursor': codificar_cursor(corte),
+        'mas': corte < hasta,
+        'reiniciar': False,
+    }
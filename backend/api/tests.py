@@ -1,3 +1,595 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .adaptation_service import crear_borradores
+from .models import Post, PrefetchedImage, Publication, PublicationStat, PublishJob, Tombstone, UploadSession
+from .publish_service import publicar_todo, registrar_resultado
+from .upload_service import ErrorSubida, anadir_chunk, crear_sesion
+from . import image_prefetch, llm_service, publish_queue, social_service, stats_service, sync_service
+
+
+def _crear_publicacion(plataforma='facebook', estado='draft', post=None):
+    post = post or Post.objects.create(titulo="Título", contenido_original="Contenido")
+    return Publication.objects.create(post=post, plataforma=plataforma, contenido_adaptado="Texto", estado=estado)
+
+
+class ColaPublicacionTests(TestCase):
+    """
+    Claim y lease de PublishJob (publish_queue).
+    """
+    def setUp(self):
+        self.pub = _crear_publicacion()
+        self.job = publish_queue.encolar_publicacion(self.pub, image_url='https://example.com/a.jpg')
+
+    def test_encolar_marca_la_publicacion(self):
+        self.pub.refresh_from_db()
+        self.assertEqual(self.pub.estado, 'queued')
+        self.assertEqual(self.job.estado, 'pending')
+
+    def test_un_job_se_reclama_una_sola_vez(self):
+        tomado = publish_queue.reclamar_siguiente_job('worker-1')
+        self.assertEqual(tomado.id, self.job.id)
+        self.assertEqual(tomado.locked_by, 'worker-1')
+        self.assertIsNone(publish_queue.reclamar_siguiente_job('worker-2'))
+
+    def test_no_se_reclama_antes_de_run_after(self):
+        PublishJob.objects.filter(id=self.job.id).update(run_after=timezone.now() + datetime.timedelta(minutes=5))
+        self.assertIsNone(publish_queue.reclamar_siguiente_job('worker-1'))
+
+    def test_lease_vencido_se_reclama_como_huerfano(self):
+        publish_queue.reclamar_siguiente_job('worker-1')
+        self.assertIsNone(publish_queue.reclamar_siguiente_job('worker-2'))
+
+        with self.settings(PUBLISH_JOB_LEASE_SECONDS=60):
+            PublishJob.objects.filter(id=self.job.id).update(locked_at=timezone.now() - datetime.timedelta(seconds=61))
+            tomado = publish_queue.reclamar_siguiente_job('worker-2')
+        self.assertEqual(tomado.id, self.job.id)
+        self.assertEqual(tomado.locked_by, 'worker-2')
+
+    @mock.patch('api.publish_queue.ejecutar_publicacion')
+    def test_procesar_job_publica_y_libera_el_lease(self, ejecutar):
+        ejecutar.return_value = {'status': 'success', 'id': '123', 'url': 'https://example.com/p/123'}
+        publish_queue.procesar_job(publish_queue.reclamar_siguiente_job('worker-1'))
+
+        job = PublishJob.objects.get(id=self.job.id)
+        self.assertEqual((job.estado, job.attempts, job.locked_by), ('done', 1, None))
+        self.pub.refresh_from_db()
+        self.assertEqual((self.pub.estado, self.pub.api_id), ('published', '123'))
+
+    @mock.patch('api.publish_queue.ejecutar_publicacion')
+    def test_excepcion_reprograma_con_backoff(self, ejecutar):
+        ejecutar.side_effect = RuntimeError("timeout")
+        publish_queue.procesar_job(publish_queue.reclamar_siguiente_job('worker-1'))
+
+        job = PublishJob.objects.get(id=self.job.id)
+        self.assertEqual((job.estado, job.attempts, job.last_error), ('pending', 1, 'timeout'))
+        self.assertGreater(job.run_after, timezone.now())
+        self.pub.refresh_from_db()
+        self.assertEqual(self.pub.estado, 'queued')
+
+    @mock.patch('api.publish_queue.ejecutar_publicacion')
+    def test_worker_sin_lease_no_pisa_al_nuevo_dueno(self, ejecutar):
+        def publicar_tras_perder_el_lease(pub, **kwargs):
+            PublishJob.objects.filter(id=self.job.id).update(locked_by='worker-2')
+            return {'status': 'success', 'id': '123'}
+        ejecutar.side_effect = publicar_tras_perder_el_lease
+
+        publish_queue.procesar_job(publish_queue.reclamar_siguiente_job('worker-1'))
+
+        job = PublishJob.objects.get(id=self.job.id)
+        self.assertEqual((job.estado, job.locked_by), ('running', 'worker-2'))
+
+
+class SubidaReanudableTests(TestCase):
+    """
+    Subidas por chunks (upload_service): offset, conflictos y finalización.
+    """
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(
+            RESUMABLE_UPLOAD_DIR=f"{directorio}/parciales", MEDIA_ROOT=f"{directorio}/media"
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.datos = bytes(range(256)) * 40
+        self.sesion = crear_sesion('video.mp4', len(self.datos))
+
+    def test_subida_en_dos_chunks(self):
+        anadir_chunk(self.sesion.id, 0, io.BytesIO(self.datos[:4000]), 4000)
+        sesion = anadir_chunk(self.sesion.id, 4000, io.BytesIO(self.datos[4000:]), len(self.datos) - 4000)
+
+        self.assertTrue(sesion.completado)
+        self.assertEqual(sesion.sha256, hashlib.sha256(self.datos).hexdigest())
+        with default_storage.open(sesion.archivo) as archivo:
+            self.assertEqual(archivo.read(), self.datos)
+
+    def test_offset_incorrecto_da_409(self):
+        anadir_chunk(self.sesion.id, 0, io.BytesIO(self.datos[:100]), 100)
+        with self.assertRaises(ErrorSubida) as error:
+            anadir_chunk(self.sesion.id, 0, io.BytesIO(self.datos[:100]), 100)
+        self.assertEqual(error.exception.status, 409)
+        self.assertEqual(UploadSession.objects.get(id=self.sesion.id).offset, 100)
+
+    def test_chunk_mayor_que_el_tamano_declarado_da_413(self):
+        with self.assertRaises(ErrorSubida) as error:
+            anadir_chunk(self.sesion.id, 0, io.BytesIO(self.datos + b'x'), len(self.datos) + 1)
+        self.assertEqual(error.exception.status, 413)
+
+    def test_subida_completa_no_acepta_mas_chunks(self):
+        anadir_chunk(self.sesion.id, 0, io.BytesIO(self.datos), len(self.datos))
+        with self.assertRaises(ErrorSubida) as error:
+            anadir_chunk(self.sesion.id, len(self.datos), io.BytesIO(b'x'), 1)
+        self.assertEqual(error.exception.status, 409)
+
+    def test_conexion_cortada_conserva_lo_recibido(self):
+        sesion = anadir_chunk(self.sesion.id, 0, io.BytesIO(self.datos[:300]), 1000)
+        self.assertEqual((sesion.offset, sesion.completado), (300, False))
+
+    def test_finalizacion_fallida_se_reintenta(self):
+        with mock.patch('api.upload_service.guardar_en_storage', side_effect=OSError("disco lleno")):
+            with self.assertRaises(ErrorSubida) as error:
+                anadir_chunk(self.sesion.id, 0, io.BytesIO(self.datos), len(self.datos))
+        self.assertEqual(error.exception.status, 503)
+        sesion = UploadSession.objects.get(id=self.sesion.id)
+        self.assertEqual((sesion.offset, sesion.completado), (len(self.datos), False))
+
+        sesion = anadir_chunk(self.sesion.id, len(self.datos), io.BytesIO(b''), 0)
+        self.assertTrue(sesion.completado)
+        self.assertEqual(sesion.sha256, hashlib.sha256(self.datos).hexdigest())
+
+    def test_patch_concurrente_pierde_el_compare_and_set(self):
+        sesion_id = self.sesion.id
+
+        class OtroPatchGanaMientrasSeLee(io.BytesIO):
+            def read(self, *args):
+                UploadSession.objects.filter(id=sesion_id).update(offset=50)
+                return super().read(*args)
+
+        with self.assertRaises(ErrorSubida) as error:
+            anadir_chunk(sesion_id, 0, OtroPatchGanaMientrasSeLee(self.datos[:100]), 100)
+        self.assertEqual(error.exception.status, 409)
+        self.assertEqual(UploadSession.objects.get(id=sesion_id).offset, 50)
+
+
+def _aplicar_transiciones():
+    """
+    Secuencia de cambios de estado por todos los caminos que mantienen el rollup y el
+    resumen de los Posts (señales, bulk_create, UPDATE condicional, borrados).
+    """
+    post = Post.objects.create(titulo="Lanzamiento", contenido_original="Contenido")
+    crear_borradores(post, {plataforma: {'text': plataforma} for plataforma in ('facebook', 'instagram', 'linkedin', 'tiktok')})
+    facebook, instagram, linkedin, tiktok = (post.publications.get(plataforma=p) for p in ('facebook', 'instagram', 'linkedin', 'tiktok'))
+
+    publish_queue.encolar_publicacion(facebook)
+    stats_service.actualizar_estado(facebook, 'publishing')
+    registrar_resultado(facebook, {'status': 'success', 'id': '1'})
+
+    # Dos instancias cargadas a la vez: la segunda no sabe que la primera ya cambió el estado
+    desfasada = Publication.objects.get(id=instagram.id)
+    stats_service.actualizar_estado(instagram, 'publishing')
+    registrar_resultado(desfasada, {'status': 'error', 'message': 'token caducado'})
+
+    registrar_resultado(linkedin, {'status': 'manual_action_required'})
+    with mock.patch('api.publish_service.ejecutar_publicacion', return_value={'status': 'success', 'id': '2'}):
+        publicar_todo(post, {}, plataformas=['linkedin', 'instagram'])
+
+    otro = Post.objects.create(titulo="Otro", contenido_original="Contenido")
+    _crear_publicacion('facebook', estado='failed', post=otro)
+    borrada = _crear_publicacion('whatsapp', post=otro)
+    Publication.objects.get(id=borrada.id).delete()
+    tiktok.delete()
+    return post, otro
+
+
+class RollupEstadisticasTests(TestCase):
+    """
+    El rollup incremental (PublicationStat) coincide con el recalculado desde cero.
+    """
+    def _filas(self):
+        return sorted(
+            PublicationStat.objects.exclude(total=0)
+            .values_list('dia', 'plataforma', 'estado', 'total', 'segundos_hasta_publicar')
+        )
+
+    def test_incremental_igual_a_reconstruido(self):
+        _aplicar_transiciones()
+        incremental = self._filas()
+        stats_service.reconstruir()
+        self.assertEqual(incremental, self._filas())
+
+    def test_transicion_concurrente_resta_del_estado_real(self):
+        pub = _crear_publicacion()
+        desfasada = Publication.objects.get(id=pub.id)
+        stats_service.actualizar_estado(pub, 'publishing')
+        registrar_resultado(desfasada, {'status': 'success', 'id': '1'})
+
+        estados = dict(PublicationStat.objects.exclude(total=0).values_list('estado', 'total'))
+        self.assertEqual(estados, {'published': 1})
+
+    def test_estadisticas_resume_el_rollup(self):
+        _aplicar_transiciones()
+        resumen = stats_service.estadisticas()
+        self.assertEqual(resumen['total'], Publication.objects.count())
+        self.assertEqual(resumen['por_estado'], {'published': 3, 'failed': 1})
+        self.assertEqual(resumen['tasa_exito'], 0.75)
+
+
+class ResumenPostTests(TestCase):
+    """
+    Los contadores desnormalizados de cada Post coinciden con los recalculados.
+    """
+    CAMPOS = [
+        *(stats_service.campo_total(estado) for estado, _ in Publication.ESTADOS),
+        'ultima_publicacion', 'ultimo_error_plataforma',
+    ]
+
+    def _resumen(self):
+        return list(Post.objects.order_by('id').values_list(*self.CAMPOS))
+
+    def test_incremental_igual_a_reconstruido(self):
+        _aplicar_transiciones()
+        incremental = self._resumen()
+        stats_service.reconstruir()
+        self.assertEqual(incremental, self._resumen())
+
+    def test_filtros_del_listado_usan_los_contadores(self):
+        post, otro = _aplicar_transiciones()
+        respuesta = self.client.get('/api/posts/', {'con_fallos': 'true'})
+        self.assertEqual([fila['id'] for fila in respuesta.json()['results']], [otro.id])
+
+        respuesta = self.client.get('/api/posts/', {'estado': 'published'})
+        self.assertEqual([fila['id'] for fila in respuesta.json()['results']], [post.id])
+        self.assertEqual(respuesta.json()['results'][0]['estados']['published'], 3)
+
+
+@override_settings(SYNC_SAFETY_WINDOW=2, SYNC_TOMBSTONE_RETENTION_DAYS=30)
+class FeedCambiosTests(TestCase):
+    """
+    Cursor del feed de cambios (sync_service): ventana de seguridad, filas con el
+    mismo updated_at y borrados.
+    """
+    def setUp(self):
+        self.ahora = timezone.now()
+
+    def _cambios(self, desde, limite=None, ahora=None):
+        with mock.patch('api.sync_service.timezone.now', return_value=ahora or self.ahora):
+            return sync_service.cambios(desde, limite)
+
+    def _post(self, updated_at):
+        post = Post.objects.create(titulo="Título", contenido_original="Contenido")
+        Post.objects.filter(id=post.id).update(updated_at=updated_at)
+        return post
+
+    def test_cursor_ida_y_vuelta(self):
+        self.assertEqual(sync_service.decodificar_cursor(sync_service.codificar_cursor(self.ahora)), self.ahora)
+        with self.assertRaises(ValueError):
+            sync_service.decodificar_cursor('no-es-un-cursor')
+
+    def test_sin_cursor_solo_devuelve_el_cursor_actual(self):
+        self._post(self.ahora - datetime.timedelta(minutes=5))
+        resultado = self._cambios(None)
+        self.assertFalse(resultado['posts'].exists())
+        self.assertEqual(resultado['cursor'], sync_service.codificar_cursor(self.ahora - datetime.timedelta(seconds=2)))
+
+    def test_ventana_de_seguridad(self):
+        desde = self.ahora - datetime.timedelta(minutes=1)
+        reciente = self._post(self.ahora - datetime.timedelta(seconds=1))
+
+        resultado = self._cambios(desde)
+        self.assertFalse(resultado['posts'].exists())
+        cursor = sync_service.decodificar_cursor(resultado['cursor'])
+        self.assertLess(cursor, self.ahora - datetime.timedelta(seconds=1))
+
+        # Pasada la ventana, la fila llega con el cursor anterior
+        resultado = self._cambios(cursor, ahora=self.ahora + datetime.timedelta(seconds=5))
+        self.assertEqual([post.id for post in resultado['posts']], [reciente.id])
+
+    def test_filas_con_el_mismo_updated_at_no_se_pierden(self):
+        instante = self.ahora - datetime.timedelta(minutes=1)
+        ids = {self._post(instante).id for _ in range(3)}
+        self._post(instante + datetime.timedelta(seconds=1))
+
+        recibidos = []
+        cursor = sync_service.codificar_cursor(instante - datetime.timedelta(minutes=1))
+        for _ in range(10):
+            resultado = self._cambios(sync_service.decodificar_cursor(cursor), limite=2)
+            recibidos += [post.id for post in resultado['posts']]
+            cursor = resultado['cursor']
+            if not resultado['mas']:
+                break
+        else:
+            self.fail("El cursor no avanza")
+
+        self.assertTrue(ids <= set(recibidos))
+        self.assertEqual(len(set(recibidos)), 4)
+
+    def test_borrados_dejan_tombstone(self):
+        desde = self.ahora - datetime.timedelta(seconds=30)
+        pub = _crear_publicacion()
+        post_id = pub.post_id
+        Post.objects.get(id=post_id).delete()
+
+        resultado = self._cambios(desde, ahora=timezone.now() + datetime.timedelta(seconds=5))
+        eliminados = set(resultado['eliminados'].values_list('modelo', 'objeto_id'))
+        self.assertEqual(eliminados, {('post', post_id), ('publication', pub.id)})
+        self.assertFalse(resultado['posts'].filter(id=post_id).exists())
+
+    def test_cursor_anterior_a_la_retencion_pide_recargar(self):
+        Tombstone.objects.create(modelo='post', objeto_id=1)
+        resultado = self._cambios(self.ahora - datetime.timedelta(days=31))
+        self.assertTrue(resultado['reiniciar'])
+        self.assertFalse(resultado['eliminados'].exists())
+
+
+class _RespuestaFalsa:
+    def __init__(self, status_code, datos):
+        self.status_code = status_code
+        self._datos = datos
+
+    def json(self):
+        return self._datos
+
+
+class _ClienteGraphFalso:
+    """
+    Graph API mínima para Instagram: crea el contenedor, devuelve los status_code
+    indicados en cada consulta y registra las llamadas a media_publish.
+    """
+    def __init__(self, estados):
+        self.estados = list(estados)
+        self.publicados = []
+
+    def post(self, url, data=None, **kwargs):
+        if url.endswith('/media_publish'):
+            self.publicados.append(data['creation_id'])
+            return _RespuestaFalsa(200, {'id': 'media-1'})
+        return _RespuestaFalsa(200, {'id': 'contenedor-1'})
+
+    def get(self, url, params=None, **kwargs):
+        return _RespuestaFalsa(200, {'status_code': self.estados.pop(0)})
+
+
+@mock.patch.dict(os.environ, {'INSTAGRAM_ACCOUNT_ID': 'ig-1', 'FACEBOOK_ACCESS_TOKEN': 'token'})
+@override_settings(INSTAGRAM_CONTAINER_MAX_WAIT=120)
+class ContenedorInstagramTests(TestCase):
+    """
+    Polling adaptativo (EWMA por tamaño de imagen) y continuación diferida del contenedor.
+    """
+    IMAGEN = 'https://image.pollinations.ai/prompt/gato?width=1024&height=1024'
+
+    def setUp(self):
+        social_service._tiempos_contenedor_ig.clear()
+        self.addCleanup(social_service._tiempos_contenedor_ig.clear)
+        dormir = mock.patch('api.social_service.time.sleep')
+        self.sleep = dormir.start()
+        self.addCleanup(dormir.stop)
+
+    def _con_graph(self, *estados):
+        graph = _ClienteGraphFalso(estados)
+        parche = mock.patch('api.social_service.cliente', return_value=graph)
+        parche.start()
+        self.addCleanup(parche.stop)
+        return graph
+
+    def test_ewma_por_tamano(self):
+        social_service._registrar_procesamiento_ig('1024x1024', 10.0)
+        social_service._registrar_procesamiento_ig('1024x1024', 20.0)
+        self.assertAlmostEqual(social_service.tiempos_procesamiento_instagram()['1024x1024'], 13.0)
+        self.assertEqual(social_service._clave_tamano_imagen(self.IMAGEN), '1024x1024')
+        self.assertEqual(social_service._clave_tamano_imagen('https://example.com/a.jpg'), 'desconocido')
+
+        # El primer delay sale del EWMA, acotado entre 1s y 30s
+        self.assertEqual(social_service._estimar_procesamiento_ig('1024x1024'), 13.0)
+        social_service._registrar_procesamiento_ig('2048x2048', 90.0)
+        self.assertEqual(social_service._estimar_procesamiento_ig('2048x2048'), 30.0)
+        self.assertEqual(social_service._estimar_procesamiento_ig('otro'), social_service._DELAY_INICIAL_IG)
+
+    def test_polling_con_backoff_hasta_finished(self):
+        social_service._registrar_procesamiento_ig('1024x1024', 4.0)
+        graph = self._con_graph('IN_PROGRESS', 'IN_PROGRESS', 'FINISHED')
+
+        resultado = social_service.publicar_en_instagram("Texto", self.IMAGEN)
+
+        self.assertEqual((resultado['status'], resultado['id']), ('success', 'media-1'))
+        self.assertEqual(graph.publicados, ['contenedor-1'])
+        self.assertEqual([llamada.args[0] for llamada in self.sleep.call_args_list], [4.0, 6.0, 9.0])
+        self.assertIn('1024x1024', social_service.tiempos_procesamiento_instagram())
+
+    def test_contenedor_ya_publicado_no_se_publica_otra_vez(self):
+        graph = self._con_graph('PUBLISHED')
+        resultado = social_service.publicar_en_instagram("Texto", self.IMAGEN)
+        self.assertEqual(resultado['status'], 'success')
+        self.assertEqual(graph.publicados, [])
+
+    def test_contenedor_con_error(self):
+        self._con_graph('ERROR', 'ERROR')
+        resultado = social_service.publicar_en_instagram("Texto", self.IMAGEN)
+        self.assertEqual((resultado['status'], resultado['step']), ('error', '1_status'))
+
+    def test_diferido_devuelve_pending_y_continua(self):
+        graph = self._con_graph('IN_PROGRESS', 'FINISHED')
+
+        pendiente = social_service.publicar_en_instagram("Texto", self.IMAGEN, diferido=True)
+        self.assertEqual(pendiente['status'], 'pending')
+        self.assertEqual((pendiente['creation_id'], pendiente['size_key']), ('contenedor-1', '1024x1024'))
+        self.sleep.assert_not_called()
+
+        siguiente = social_service.continuar_publicacion_instagram(
+            pendiente['creation_id'], pendiente['started_at'], pendiente['size_key'], pendiente['retry_after']
+        )
+        self.assertEqual(siguiente['status'], 'pending')
+        self.assertGreater(siguiente['retry_after'], pendiente['retry_after'])
+
+        final = social_service.continuar_publicacion_instagram(
+            siguiente['creation_id'], siguiente['started_at'], siguiente['size_key'], siguiente['retry_after']
+        )
+        self.assertEqual(final['status'], 'success')
+        self.assertEqual(graph.publicados, ['contenedor-1'])
+        self.sleep.assert_not_called()
+
+    def test_diferido_caduca_tras_la_espera_maxima(self):
+        self._con_graph('IN_PROGRESS')
+        resultado = social_service.continuar_publicacion_instagram('contenedor-1', time.time() - 121)
+        self.assertEqual(resultado['status'], 'error')
+
+    def test_continuacion_desde_la_cola(self):
+        pub = _crear_publicacion('instagram')
+        job = publish_queue.encolar_publicacion(pub, image_url=self.IMAGEN)
+        self._con_graph('FINISHED')
+
+        with self.settings(INSTAGRAM_PUBLISH_MODE='deferred'):
+            publish_queue.procesar_job(publish_queue.reclamar_siguiente_job('worker-1'))
+            job.refresh_from_db()
+            self.assertEqual(job.estado, 'pending')
+            self.assertEqual(job.payload['continuacion']['creation_id'], 'contenedor-1')
+
+            PublishJob.objects.filter(id=job.id).update(run_after=timezone.now())
+            publish_queue.procesar_job(publish_queue.reclamar_siguiente_job('worker-1'))
+
+        job.refresh_from_db()
+        pub.refresh_from_db()
+        self.assertEqual((job.estado, job.attempts, pub.estado), ('done', 1, 'published'))
+
+
+class PrefetchImagenTests(TestCase):
+    """
+    media_url guarda la referencia local de la imagen descargada; se hace absoluta al publicar.
+    """
+    ORIGEN = 'https://image.pollinations.ai/prompt/gato?width=1024&height=1024'
+    ARCHIVO = 'generated_images/abc.jpg'
+
+    def _prefetch(self):
+        with mock.patch('api.image_prefetch._descargar', return_value=self.ARCHIVO), \
+                mock.patch('api.image_prefetch.connection'):
+            image_prefetch._prefetch(self.ORIGEN)
+
+    @override_settings(PUBLIC_BASE_URL='')
+    def test_referencia_local_sin_public_base_url(self):
+        pub = _crear_publicacion('instagram')
+        Publication.objects.filter(id=pub.id).update(media_url=self.ORIGEN)
+        self._prefetch()
+
+        pub.refresh_from_db()
+        self.assertEqual(pub.media_url, '/media/generated_images/abc.jpg')
+        self.assertEqual(image_prefetch.url_preferida(self.ORIGEN), pub.media_url)
+        # Facebook lee la copia de disco; Instagram necesita una URL pública: la de Pollinations
+        self.assertEqual(image_prefetch.url_para_publicar(pub.media_url, 'facebook'), pub.media_url)
+        self.assertEqual(image_prefetch.url_para_publicar(pub.media_url, 'instagram'), self.ORIGEN)
+
+    @override_settings(PUBLIC_BASE_URL='https://api.ejemplo.com')
+    def test_referencia_local_con_public_base_url(self):
+        self._prefetch()
+        self.assertTrue(PrefetchedImage.objects.filter(archivo=self.ARCHIVO).exists())
+        absoluta = 'https://api.ejemplo.com/media/generated_images/abc.jpg'
+        for url in (self.ORIGEN, '/media/generated_images/abc.jpg'):
+            self.assertEqual(image_prefetch.url_para_publicar(url, 'instagram'), absoluta)
+        # Las URLs absolutas ajenas no se tocan
+        self.assertEqual(image_prefetch.url_para_publicar('https://cdn.ejemplo.com/a.jpg', 'instagram'), 'https://cdn.ejemplo.com/a.jpg')
+
+
+class AdaptacionStreamingTests(TestCase):
+    """
+    /api/adaptar/stream/: enriquecimiento por plataforma mientras Gemini genera y
+    guardado del Post y sus Borradores al terminar.
+    """
+    ADAPTACIONES = {
+        'instagram': {'text': 'Hola IG', 'hashtags': ['#a'], 'suggested_image_prompt': 'gato'},
+        'tiktok': {'text': 'Hola TT', 'hashtags': [], 'video_hook': 'gatos'},
+    }
+
+    def _eventos(self, respuesta):
+        eventos = []
+        for bloque in b''.join(respuesta.streaming_content).decode().strip().split('\n\n'):
+            nombre, datos = bloque.split('\n')
+            eventos.append((nombre[len('event: '):], json.loads(datos[len('data: '):])))
+        return eventos
+
+    def test_enriquecedores_arrancan_al_llegar_su_plataforma(self):
+        chunks = ['{"instagram": {"text": "Hola IG", "suggested_image_prompt": "gato"},', ' "tiktok": {"text": "Hola TT", "video_hook": "gatos"}}']
+        consumidos = []
+
+        def generar(*args, **kwargs):
+            for chunk in chunks:
+                consumidos.append(chunk)
+                yield mock.Mock(text=chunk)
+
+        lanzados = []
+        enviar = llm_service._executor_enriquecimiento.submit
+
+        def submit(func, *args):
+            lanzados.append(len(consumidos))
+            return enviar(func, *args)
+
+        enriquecedores = [
+            ('imagen', 'instagram', lambda r: [('instagram', 'generated_image_url', 'https://img/1'), ('facebook', 'generated_image_url', 'https://img/1')], 5),
+            ('video', 'tiktok', lambda r: [('tiktok', 'generated_video_url', 'https://video/1')], 5),
+        ]
+        with mock.patch.object(llm_service, 'api_key_from_env', 'clave'), \
+                mock.patch.object(llm_service, 'ENRIQUECEDORES', enriquecedores), \
+                mock.patch.object(llm_service.adaptation_cache, 'obtener', return_value=None), \
+                mock.patch.object(llm_service.adaptation_cache, 'guardar'), \
+                mock.patch.object(llm_service._executor_enriquecimiento, 'submit', side_effect=submit), \
+                mock.patch('api.llm_service.genai') as genai:
+            genai.GenerativeModel.return_value.generate_content.side_effect = generar
+            eventos = list(llm_service.adaptar_contenido_en_streaming("Título", "Contenido"))
+
+        # El de Instagram se lanza antes de que Gemini envíe el objeto de TikTok
+        self.assertEqual(lanzados, [1, 2])
+        media = [(plataforma, datos) for tipo, plataforma, datos in eventos if tipo == 'media']
+        # Facebook no está en la respuesta: su imagen compartida se descarta
+        self.assertCountEqual(media, [('instagram', ('generated_image_url', 'https://img/1')), ('tiktok', ('generated_video_url', 'https://video/1'))])
+        tipo, _, final = eventos[-1]
+        self.assertEqual(tipo, 'fin')
+        self.assertEqual(final['tiktok']['generated_video_url'], 'https://video/1')
+
+    def test_borradores_se_guardan_al_terminar(self):
+        final = {plataforma: dict(datos) for plataforma, datos in self.ADAPTACIONES.items()}
+        final['instagram']['generated_image_url'] = 'https://img/1'
+        final['tiktok']['generated_image_url'] = 'https://img/portada'
+        final['tiktok']['generated_video_url'] = 'https://video/1'
+
+        def adaptar(titulo, contenido):
+            for plataforma, datos in self.ADAPTACIONES.items():
+                yield 'plataforma', plataforma, datos
+                # Nada se guarda mientras dura el stream
+                self.assertFalse(Post.objects.exists())
+            yield 'media', 'instagram', ('generated_image_url', 'https://img/1')
+            yield 'fin', None, final
+
+        with mock.patch('api.views.adaptar_contenido_en_streaming', side_effect=adaptar):
+            respuesta = self.client.post('/api/adaptar/stream/', {'titulo': 'Título', 'contenido': 'Contenido'}, content_type='application/json')
+            eventos = self._eventos(respuesta)
+
+        self.assertEqual([nombre for nombre, _ in eventos], ['plataforma', 'plataforma', 'media', 'fin'])
+        self.assertIsNone(eventos[0][1]['adaptacion']['id'])
+        post = Post.objects.get()
+        fin = eventos[-1][1]
+        self.assertEqual(fin['post_id'], post.id)
+        pubs = {pub.plataforma: pub for pub in post.publications.all()}
+        self.assertEqual({plataforma: datos['id'] for plataforma, datos in fin['adaptaciones'].items()}, {p: pub.id for p, pub in pubs.items()})
+        # TikTok guarda el video; la imagen vertical es solo portada
+        self.assertEqual((pubs['instagram'].media_url, pubs['tiktok'].media_url), ('https://img/1', 'https://video/1'))
+
+    def test_error_no_deja_borradores(self):
+        def adaptar(titulo, contenido):
+            yield 'plataforma', 'instagram', self.ADAPTACIONES['instagram']
+            yield 'error', None, "Gemini falló"
+
+        with mock.patch('api.views.adaptar_contenido_en_streaming', side_effect=adaptar):
+            respuesta = self.client.post('/api/adaptar/stream/', {'titulo': 'Título', 'contenido': 'Contenido'}, content_type='application/json')
+            eventos = self._eventos(respuesta)
+
+        self.assertEqual(eventos[-1], ('error', {'error': "Gemini falló"}))
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UploadSession
+
+
+class ArchivoConHash(File):
+    """
+    Envuelve un archivo para guardarlo en el storage por chunks y calcular su
+    SHA-256 mientras se copia (memoria constante, una sola lectura).
+    """
+    def __init__(self, archivo, name=None):
+        super().__init__(archivo, name=name or getattr(archivo, 'name', None))
+        self._hash = hashlib.sha256()
+
+    def chunks(self, chunk_size=None):
+        # Los UploadedFile ya saben trocearse (memoria o archivo temporal)
+        origen = self.file.chunks(chunk_size) if isinstance(self.file, File) else super().chunks(chunk_size)
+        for chunk in origen:
+            self._hash.update(chunk)
+            yield chunk
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+
+def guardar_en_storage(archivo, nombre):
+    """
+    Guarda `archivo` en default_storage sin leerlo entero en memoria.
+    Devuelve (nombre_guardado, sha256).
+    """
+    envoltorio = ArchivoConHash(archivo, name=nombre)
+    nombre_guardado = default_storage.save(nombre, envoltorio)
+    return nombre_guardado, envoltorio.sha256
+
+
+# --- SUBIDAS REANUDABLES ---
+
+class ErrorSubida(Exception):
+    """
+    Error de una subida reanudable con el código HTTP a devolver.
+    """
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.status = status
+
+
+def _ruta_parcial(sesion):
+    return os.path.join(settings.RESUMABLE_UPLOAD_DIR, f"{sesion.id}.part")
+
+
+def crear_sesion(filename, total_size):
+    if not filename or total_size is None:
+        raise ErrorSubida("Faltan 'filename' y 'size'")
+    if total_size <= 0 or total_size > settings.RESUMABLE_UPLOAD_MAX_SIZE:
+        raise ErrorSubida(f"Tamaño inválido (máximo {settings.RESUMABLE_UPLOAD_MAX_SIZE} bytes)", status=413)
+
+    sesion = UploadSession.objects.create(filename=os.path.basename(filename), total_size=total_size)
+    os.makedirs(settings.RESUMABLE_UPLOAD_DIR, exist_ok=True)
+    open(_ruta_parcial(sesion), 'wb').close()
+    return sesion
+
+
+def anadir_chunk(sesion_id, offset, stream, longitud):
+    """
+    Escribe `longitud` bytes leídos de `stream` a partir de `offset`, que debe coincidir
+    con el offset guardado (409 si no). Al recibir el último byte se finaliza la subida.
+
+    El cuerpo se lee de la red a un archivo temporal fuera de la transacción (un cliente
+    lento no bloquea la BD); después el offset avanza con un UPDATE condicional
+    (compare-and-set) y solo el PATCH que lo consigue copia su chunk al archivo parcial.
+
+    Si ya se recibió todo pero la finalización falló (disco lleno, error de storage), un
+    PATCH con offset = tamaño total (y cuerpo vacío) la reintenta.
+    """
+    sesion = UploadSession.objects.get(id=sesion_id)
+    if not sesion.completado and offset == sesion.offset == sesion.total_size:
+        return _finalizar(sesion)
+    _validar_chunk(sesion, offset, longitud)
+
+    with tempfile.TemporaryFile(dir=settings.RESUMABLE_UPLOAD_DIR) as temporal:
+        escritos = 0
+        while escritos < longitud:
+            datos = stream.read(min(settings.UPLOAD_CHUNK_SIZE, longitud - escritos))
+            if not datos:
+                break  # Si la conexión se cortó a mitad, se conserva lo recibido
+            temporal.write(datos)
+            escritos += len(datos)
+
+        with transaction.atomic():
+            actualizadas = UploadSession.objects.filter(id=sesion.id, offset=offset, completado=False).update(
+                offset=offset + escritos, updated_at=timezone.now()
+            )
+            if not actualizadas:
+                # Otro PATCH avanzó el offset mientras se leía este chunk
+                sesion.refresh_from_db()
+                _validar_chunk(sesion, offset, longitud)
+                raise ErrorSubida(f"Offset incorrecto: se esperaba {sesion.offset}", status=409)
+
+            # Mientras no se confirma la transacción, ningún otro PATCH puede avanzar el offset
+            temporal.seek(0)
+            with open(_ruta_parcial(sesion), 'r+b') as parcial:
+                parcial.seek(offset)
+                shutil.copyfileobj(temporal, parcial, settings.UPLOAD_CHUNK_SIZE)
+                parcial.truncate(offset + escritos)
+        sesion.offset = offset + escritos
+
+    if sesion.offset == sesion.total_size:
+        return _finalizar(sesion)
+    return sesion
+
+
+def _finalizar(sesion):
+    try:
+        return finalizar_sesion(sesion)
+    except OSError as e:
+        # Los bytes siguen en el archivo parcial: el cliente puede reintentar
+        raise ErrorSubida(f"No se pudo guardar el archivo ({e}); reintentar con Upload-Offset: {sesion.total_size}", status=503)
+
+
+def _validar_chunk(sesion, offset, longitud):
+    if sesion.completado:
+        raise ErrorSubida("La subida ya está completa", status=409)
+    if offset != sesion.offset:
+        raise ErrorSubida(f"Offset incorrecto: se esperaba {sesion.offset}", status=409)
+    if longitud <= 0 or sesion.offset + longitud > sesion.total_size:
+        raise ErrorSubida("El chunk excede el tamaño declarado", status=413)
+
+
+def finalizar_sesion(sesion):
+    """
+    Mueve el archivo parcial completo al storage (por chunks) y calcula su hash.
+    """
+    ruta = _ruta_parcial(sesion)
+    with open(ruta, 'rb') as parcial:
+        sesion.archivo, sesion.sha256 = guardar_en_storage(parcial, sesion.filename)
+    os.remove(ruta)
+
+    sesion.completado = True
+    sesion.save(update_fields=['archivo', 'sha256', 'completado', 'updated_at'])
+    return sesion
@@ -1,23 +1,49 @@
 from django.urls import path
 from .views import (
     AdaptarContenidoView, 
+    AdaptarLoteView,
+    AdaptarStreamView,
     PublicarContenidoView, 
-    ListaPostsView,    
+    EventosPublicacionesView,
+    EstadoPublishJobView,
+    ListaPostsView,
+    BuscarPostsView,    
     DetallePostView,
     EliminarPostView,
+    PublicarTodoView,
     TikTokAuthView,
     TikTokCallbackView,
     TikTokTokenView,
-    UploadMediaView
+    UploadMediaView,
+    CrearSubidaReanudableView,
+    SubidaReanudableView,
+    VarianteMediaView,
+    SyncView,
+    EstadisticasPublicacionesView,
+    EstadisticasHTTPView,
+    MetricasCacheView
 )
 
 urlpatterns = [
     path('adaptar/', AdaptarContenidoView.as_view(), name='adaptar-contenido'),
+    path('adaptar/lote/', AdaptarLoteView.as_view(), name='adaptar-lote'),
+    path('adaptar/stream/', AdaptarStreamView.as_view(), name='adaptar-stream'),
     path('publicar/', PublicarContenidoView.as_view(), name='publicar-contenido'),
+    path('publicar/jobs/<int:id>/', EstadoPublishJobView.as_view(), name='estado-publish-job'),
+    path('eventos/publicaciones/', EventosPublicacionesView.as_view(), name='eventos-publicaciones'),
     path('upload/', UploadMediaView.as_view(), name='upload_media'),
+    path('upload/sesiones/', CrearSubidaReanudableView.as_view(), name='crear_subida_reanudable'),
+    path('upload/sesiones/<uuid:id>/', SubidaReanudableView.as_view(), name='subida_reanudable'),
+    path('media/variante/', VarianteMediaView.as_view(), name='variante_media'),
     path('posts/', ListaPostsView.as_view(), name='lista_posts'),
+    path('posts/buscar/', BuscarPostsView.as_view(), name='buscar_posts'),
     path('posts/<int:id>/', DetallePostView.as_view(), name='detalle_post'),
+    path('posts/<int:id>/publicar-todo/', PublicarTodoView.as_view(), name='publicar_todo'),
     path('posts/<int:id>/eliminar/', EliminarPostView.as_view(), name='eliminar_post'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('stats/', EstadisticasPublicacionesView.as_view(), name='estadisticas_publicaciones'),
+    path('diagnostico/http/', EstadisticasHTTPView.as_view(), name='estadisticas_http'),
+    path('diagnostico/cache/', MetricasCacheView.as_view(), name='metricas_cache'),
     path('tiktok/auth/', TikTokAuthView.as_view(), name='tiktok_auth'),
     path('tiktok/callback/', TikTokCallbackView.as_view(), name='tiktok_callback'),
     path('tiktok/token/', TikTokTokenView.as_view(), name='tiktok_token'),
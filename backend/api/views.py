@@ -3,17 +3,36 @@ from rest_framework.response import Response
 from rest_framework import status, generics
 from django.utils import timezone
 from django.shortcuts import redirect, render, get_object_or_404
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.views import View
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from django.db.models import Count, Exists, F, Max, OuterRef
+from rest_framework.exceptions import ValidationError
+import asyncio
 import os
+import time
+import json
+import datetime
 
 # Importamos tus modelos y servicios
-from .models import Post, Publication, SocialCredential
-from .llm_service import adaptar_contenido_con_gemini
-from .social_service import publicar_en_facebook, publicar_en_linkedin, publicar_en_whatsapp, publicar_en_instagram, publicar_en_tiktok, get_tiktok_auth_url, get_tiktok_access_token
-from .serializers import PostSerializer
-from .notification_service import notify_success, notify_error, notify_manual_action
+from .models import Post, Publication, SocialCredential, PublishJob, Tombstone, UploadSession
+from .llm_service import adaptar_contenido_con_gemini, adaptar_contenido_en_streaming
+from .social_service import get_tiktok_auth_url, get_tiktok_access_token
+from .serializers import PostSerializer, PostListSerializer, PublicationSerializer
+from .pagination import PostCursorPagination
+from .conditional import ConditionalGetMixin, calcular_etag
+from .publish_service import validar_parametros, publicar_todo
+from .publish_queue import encolar_publicacion, encolar_todo
+from .adaptation_service import crear_borradores, adaptar_y_guardar_lote, formatear_adaptacion, guardar_adaptacion
+from .http_client import pool_stats
+from .image_prefetch import es_url_pollinations
+from .image_variants import ESPECIFICACIONES, obtener_variante, ruta_local
+from .upload_service import guardar_en_storage, crear_sesion, anadir_chunk, ErrorSubida
+from .stats_service import campo_total
+from . import adaptation_cache, event_bus, pexels_cache, search_service, stats_service, sync_service
 
 # --- VISTAS DE ESCRITURA/PUBLICACIÓN (POST) ---
 
@@ -41,35 +60,233 @@ class AdaptarContenidoView(APIView):
             return Response(adaptaciones_json, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # C. Guardar las Adaptaciones como "Borradores" (Drafts)
-        response_data = {"post_id": nuevo_post.id, "adaptaciones": {}}
-        
-        for plataforma, datos in adaptaciones_json.items():
-            texto_adaptado = datos.get('text', '')
-            hashtags = datos.get('hashtags', [])
-            
-            pub = Publication.objects.create(
-                post=nuevo_post,
-                plataforma=plataforma,
-                contenido_adaptado=texto_adaptado,
-                hashtags=hashtags,
-                estado='draft'
-            )
-            
-            response_data["adaptaciones"][plataforma] = {
-                "id": pub.id,
-                "texto": texto_adaptado,
-                "hashtags": hashtags,
-                "image_prompt": datos.get('suggested_image_prompt'),
-                "generated_image_url": datos.get('generated_image_url'),
-                "generated_video_url": datos.get('generated_video_url'),
-                "video_hook": datos.get('video_hook')
-            }
+        response_data = {
+            "post_id": nuevo_post.id,
+            "adaptaciones": crear_borradores(nuevo_post, adaptaciones_json)
+        }
 
         return Response(response_data, status=status.HTTP_201_CREATED)
 
+class AdaptarLoteView(APIView):
+    """
+    Adapta muchos posts en una sola petición.
+    Endpoint: POST /api/adaptar/lote/
+
+    Acepta un array JSON de {"titulo", "contenido"} (o {"posts": [...]}) o un
+    archivo JSONL en el campo 'file'. Parámetros opcionales: posts_por_prompt
+    y concurrencia. Responde en streaming (NDJSON) con una línea por post a
+    medida que se terminan, y una línea final con el resumen.
+    """
+    def post(self, request, *args, **kwargs):
+        try:
+            posts = self._leer_posts(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not posts:
+            return Response({"error": "No se recibieron posts"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(posts) > settings.BULK_ADAPT_MAX_ITEMS:
+            return Response(
+                {"error": f"Máximo {settings.BULK_ADAPT_MAX_ITEMS} posts por petición"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        opciones = request.data if isinstance(request.data, dict) else {}
+        try:
+            posts_por_prompt = int(request.query_params.get('posts_por_prompt') or opciones.get('posts_por_prompt') or 1)
+            concurrencia = int(request.query_params.get('concurrencia') or opciones.get('concurrencia') or settings.BULK_ADAPT_MAX_WORKERS)
+        except (TypeError, ValueError):
+            return Response({"error": "posts_por_prompt y concurrencia deben ser enteros"}, status=status.HTTP_400_BAD_REQUEST)
+        posts_por_prompt = min(max(posts_por_prompt, 1), settings.BULK_ADAPT_MAX_POSTS_PER_PROMPT)
+        concurrencia = min(max(concurrencia, 1), settings.BULK_ADAPT_MAX_WORKERS)
+
+        # Los elementos inválidos se reportan sin llamar a Gemini
+        validos, invalidos = [], []
+        for indice, item in enumerate(posts):
+            if isinstance(item, dict) and item.get('titulo') and item.get('contenido'):
+                validos.append((indice, {'titulo': str(item['titulo'])[:200], 'contenido': str(item['contenido'])}))
+            else:
+                invalidos.append(indice)
+
+        def stream():
+            total_ok = 0
+            for indice in invalidos:
+                yield json.dumps({"index": indice, "status": "error", "error": "Faltan datos"}) + "\n"
+
+            resultados = adaptar_y_guardar_lote([post for _, post in validos], posts_por_prompt, concurrencia)
+            for resultado in resultados:
+                # Traducimos el índice dentro de 'validos' al índice original del request
+                resultado["index"] = validos[resultado["index"]][0]
+                if resultado["status"] == "ok":
+                    total_ok += 1
+                yield json.dumps(resultado, ensure_ascii=False) + "\n"
+
+            yield json.dumps({"resumen": {"total": len(posts), "ok": total_ok, "errores": len(posts) - total_ok}}) + "\n"
+
+        return _respuesta_streaming(request, stream(), content_type='application/x-ndjson', status=200)
+
+    def _leer_posts(self, request):
+        archivo = request.FILES.get('file')
+        if archivo:
+            posts = []
+            for numero, linea in enumerate(archivo, start=1):
+                try:
+                    linea = linea.decode('utf-8').strip()
+                    if not linea:
+                        continue
+                    posts.append(json.loads(linea))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    raise ValueError(f"JSON inválido en la línea {numero} del archivo")
+            return posts
+
+        data = request.data
+        if isinstance(data, dict):
+            data = data.get('posts')
+        if not isinstance(data, list):
+            raise ValueError("Se esperaba un array JSON de posts o un archivo JSONL")
+        return data
+
+class AdaptarStreamView(APIView):
+    """
+    Adaptación en streaming con Server-Sent Events.
+    Endpoint: POST /api/adaptar/stream/ (JSON) o GET con ?titulo=&contenido= (EventSource)
+
+    Eventos: 'plataforma' (cada adaptación en cuanto Gemini la completa), 'media'
+    (URLs de imagen/video a medida que se resuelven), 'fin' y 'error'. El Post y sus
+    Borradores se guardan en una transacción al terminar: los IDs llegan en 'fin'.
+    """
+    def get(self, request, *args, **kwargs):
+        return self._stream(request.query_params.get('titulo'), request.query_params.get('contenido'))
+
+    def post(self, request, *args, **kwargs):
+        return self._stream(request.data.get('titulo'), request.data.get('contenido'))
+
+    def _stream(self, titulo, contenido):
+        if not titulo or not contenido:
+            return Response({"error": "Faltan datos"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def eventos():
+            adaptaciones_json = None
+            for tipo, plataforma, datos in adaptar_contenido_en_streaming(titulo, contenido):
+                if tipo == 'plataforma':
+                    # Aún sin guardar: la adaptación va sin ID
+                    borrador = Publication(contenido_adaptado=datos.get('text', ''), hashtags=datos.get('hashtags', []))
+                    yield _evento_sse('plataforma', {
+                        "plataforma": plataforma,
+                        "adaptacion": formatear_adaptacion(borrador, datos)
+                    })
+
+                elif tipo == 'media':
+                    campo, url = datos
+                    yield _evento_sse('media', {"plataforma": plataforma, "campo": campo, "url": url})
+
+                elif tipo == 'fin':
+                    adaptaciones_json = datos
+
+                else:
+                    yield _evento_sse('error', {"error": datos})
+
+            if adaptaciones_json is not None:
+                nuevo_post, adaptaciones = guardar_adaptacion(titulo, contenido, adaptaciones_json)
+                yield _evento_sse('fin', {"post_id": nuevo_post.id, "adaptaciones": adaptaciones})
+
+        response = _respuesta_streaming(self.request, eventos(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Evita que nginx acumule los eventos
+        return response
+
+
+def _evento_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+def _respuesta_streaming(request, generador, **kwargs):
+    """
+    StreamingHttpResponse para un generador síncrono (Gemini, BD). Bajo ASGI Django
+    consumiría un iterador síncrono entero antes de enviar nada, así que se recorre
+    como iterador asíncrono, paso a paso en el hilo de la petición.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        generador = _iterar_en_hilo(generador)
+    return StreamingHttpResponse(generador, **kwargs)
+
+
+async def _iterar_en_hilo(generador):
+    siguiente = sync_to_async(next)
+    fin = object()
+    try:
+        while (elemento := await siguiente(generador, fin)) is not fin:
+            yield elemento
+    finally:
+        # El cliente se desconectó (o terminó): se cierra el generador en su hilo
+        await sync_to_async(generador.close)()
+
+class EventosPublicacionesView(View):
+    """
+    Stream SSE con los cambios de estado de las Publicaciones (queued, publishing,
+    published, failed, manual) a medida que ocurren, sin sondear.
+    Endpoint: GET /api/eventos/publicaciones/?post=<id>&publication=<id>
+
+    Vista asíncrona: con un servidor ASGI (`uvicorn backend.asgi:application`) cada
+    conexión abierta no ocupa un hilo. Bajo WSGI (runserver) Django no puede enviar un
+    stream asíncrono por partes, así que se responde al primer evento o latido y el
+    navegador reconecta solo (EventSource) con Last-Event-ID.
+    """
+    async def get(self, request, *args, **kwargs):
+        try:
+            post_id = int(request.GET['post']) if request.GET.get('post') else None
+            publication_id = int(request.GET['publication']) if request.GET.get('publication') else None
+            ultimo_id = int(request.headers.get('Last-Event-ID') or 0)
+        except ValueError:
+            return JsonResponse({"error": "'post', 'publication' y Last-Event-ID deben ser enteros"}, status=400)
+
+        def filtro(evento):
+            return (
+                (post_id is None or evento['post_id'] == post_id)
+                and (publication_id is None or evento['publication_id'] == publication_id)
+            )
+
+        return StreamingHttpResponse(
+            self._eventos(filtro, ultimo_id, continuo=isinstance(request, ASGIRequest)),
+            content_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+
+    async def _eventos(self, filtro, ultimo_id, continuo):
+        bus = event_bus.bus()
+        suscripcion = bus.suscribir(filtro)
+        try:
+            yield "retry: 3000\n\n"
+
+            # Eventos perdidos durante la reconexión (solo si el bus los guarda)
+            repetidos_hasta = 0
+            if ultimo_id:
+                for evento in await sync_to_async(bus.historial)(ultimo_id):
+                    if filtro(evento):
+                        yield f"id: {evento['id']}\n" + _evento_sse('estado', evento)
+                    repetidos_hasta = evento['id']
+                if repetidos_hasta and not continuo:
+                    return
+
+            while True:
+                try:
+                    evento = await suscripcion.siguiente(settings.EVENT_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                else:
+                    if evento['id'] <= repetidos_hasta:
+                        continue
+                    yield f"id: {evento['id']}\n" + _evento_sse('estado', evento)
+                if not continuo:
+                    return
+        finally:
+            suscripcion.cerrar()
+
 class PublicarContenidoView(APIView):
     """
-    Recibe el ID de una Publicación y la lanza a la API real.
+    Recibe el ID de una Publicación y la encola para publicarla en segundo plano.
+    Un worker (`manage.py run_publish_workers`) la lanza a la API real.
+    Responde 202 con el ID del job para consultar su estado.
     """
     def post(self, request, *args, **kwargs):
         publication_id = request.data.get('publication_id')
@@ -81,62 +298,86 @@ class PublicarContenidoView(APIView):
         except Publication.DoesNotExist:
             return Response({"error": "Publicación no encontrada"}, status=404)
 
-        # Incrementar contador de reintentos
-        pub.retry_count += 1
-        pub.save()
+        error = validar_parametros(pub, image_url, video_url, whatsapp_number)
+        if error:
+            return Response({"error": error}, status=400)
 
-        resultado = {}
+        # Incrementar contador de reintentos (UPDATE atómico, sin pisar el resto de campos)
+        Publication.objects.filter(id=pub.id).update(retry_count=F('retry_count') + 1, updated_at=timezone.now())
 
-        # --- SWITCH DE PLATAFORMAS ---
-        if pub.plataforma == 'facebook':
-            # Facebook ahora soporta imagen opcional
-            resultado = publicar_en_facebook(pub.contenido_adaptado, image_url)
-            
-        elif pub.plataforma == 'whatsapp':
-            if not whatsapp_number:
-                return Response({"error": "WhatsApp requiere número destino"}, status=400)
-            resultado = publicar_en_whatsapp(pub.contenido_adaptado, whatsapp_number)
+        job = encolar_publicacion(pub, image_url, video_url, whatsapp_number)
 
-        elif pub.plataforma == 'instagram':
-            resultado = publicar_en_instagram(pub.contenido_adaptado, image_url)
+        return Response({
+            "platform": pub.plataforma,
+            "status": "queued",
+            "job_id": job.id,
+            "publication_id": pub.id
+        }, status=status.HTTP_202_ACCEPTED)
 
-        elif pub.plataforma == 'linkedin':
-            resultado = publicar_en_linkedin(pub.contenido_adaptado)
-            
-        elif pub.plataforma == 'tiktok':
-            # Usar video_url si viene en el request, sino intentar usar image_url o fallar
-            media_url = video_url or image_url
-            if not media_url:
-                 return Response({"error": "TikTok requiere video_url"}, status=400)
-            resultado = publicar_en_tiktok(media_url, pub.contenido_adaptado)
-
-        # --- ACTUALIZAR BD Y NOTIFICAR ---
-        if resultado.get('status') == 'success':
-            pub.estado = 'published'
-            pub.api_id = str(resultado.get('id') or resultado.get('sid'))
-            pub.published_url = resultado.get('url', '')
-            pub.fecha_publicacion = timezone.now()
-            pub.last_error = None
-            
-            # Notificar éxito
-            notify_success(pub.plataforma, pub.post.id, pub.api_id)
-            
-        elif resultado.get('status') == 'manual_action_required':
-            pub.estado = 'manual'
-            notify_manual_action(pub.plataforma, pub.post.id)
-            
-        else:
-            pub.estado = 'failed'
-            error_msg = str(resultado.get('message'))
-            pub.error_log = error_msg
-            pub.last_error = error_msg
-            
-            # Notificar error
-            notify_error(pub.plataforma, pub.post.id, error_msg)
+class EstadoPublishJobView(APIView):
+    """
+    Devuelve el estado de un job de publicación.
+    Endpoint: GET /api/publicar/jobs/<id>/
+    """
+    def get(self, request, id, *args, **kwargs):
+        job = get_object_or_404(PublishJob.objects.select_related('publication'), id=id)
+        return Response({
+            "job_id": job.id,
+            "publication_id": job.publication_id,
+            "platform": job.publication.plataforma,
+            "status": job.estado,
+            "estado_publicacion": job.publication.estado,
+            "attempts": job.attempts,
+            "resultado": job.resultado,
+            "last_error": job.last_error
+        })
+
+class PublicarTodoView(APIView):
+    """
+    Publica un Post en todas sus plataformas en paralelo y devuelve un resultado agregado.
+    Endpoint: POST /api/posts/<id>/publicar-todo/
+
+    Body: image_url / video_url / whatsapp_number como valores por defecto y, opcionalmente,
+    "opciones": {"instagram": {"image_url": ...}, ...} y "plataformas": ["facebook", ...].
 
-        pub.save()
+    Con "en_segundo_plano": true no espera a las plataformas: encola un job por cada una,
+    responde 202 y el progreso llega por GET /api/eventos/publicaciones/.
+    """
+    def post(self, request, id, *args, **kwargs):
+        post = get_object_or_404(Post, id=id)
+
+        defaults = {
+            'image_url': request.data.get('image_url'),
+            'video_url': request.data.get('video_url'),
+            'whatsapp_number': request.data.get('whatsapp_number'),
+        }
+        opciones = request.data.get('opciones') or {}
+        if not isinstance(opciones, dict):
+            return Response({"error": "'opciones' debe ser un objeto por plataforma"}, status=400)
 
-        return Response(resultado, status=200)
+        opciones_por_plataforma = {}
+        for plataforma, _ in Publication.PLATAFORMAS:
+            propias = opciones.get(plataforma) or {}
+            opciones_por_plataforma[plataforma] = {
+                clave: propias.get(clave) or valor for clave, valor in defaults.items()
+            }
+
+        if request.data.get('en_segundo_plano'):
+            jobs, errores = encolar_todo(post, opciones_por_plataforma, request.data.get('plataformas'))
+            return Response({
+                "post_id": post.id,
+                "jobs": jobs,
+                "errores": errores
+            }, status=status.HTTP_202_ACCEPTED)
+
+        inicio = time.monotonic()
+        resultados = publicar_todo(post, opciones_por_plataforma, request.data.get('plataformas'))
+
+        return Response({
+            "post_id": post.id,
+            "resultados": resultados,
+            "duracion_segundos": round(time.monotonic() - inicio, 2)
+        }, status=200)
 
 class EliminarPostView(APIView):
     """
@@ -148,7 +389,8 @@ class EliminarPostView(APIView):
             post = Post.objects.get(id=id)
             post_titulo = post.titulo
             
-            # models.CASCADE en el ForeignKey asegura que las Publicaciones se eliminen automáticamente
+            # models.CASCADE en el ForeignKey asegura que las Publicaciones se eliminen automáticamente.
+            # Las señales post_delete dejan un Tombstone de cada uno para GET /api/sync/
             post.delete()
             
             return Response(
@@ -163,7 +405,8 @@ class EliminarPostView(APIView):
 
 class UploadMediaView(APIView):
     """
-    Sube un archivo (imagen o video) y devuelve su URL pública.
+    Sube un archivo (imagen o video) y devuelve su URL pública y su SHA-256.
+    El archivo se copia al storage por chunks, sin cargarlo entero en memoria.
     """
     def post(self, request, *args, **kwargs):
         file_obj = request.FILES.get('file')
@@ -171,30 +414,306 @@ class UploadMediaView(APIView):
             return Response({"error": "No file provided"}, status=400)
         
         # Guardar archivo
-        file_name = default_storage.save(file_obj.name, ContentFile(file_obj.read()))
+        file_name, sha256 = guardar_en_storage(file_obj, file_obj.name)
         file_url = request.build_absolute_uri(default_storage.url(file_name))
         
-        return Response({"url": file_url}, status=201)
+        return Response({"url": file_url, "sha256": sha256}, status=201)
+
+
+def _respuesta_sesion(request, sesion, status=200):
+    """
+    Estado de una subida reanudable (también en cabeceras Upload-Offset/Upload-Length, estilo tus).
+    """
+    datos = {
+        "id": str(sesion.id),
+        "offset": sesion.offset,
+        "size": sesion.total_size,
+        "completado": sesion.completado,
+    }
+    if sesion.completado:
+        datos["url"] = request.build_absolute_uri(default_storage.url(sesion.archivo))
+        datos["sha256"] = sesion.sha256
+
+    response = Response(datos, status=status)
+    response['Upload-Offset'] = str(sesion.offset)
+    response['Upload-Length'] = str(sesion.total_size)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class CrearSubidaReanudableView(APIView):
+    """
+    Crea una subida reanudable.
+    Endpoint: POST /api/upload/sesiones/  {"filename": "video.mp4", "size": 123456}
+    """
+    def post(self, request, *args, **kwargs):
+        try:
+            total_size = int(request.data.get('size') or request.headers.get('Upload-Length') or 0)
+            sesion = crear_sesion(request.data.get('filename'), total_size)
+        except ValueError:
+            return Response({"error": "'size' debe ser un entero"}, status=400)
+        except ErrorSubida as e:
+            return Response({"error": str(e)}, status=e.status)
+
+        response = _respuesta_sesion(request, sesion, status=201)
+        response['Location'] = request.build_absolute_uri(f"{request.path.rstrip('/')}/{sesion.id}/")
+        return response
+
+
+class SubidaReanudableView(APIView):
+    """
+    HEAD/GET: offset actual de la subida (para reanudar tras un corte).
+    PATCH: añade un chunk. Cabecera Upload-Offset = offset del chunk; cuerpo = bytes crudos.
+    Endpoint: /api/upload/sesiones/<uuid>/
+    """
+    def get(self, request, id):
+        sesion = get_object_or_404(UploadSession, id=id)
+        return _respuesta_sesion(request, sesion)
+
+    def head(self, request, id):
+        return self.get(request, id)
+
+    def patch(self, request, id):
+        get_object_or_404(UploadSession, id=id)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            longitud = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response({"error": "Faltan las cabeceras Upload-Offset y Content-Length"}, status=400)
+
+        try:
+            # Se lee el cuerpo crudo en streaming (no request.data)
+            sesion = anadir_chunk(id, offset, request._request, longitud)
+        except ErrorSubida as e:
+            sesion = UploadSession.objects.get(id=id)
+            response = _respuesta_sesion(request, sesion, status=e.status)
+            response.data["error"] = str(e)
+            return response
+
+        return _respuesta_sesion(request, sesion)
+
+class VarianteMediaView(APIView):
+    """
+    Redirige a la variante de una imagen (por plataforma o miniatura), generándola si hace falta.
+    Endpoint: GET /api/media/variante/?url=<url de la imagen>&spec=thumb
+    Si una imagen de Pollinations aún no tiene copia local, redirige a la original.
+    """
+    def get(self, request, *args, **kwargs):
+        url = request.query_params.get('url')
+        spec = request.query_params.get('spec', 'thumb')
+        if not url:
+            return Response({"error": "Falta 'url'"}, status=400)
+        if spec not in ESPECIFICACIONES:
+            return Response({"error": f"'spec' debe ser uno de: {', '.join(ESPECIFICACIONES)}"}, status=400)
+
+        ruta = ruta_local(url)
+        if not ruta:
+            # Solo redirigimos a orígenes conocidos (evita un open redirect)
+            if es_url_pollinations(url):
+                return redirect(url)
+            return Response({"error": "La imagen no está en nuestro storage"}, status=404)
+        try:
+            variante = obtener_variante(ruta, spec)
+        except Exception as e:
+            return Response({"error": f"No se pudo generar la variante: {e}"}, status=422)
+
+        response = redirect(request.build_absolute_uri(default_storage.url(variante.archivo)))
+        response['Cache-Control'] = 'public, max-age=86400'
+        return response
 
 # --- VISTAS DE LECTURA (GET) ---
 
-class ListaPostsView(generics.ListAPIView):
+def _parametro_fecha(params, nombre):
+    valor = params.get(nombre)
+    if not valor:
+        return None
+    try:
+        return datetime.date.fromisoformat(valor)
+    except ValueError:
+        raise ValidationError({nombre: "Formato esperado: YYYY-MM-DD"})
+
+class ListaPostsView(ConditionalGetMixin, generics.ListAPIView):
     """
-    Devuelve la lista de todos los posts y sus estados.
-    Endpoint: GET /api/posts/
+    Devuelve los posts y sus estados, paginados por cursor (más recientes primero).
+    Endpoint: GET /api/posts/?cursor=<cursor>&page_size=<n>
+
+    Filtros: plataforma, estado (una misma Publicación debe cumplir ambos),
+    desde / hasta (YYYY-MM-DD, inclusive) y con_fallos=true.
+
+    Usa el resumen desnormalizado de cada Post: no carga sus Publicaciones.
+    Soporta GET condicional (ETag / Last-Modified -> 304).
     """
-    queryset = Post.objects.all().order_by('-fecha_creacion')
-    serializer_class = PostSerializer
+    serializer_class = PostListSerializer
+    pagination_class = PostCursorPagination
+
+    def validadores(self):
+        # Marca de cambios global, con dos MAX por índice y sin tocar los filtros: cualquier
+        # cambio visible en el listado toca Post.updated_at (el resumen se actualiza con cada
+        # cambio de estado) y cada borrado deja un Tombstone. Invalida de más, nunca de menos.
+        ultima = Post.objects.aggregate(ultima=Max('updated_at'))['ultima']
+        borrado = Tombstone.objects.aggregate(ultimo=Max('updated_at'))['ultimo']
+        last_modified = max(filter(None, (ultima, borrado)), default=None)
+        etag = calcular_etag(self.request.get_full_path(), ultima, borrado)
+        return etag, last_modified
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = Post.objects.all()
+
+        # Con plataforma: EXISTS sobre el índice (plataforma, estado), sin JOIN ni duplicados.
+        # Solo estado / con_fallos: basta el contador desnormalizado del Post.
+        pubs = Publication.objects.filter(post=OuterRef('pk'))
+        plataforma = params.get('plataforma')
+        estado = params.get('estado')
+        if plataforma:
+            if plataforma not in dict(Publication.PLATAFORMAS):
+                raise ValidationError({"plataforma": f"Plataforma desconocida: {plataforma}"})
+            pubs = pubs.filter(plataforma=plataforma)
+        if estado:
+            if estado not in dict(Publication.ESTADOS):
+                raise ValidationError({"estado": f"Estado desconocido: {estado}"})
+            pubs = pubs.filter(estado=estado)
+        if plataforma:
+            queryset = queryset.filter(Exists(pubs))
+        elif estado:
+            queryset = queryset.filter(**{f'{campo_total(estado)}__gt': 0})
+
+        if params.get('con_fallos') in ('true', '1'):
+            queryset = queryset.filter(total_failed__gt=0)
+
+        # Rangos sobre la columna (no __date) para que se use el índice de fecha_creacion
+        desde = self._fecha(params, 'desde')
+        hasta = self._fecha(params, 'hasta')
+        if desde:
+            queryset = queryset.filter(fecha_creacion__gte=desde)
+        if hasta:
+            queryset = queryset.filter(fecha_creacion__lt=hasta + datetime.timedelta(days=1))
+        return queryset
 
-class DetallePostView(generics.RetrieveAPIView):
+    def _fecha(self, params, nombre):
+        fecha = _parametro_fecha(params, nombre)
+        if fecha is None:
+            return None
+        return timezone.make_aware(datetime.datetime.combine(fecha, datetime.time.min))
+
+class BuscarPostsView(APIView):
+    """
+    Búsqueda de texto completo en título, contenido original y adaptaciones.
+    Endpoint: GET /api/posts/buscar/?q=<texto>&limit=20&offset=0
+    Resultados ordenados por relevancia.
+    """
+    def get(self, request, *args, **kwargs):
+        q = (request.query_params.get('q') or '').strip()
+        if not q:
+            return Response({"error": "Falta el parámetro 'q'"}, status=400)
+        try:
+            limit = min(max(int(request.query_params.get('limit', settings.POSTS_PAGE_SIZE)), 1), settings.POSTS_MAX_PAGE_SIZE)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({"error": "'limit' y 'offset' deben ser enteros"}, status=400)
+
+        # Pedimos uno de más para saber si hay otra página
+        ids = search_service.buscar(q, limit + 1, offset)
+        hay_mas = len(ids) > limit
+        ids = ids[:limit]
+
+        posts = Post.objects.prefetch_related('publications').in_bulk(ids)
+        ordenados = [posts[post_id] for post_id in ids if post_id in posts]
+
+        return Response({
+            "q": q,
+            "motor": search_service.motor() or "icontains",
+            "results": PostSerializer(ordenados, many=True, context={'request': request}).data,
+            "next_offset": offset + limit if hay_mas else None,
+        })
+
+class DetallePostView(ConditionalGetMixin, generics.RetrieveAPIView):
     """
     Devuelve un post específico por su ID.
     Endpoint: GET /api/posts/<id>/
+    Soporta GET condicional (ETag / Last-Modified -> 304).
     """
-    queryset = Post.objects.all()
+    queryset = Post.objects.prefetch_related('publications')
     serializer_class = PostSerializer
     lookup_field = 'id'
 
+    def validadores(self):
+        fila = (
+            Post.objects.filter(id=self.kwargs['id'])
+            .annotate(total=Count('publications'), ultima_pub=Max('publications__updated_at'))
+            .values('updated_at', 'total', 'ultima_pub')
+            .first()
+        )
+        if fila is None:
+            return None, None
+        ultima = max(filter(None, [fila['updated_at'], fila['ultima_pub']]))
+        return calcular_etag(self.kwargs['id'], fila['total'], fila['updated_at'], fila['ultima_pub']), ultima
+
+class SyncView(APIView):
+    """
+    Feed de cambios incrementales para clientes que sondean (dashboard).
+    Endpoint: GET /api/sync/?since=<cursor>
+    Sin `since` devuelve solo el cursor actual. Con `mas: true` hay más cambios
+    pendientes; con `reiniciar: true` el cliente debe recargar el listado completo.
+    """
+    def get(self, request, *args, **kwargs):
+        since = request.query_params.get('since')
+        try:
+            desde = sync_service.decodificar_cursor(since) if since else None
+        except (ValueError, OverflowError):
+            return Response({"error": "Cursor inválido"}, status=400)
+
+        cambios = sync_service.cambios(desde)
+        eliminados = {'posts': [], 'publicaciones': []}
+        for modelo, objeto_id in cambios['eliminados'].values_list('modelo', 'objeto_id'):
+            eliminados['posts' if modelo == 'post' else 'publicaciones'].append(objeto_id)
+
+        contexto = {'request': request}
+        return Response({
+            "cursor": cambios['cursor'],
+            "mas": cambios['mas'],
+            "reiniciar": cambios['reiniciar'],
+            "posts": PostListSerializer(cambios['posts'], many=True, context=contexto).data,
+            "publicaciones": PublicationSerializer(cambios['publicaciones'], many=True, context=contexto).data,
+            "eliminados": eliminados,
+        })
+
+class EstadisticasPublicacionesView(APIView):
+    """
+    Totales por plataforma, estado y día, tasa de éxito y tiempo medio hasta publicar.
+    Endpoint: GET /api/stats/?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&plataforma=<plataforma>
+    Se lee del rollup PublicationStat (no recorre las Publicaciones).
+    """
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        plataforma = params.get('plataforma')
+        if plataforma and plataforma not in dict(Publication.PLATAFORMAS):
+            raise ValidationError({"plataforma": f"Plataforma desconocida: {plataforma}"})
+        return Response(stats_service.estadisticas(
+            desde=_parametro_fecha(params, 'desde'),
+            hasta=_parametro_fecha(params, 'hasta'),
+            plataforma=plataforma,
+        ))
+
+class EstadisticasHTTPView(APIView):
+    """
+    Estadísticas de los pools de conexiones HTTP salientes (por host).
+    Endpoint: GET /api/diagnostico/http/
+    """
+    def get(self, request):
+        return Response(pool_stats())
+
+class MetricasCacheView(APIView):
+    """
+    Métricas de las cachés de adaptaciones de Gemini y de búsquedas de Pexels (hits/misses por nivel).
+    Endpoint: GET /api/diagnostico/cache/
+    """
+    def get(self, request):
+        return Response({
+            "adaptaciones": adaptation_cache.metricas(),
+            "pexels": pexels_cache.metricas(),
+        })
+
 # --- TIKTOK AUTH ---
 
 class TikTokAuthView(APIView):
@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Servir con `uvicorn backend.asgi:application`: el stream SSE de estados
+(/api/eventos/publicaciones/) es asíncrono y así no ocupa un hilo por conexión.
 """
 
 import os
@@ -67,6 +67,11 @@ if FRONTEND_URL:
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Cabeceras de las subidas reanudables (estilo tus) y ETag del GET condicional de posts
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = [*default_headers, 'upload-offset', 'upload-length']
+CORS_EXPOSE_HEADERS = ['upload-offset', 'upload-length', 'location', 'etag']
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -109,6 +114,14 @@ DATABASES = {
     )
 }
 
+# SQLite: transacciones IMMEDIATE para que varios hilos (workers de publicación,
+# adaptación en lote) escriban sin deadlocks al pasar de lectura a escritura.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -146,11 +159,21 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-if not DEBUG:
-    STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-else:
-    STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Media: storage direccionado por contenido (SHA-256, deduplicado) salvo MEDIA_CONTENT_ADDRESSED=False
+MEDIA_CONTENT_ADDRESSED = os.getenv('MEDIA_CONTENT_ADDRESSED', 'True') == 'True'
+
+STORAGES = {
+    "default": {
+        "BACKEND": "api.storage.ContentAddressedStorage" if MEDIA_CONTENT_ADDRESSED
+        else "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+        else "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -159,4 +182,93 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Media files (uploads)
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Cola de publicación en segundo plano (manage.py run_publish_workers)
+PUBLISH_WORKERS = int(os.getenv('PUBLISH_WORKERS', '4'))
+PUBLISH_WORKER_POLL_INTERVAL = float(os.getenv('PUBLISH_WORKER_POLL_INTERVAL', '1'))
+PUBLISH_JOB_LEASE_SECONDS = int(os.getenv('PUBLISH_JOB_LEASE_SECONDS', '900'))  # Tras esto, un job 'running' se considera huérfano
+PUBLISH_JOB_MAX_ATTEMPTS = int(os.getenv('PUBLISH_JOB_MAX_ATTEMPTS', '3'))
+PUBLISH_JOB_RETRY_DELAY = int(os.getenv('PUBLISH_JOB_RETRY_DELAY', '10'))
+
+# Instagram: 'poll' consulta el contenedor hasta que está listo; 'deferred' (solo en
+# los workers) reprograma el paso de publicación en la cola y libera el worker.
+INSTAGRAM_PUBLISH_MODE = os.getenv('INSTAGRAM_PUBLISH_MODE', 'poll')
+INSTAGRAM_CONTAINER_MAX_WAIT = int(os.getenv('INSTAGRAM_CONTAINER_MAX_WAIT', '120'))
+
+# Máximo de plataformas publicadas en paralelo por POST /api/posts/<id>/publicar-todo/
+PUBLISH_FANOUT_MAX_WORKERS = int(os.getenv('PUBLISH_FANOUT_MAX_WORKERS', '5'))
+
+# Pools HTTP salientes (api/http_client.py): conexiones keep-alive por host
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))
+HTTP_MAX_HOSTS = int(os.getenv('HTTP_MAX_HOSTS', '32'))
+
+# Caché del URN de LinkedIn (segundos). Se invalida si cambia el token o LinkedIn responde 401.
+LINKEDIN_URN_CACHE_TTL = int(os.getenv('LINKEDIN_URN_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Caché de adaptaciones de Gemini (memoria LRU + tabla AdaptationCache)
+ADAPTATION_CACHE_MAXSIZE = int(os.getenv('ADAPTATION_CACHE_MAXSIZE', '512'))
+ADAPTATION_CACHE_TTL = int(os.getenv('ADAPTATION_CACHE_TTL', str(30 * 24 * 3600)))
+
+# Adaptación en lote (POST /api/adaptar/lote/)
+BULK_ADAPT_MAX_ITEMS = int(os.getenv('BULK_ADAPT_MAX_ITEMS', '500'))
+BULK_ADAPT_MAX_WORKERS = int(os.getenv('BULK_ADAPT_MAX_WORKERS', '4'))
+BULK_ADAPT_MAX_POSTS_PER_PROMPT = int(os.getenv('BULK_ADAPT_MAX_POSTS_PER_PROMPT', '5'))
+
+# Pipeline de enriquecimiento de adaptaciones (imágenes/videos en paralelo)
+ENRICHMENT_MAX_WORKERS = int(os.getenv('ENRICHMENT_MAX_WORKERS', '8'))
+ENRICHMENT_TIMEOUT = float(os.getenv('ENRICHMENT_TIMEOUT', '10'))  # Segundos por enriquecedor
+
+# Caché de búsquedas de Pexels (memoria LRU + tabla StockVideoCache)
+PEXELS_CACHE_MAXSIZE = int(os.getenv('PEXELS_CACHE_MAXSIZE', '1024'))
+PEXELS_CACHE_TTL = int(os.getenv('PEXELS_CACHE_TTL', str(7 * 24 * 3600)))
+PEXELS_NEGATIVE_CACHE_TTL = int(os.getenv('PEXELS_NEGATIVE_CACHE_TTL', str(6 * 3600)))
+PEXELS_ROTATE_TOP_N = int(os.getenv('PEXELS_ROTATE_TOP_N', '1'))  # >1: alterna entre los N mejores resultados
+
+# Subida de videos a TikTok por chunks (FILE_UPLOAD): solo un chunk en memoria por subida
+TIKTOK_CHUNK_SIZE = int(os.getenv('TIKTOK_CHUNK_SIZE', str(10 * 1024 * 1024)))  # Se acota a 5-64 MB
+TIKTOK_CHUNK_MAX_RETRIES = int(os.getenv('TIKTOK_CHUNK_MAX_RETRIES', '3'))
+TIKTOK_DOWNLOAD_MAX_RESUMES = int(os.getenv('TIKTOK_DOWNLOAD_MAX_RESUMES', '3'))
+
+# Origen del video en TikTok: 'auto' (PULL_FROM_URL solo para dominios verificados),
+# 'pull' (siempre PULL_FROM_URL) o 'file' (siempre FILE_UPLOAD). Si PULL_FROM_URL falla se usa FILE_UPLOAD.
+TIKTOK_SOURCE_MODE = os.getenv('TIKTOK_SOURCE_MODE', 'auto')
+TIKTOK_PULL_DOMAINS = [d.strip().lower() for d in os.getenv('TIKTOK_PULL_DOMAINS', '').split(',') if d.strip()]
+
+# Subidas de media: copia por chunks y subidas reanudables (UploadSession)
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+RESUMABLE_UPLOAD_DIR = os.getenv('RESUMABLE_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads_tmp'))
+RESUMABLE_UPLOAD_MAX_SIZE = int(os.getenv('RESUMABLE_UPLOAD_MAX_SIZE', str(2 * 1024 * 1024 * 1024)))
+
+# Prefetch de imágenes de Pollinations al storage local (api/image_prefetch.py)
+IMAGE_PREFETCH_ENABLED = os.getenv('IMAGE_PREFETCH_ENABLED', 'True') == 'True'
+IMAGE_PREFETCH_MAX_WORKERS = int(os.getenv('IMAGE_PREFETCH_MAX_WORKERS', '4'))
+# URL pública del backend para que Meta pueda descargar nuestra media (ej. https://xxx.ngrok.io)
+PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL') or (f"https://{RENDER_EXTERNAL_HOSTNAME}" if RENDER_EXTERNAL_HOSTNAME else '')
+
+# Variantes de imagen por plataforma y miniaturas (api/image_variants.py); 0 = sin pool de procesos
+IMAGE_VARIANT_MAX_WORKERS = int(os.getenv('IMAGE_VARIANT_MAX_WORKERS', '2'))
+
+# Paginación por cursor de GET /api/posts/
+POSTS_PAGE_SIZE = int(os.getenv('POSTS_PAGE_SIZE', '20'))
+POSTS_MAX_PAGE_SIZE = int(os.getenv('POSTS_MAX_PAGE_SIZE', '100'))
+
+# Búsqueda de texto completo (FTS5 en SQLite, tsvector + GIN en PostgreSQL)
+FULLTEXT_SEARCH_CONFIG = os.getenv('FULLTEXT_SEARCH_CONFIG', 'spanish')  # Configuración de to_tsvector
+
+# Feed de cambios incrementales (GET /api/sync/?since=<cursor>)
+SYNC_MAX_ROWS = int(os.getenv('SYNC_MAX_ROWS', '500'))             # Filas máximas por tabla y respuesta
+SYNC_SAFETY_WINDOW = float(os.getenv('SYNC_SAFETY_WINDOW', '2'))  # Segundos: margen para transacciones en curso
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', '30'))
+
+# Bus de eventos de estado de Publicaciones (api/event_bus.py) y su stream SSE
+# - 'api.event_bus.BusEnMemoria' (por defecto): pub/sub en el propio proceso; el stream solo ve
+#   lo que se publica en su mismo proceso
+# - 'api.event_bus.BusEnBaseDeDatos': broker local sobre la tabla BusEvent; necesario cuando
+#   los workers corren aparte (`manage.py run_publish_workers`) o hay varios procesos web
+EVENT_BUS_BACKEND = os.getenv('EVENT_BUS_BACKEND', 'api.event_bus.BusEnMemoria')
+EVENT_BUS_POLL_INTERVAL = float(os.getenv('EVENT_BUS_POLL_INTERVAL', '0.5'))  # Segundos (solo BusEnBaseDeDatos)
+EVENT_BUS_POLL_OVERLAP = float(os.getenv('EVENT_BUS_POLL_OVERLAP', '5'))      # Segundos que se vuelven a leer en cada sondeo (commits tardíos)
+EVENT_BUS_RETENTION = int(os.getenv('EVENT_BUS_RETENTION', '3600'))           # Segundos que se guardan los eventos
+EVENT_BUS_QUEUE_SIZE = int(os.getenv('EVENT_BUS_QUEUE_SIZE', '1000'))         # Eventos pendientes por suscriptor
+EVENT_STREAM_HEARTBEAT = float(os.getenv('EVENT_STREAM_HEARTBEAT', '15'))     # Comentario SSE para mantener viva la conexión
@@ -1,20 +1,25 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { FaTrash, FaExternalLinkAlt, FaFilter } from 'react-icons/fa';
 
 const API_BASE_URL = 'http://127.0.0.1:8000/api';
+const SYNC_INTERVAL_MS = 30000; // Sondeo de /api/sync/ (solo trae lo que cambió)
 
 const Dashboard = () => {
     const navigate = useNavigate();
     const [posts, setPosts] = useState([]);
-    const [filteredPosts, setFilteredPosts] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextPage, setNextPage] = useState(null); // URL del siguiente cursor (paginación)
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [summary, setSummary] = useState(null); // Totales de /api/stats/ (no solo la página cargada)
+    const [details, setDetails] = useState({}); // Publicaciones de los posts desplegados (GET /posts/<id>/)
     const [filters, setFilters] = useState({
         status: 'all',
         dateFrom: '',
         dateTo: '',
-        platform: 'all'
+        platform: 'all',
+        onlyFailures: false
     });
 
     const platformIcons = {
@@ -32,18 +37,100 @@ const Dashboard = () => {
         manual: '📋'
     };
 
+    const syncCursor = useRef(null);
+    const filtersRef = useRef(filters);
+
     useEffect(() => {
+        filtersRef.current = filters;
         loadPosts();
-    }, []);
+        loadSummary();
+    }, [filters]);
 
+    // Cambios incrementales: se pide el cursor al montar y luego solo los cambios desde él
     useEffect(() => {
-        applyFilters();
-    }, [posts, filters]);
+        axios.get(`${API_BASE_URL}/sync/`)
+            .then(response => { syncCursor.current = response.data.cursor; })
+            .catch(error => console.error('Error iniciando sync:', error));
+        const interval = setInterval(syncChanges, SYNC_INTERVAL_MS);
+        return () => clearInterval(interval);
+    }, []);
+
+    const syncChanges = async () => {
+        if (!syncCursor.current) return;
+        try {
+            let data;
+            do {
+                const response = await axios.get(`${API_BASE_URL}/sync/`, { params: { since: syncCursor.current } });
+                data = response.data;
+                syncCursor.current = data.cursor;
+                if (data.reiniciar) {
+                    loadPosts();
+                    loadSummary();
+                    return;
+                }
+                applyChanges(data);
+            } while (data.mas);
+        } catch (error) {
+            console.error('Error sincronizando:', error);
+        }
+    };
+
+    const applyChanges = (data) => {
+        const { posts: changedPosts, publicaciones, eliminados } = data;
+        if (!changedPosts.length && !publicaciones.length && !eliminados.posts.length && !eliminados.publicaciones.length) {
+            return;
+        }
+
+        const changedById = Object.fromEntries(changedPosts.map(post => [post.id, post]));
+        const deletedPosts = new Set(eliminados.posts);
+        const f = filtersRef.current;
+        const unfiltered = f.status === 'all' && f.platform === 'all' && !f.dateFrom && !f.dateTo && !f.onlyFailures;
+
+        setPosts(prev => {
+            const known = new Set(prev.map(post => post.id));
+            // Posts nuevos arriba (solo sin filtros: no sabemos si cumplirían los del servidor)
+            const added = unfiltered
+                ? changedPosts.filter(post => !known.has(post.id)).sort((a, b) => b.id - a.id)
+                : [];
+            return [...added, ...prev.map(post => changedById[post.id] || post)]
+                .filter(post => !deletedPosts.has(post.id));
+        });
+
+        const deletedPubs = new Set(eliminados.publicaciones);
+        setDetails(prev => {
+            const next = {};
+            Object.entries(prev).forEach(([postId, pubs]) => {
+                if (deletedPosts.has(Number(postId))) return;
+                const changed = publicaciones.filter(pub => pub.post === Number(postId));
+                const merged = pubs
+                    .map(pub => changed.find(c => c.id === pub.id) || pub)
+                    .filter(pub => !deletedPubs.has(pub.id));
+                changed.forEach(c => { if (!merged.some(pub => pub.id === c.id)) merged.push(c); });
+                next[postId] = merged;
+            });
+            return next;
+        });
+
+        loadSummary();
+    };
+
+    // Los filtros se resuelven en el servidor (query params de /api/posts/)
+    const buildParams = () => {
+        const f = filtersRef.current; // También se llama desde el intervalo de sync
+        const params = {};
+        if (f.status !== 'all') params.estado = f.status;
+        if (f.platform !== 'all') params.plataforma = f.platform;
+        if (f.dateFrom) params.desde = f.dateFrom;
+        if (f.dateTo) params.hasta = f.dateTo;
+        if (f.onlyFailures) params.con_fallos = 'true';
+        return params;
+    };
 
     const loadPosts = async () => {
         try {
-            const response = await axios.get(`${API_BASE_URL}/posts/`);
-            setPosts(response.data);
+            const response = await axios.get(`${API_BASE_URL}/posts/`, { params: buildParams() });
+            setPosts(response.data.results);
+            setNextPage(response.data.next);
         } catch (error) {
             console.error('Error cargando posts:', error);
         } finally {
@@ -51,41 +138,39 @@ const Dashboard = () => {
         }
     };
 
-    const applyFilters = () => {
-        let filtered = [...posts];
-
-        // Filtro por fecha
-        if (filters.dateFrom) {
-            filtered = filtered.filter(post =>
-                new Date(post.fecha_creacion) >= new Date(filters.dateFrom)
-            );
-        }
-        if (filters.dateTo) {
-            filtered = filtered.filter(post =>
-                new Date(post.fecha_creacion) <= new Date(filters.dateTo)
-            );
+    const loadSummary = async () => {
+        const f = filtersRef.current;
+        const params = {};
+        if (f.platform !== 'all') params.plataforma = f.platform;
+        if (f.dateFrom) params.desde = f.dateFrom;
+        if (f.dateTo) params.hasta = f.dateTo;
+        try {
+            const response = await axios.get(`${API_BASE_URL}/stats/`, { params });
+            setSummary(response.data);
+        } catch (error) {
+            console.error('Error cargando estadísticas:', error);
         }
+    };
 
-        // Filtro por estado
-        if (filters.status !== 'all') {
-            filtered = filtered.filter(post =>
-                post.publications.some(pub => pub.estado === filters.status)
-            );
-        }
+    const countByStatus = (estado) => summary?.por_estado?.[estado] ?? 0;
 
-        // Filtro por plataforma
-        if (filters.platform !== 'all') {
-            filtered = filtered.filter(post =>
-                post.publications.some(pub => pub.plataforma === filters.platform)
-            );
+    const loadMore = async () => {
+        if (!nextPage) return;
+        setLoadingMore(true);
+        try {
+            const response = await axios.get(nextPage);
+            setPosts(prev => [...prev, ...response.data.results]);
+            setNextPage(response.data.next);
+        } catch (error) {
+            console.error('Error cargando más posts:', error);
+        } finally {
+            setLoadingMore(false);
         }
-
-        setFilteredPosts(filtered);
     };
 
     const handleFilterChange = (e) => {
-        const { name, value } = e.target;
-        setFilters(prev => ({ ...prev, [name]: value }));
+        const { name, value, type, checked } = e.target;
+        setFilters(prev => ({ ...prev, [name]: type === 'checkbox' ? checked : value }));
     };
 
     const handleDelete = async (postId) => {
@@ -96,25 +181,28 @@ const Dashboard = () => {
         try {
             await axios.delete(`${API_BASE_URL}/posts/${postId}/`);
             loadPosts();
+            loadSummary();
         } catch (error) {
             console.error('Error eliminando post:', error);
             alert('Error al eliminar el post');
         }
     };
 
-    const getPublicationStats = (publications) => {
-        const stats = {
-            published: 0,
-            draft: 0,
-            failed: 0,
-            manual: 0
-        };
-
-        publications.forEach(pub => {
-            stats[pub.estado]++;
-        });
-
-        return stats;
+    // El listado trae solo el resumen de estados; las publicaciones se piden al desplegar
+    const toggleDetails = async (postId) => {
+        if (details[postId]) {
+            setDetails(prev => {
+                const { [postId]: _, ...rest } = prev;
+                return rest;
+            });
+            return;
+        }
+        try {
+            const response = await axios.get(`${API_BASE_URL}/posts/${postId}/`);
+            setDetails(prev => ({ ...prev, [postId]: response.data.publications }));
+        } catch (error) {
+            console.error('Error cargando publicaciones:', error);
+        }
     };
 
     if (loading) {
@@ -204,6 +292,21 @@ const Dashboard = () => {
                                 onChange={handleFilterChange}
                             />
                         </div>
+                        <div className="col-12">
+                            <div className="form-check">
+                                <input
+                                    type="checkbox"
+                                    id="onlyFailures"
+                                    name="onlyFailures"
+                                    className="form-check-input"
+                                    checked={filters.onlyFailures}
+                                    onChange={handleFilterChange}
+                                />
+                                <label className="form-check-label small" htmlFor="onlyFailures">
+                                    Solo posts con publicaciones fallidas
+                                </label>
+                            </div>
+                        </div>
                     </div>
                 </div>
             </div>
@@ -214,7 +317,7 @@ const Dashboard = () => {
                     <div className="card text-center shadow-sm">
                         <div className="card-body">
                             <h3 className="fw-bold text-primary">{posts.length}</h3>
-                            <small className="text-muted">Total Posts</small>
+                            <small className="text-muted">Posts cargados{nextPage ? ' (hay más)' : ''}</small>
                         </div>
                     </div>
                 </div>
@@ -222,11 +325,11 @@ const Dashboard = () => {
                     <div className="card text-center shadow-sm">
                         <div className="card-body">
                             <h3 className="fw-bold text-success">
-                                {posts.reduce((acc, post) =>
-                                    acc + post.publications.filter(p => p.estado === 'published').length, 0
-                                )}
+                                {countByStatus('published')}
                             </h3>
-                            <small className="text-muted">Publicados</small>
+                            <small className="text-muted">
+                                Publicados{summary?.tasa_exito != null ? ` (${Math.round(summary.tasa_exito * 100)}% éxito)` : ''}
+                            </small>
                         </div>
                     </div>
                 </div>
@@ -234,9 +337,7 @@ const Dashboard = () => {
                     <div className="card text-center shadow-sm">
                         <div className="card-body">
                             <h3 className="fw-bold text-warning">
-                                {posts.reduce((acc, post) =>
-                                    acc + post.publications.filter(p => p.estado === 'draft').length, 0
-                                )}
+                                {countByStatus('draft')}
                             </h3>
                             <small className="text-muted">Borradores</small>
                         </div>
@@ -246,9 +347,7 @@ const Dashboard = () => {
                     <div className="card text-center shadow-sm">
                         <div className="card-body">
                             <h3 className="fw-bold text-danger">
-                                {posts.reduce((acc, post) =>
-                                    acc + post.publications.filter(p => p.estado === 'failed').length, 0
-                                )}
+                                {countByStatus('failed')}
                             </h3>
                             <small className="text-muted">Fallidos</small>
                         </div>
@@ -259,10 +358,10 @@ const Dashboard = () => {
             {/* Lista de Posts */}
             <div className="card shadow-sm">
                 <div className="card-header bg-dark text-white">
-                    <h6 className="m-0">Publicaciones ({filteredPosts.length})</h6>
+                    <h6 className="m-0">Publicaciones ({posts.length})</h6>
                 </div>
                 <div className="card-body p-0">
-                    {filteredPosts.length === 0 ? (
+                    {posts.length === 0 ? (
                         <div className="text-center py-5 text-muted">
                             <p>No hay publicaciones que coincidan con los filtros.</p>
                         </div>
@@ -280,8 +379,9 @@ const Dashboard = () => {
                                     </tr>
                                 </thead>
                                 <tbody>
-                                    {filteredPosts.map(post => {
-                                        const stats = getPublicationStats(post.publications);
+                                    {posts.map(post => {
+                                        const stats = post.estados;
+                                        const publications = details[post.id];
                                         return (
                                             <tr key={post.id}>
                                                 <td className="fw-bold">#{post.id}</td>
@@ -299,15 +399,41 @@ const Dashboard = () => {
                                                     </small>
                                                 </td>
                                                 <td>
-                                                    {post.publications.map(pub => (
-                                                        <span
-                                                            key={pub.id}
-                                                            className="me-1"
-                                                            title={pub.plataforma}
+                                                    {publications ? (
+                                                        <>
+                                                            {publications.map(pub => (
+                                                                <span
+                                                                    key={pub.id}
+                                                                    className="me-1"
+                                                                    title={`${pub.plataforma}: ${pub.estado}`}
+                                                                >
+                                                                    {platformIcons[pub.plataforma]}
+                                                                </span>
+                                                            ))}
+                                                            {publications.some(pub => pub.thumbnail_url) && (
+                                                                <img
+                                                                    src={publications.find(pub => pub.thumbnail_url).thumbnail_url}
+                                                                    alt=""
+                                                                    loading="lazy"
+                                                                    className="rounded d-block mt-1"
+                                                                    style={{ width: 48, height: 48, objectFit: 'cover' }}
+                                                                />
+                                                            )}
+                                                            <button
+                                                                className="btn btn-sm btn-link p-0 d-block"
+                                                                onClick={() => toggleDetails(post.id)}
+                                                            >
+                                                                Ocultar
+                                                            </button>
+                                                        </>
+                                                    ) : (
+                                                        <button
+                                                            className="btn btn-sm btn-link p-0"
+                                                            onClick={() => toggleDetails(post.id)}
                                                         >
-                                                            {platformIcons[pub.plataforma]}
-                                                        </span>
-                                                    ))}
+                                                            Ver {post.total_publicaciones}
+                                                        </button>
+                                                    )}
                                                 </td>
                                                 <td>
                                                     <div className="d-flex gap-1 flex-wrap">
@@ -332,6 +458,17 @@ const Dashboard = () => {
                                                             </span>
                                                         )}
                                                     </div>
+                                                    <small className="text-muted d-block">
+                                                        {stats.published}/{post.total_publicaciones} publicadas
+                                                        {post.ultima_publicacion && (
+                                                            <> · {new Date(post.ultima_publicacion).toLocaleDateString('es-ES')}</>
+                                                        )}
+                                                    </small>
+                                                    {post.ultimo_error_plataforma && (
+                                                        <small className="text-danger d-block">
+                                                            Último error: {platformIcons[post.ultimo_error_plataforma]} {post.ultimo_error_plataforma}
+                                                        </small>
+                                                    )}
                                                 </td>
                                                 <td>
                                                     <button
@@ -350,6 +487,17 @@ const Dashboard = () => {
                         </div>
                     )}
                 </div>
+                {nextPage && (
+                    <div className="card-footer text-center">
+                        <button
+                            className="btn btn-outline-primary btn-sm"
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                        >
+                            {loadingMore ? 'Cargando...' : 'Cargar más'}
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
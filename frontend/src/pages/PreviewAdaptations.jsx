@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import CharacterCounter from '../components/CharacterCounter';
@@ -6,6 +6,15 @@ import config from '../config';
 
 const API_BASE_URL = config.API_BASE_URL;
 
+// Estado de la Publicación (eventos SSE) -> estado de la tarjeta
+const STATUS_BY_ESTADO = {
+    queued: 'publishing',
+    publishing: 'publishing',
+    published: 'success',
+    failed: 'error',
+    manual: 'manual'
+};
+
 const PreviewAdaptations = () => {
     const navigate = useNavigate();
     const [adaptations, setAdaptations] = useState(null);
@@ -16,6 +25,8 @@ const PreviewAdaptations = () => {
     const [publishingStatus, setPublishingStatus] = useState({});
     const [whatsappNumber, setWhatsappNumber] = useState('');
     const [includeImage, setIncludeImage] = useState({}); // Nuevo estado para checkbox de imagen
+    const [publishErrors, setPublishErrors] = useState({});
+    const singlePublishes = useRef(new Set()); // Plataformas publicadas una a una (avisan con alert)
 
     // Límites de caracteres por plataforma
     const characterLimits = {
@@ -93,6 +104,32 @@ const PreviewAdaptations = () => {
         setIncludeImage(initialIncludeImage);
     }, [navigate]);
 
+    // Los workers publican en segundo plano; el resultado llega por el stream de eventos
+    useEffect(() => {
+        if (!adaptations?.post_id) return;
+        const source = new EventSource(`${API_BASE_URL}/eventos/publicaciones/?post=${adaptations.post_id}`);
+        source.addEventListener('estado', (e) => {
+            const evento = JSON.parse(e.data);
+            const platform = evento.plataforma;
+            const newStatus = STATUS_BY_ESTADO[evento.estado];
+            if (!newStatus) return;
+            setPublishingStatus(prev => ({ ...prev, [platform]: newStatus }));
+            if (evento.error) {
+                setPublishErrors(prev => ({ ...prev, [platform]: evento.error }));
+            }
+
+            if (newStatus !== 'publishing' && singlePublishes.current.has(platform)) {
+                singlePublishes.current.delete(platform);
+                if (newStatus === 'success') {
+                    alert(`Publicado exitosamente en ${platform}! ID: ${evento.api_id}`);
+                } else if (newStatus === 'error') {
+                    alert(`Error al publicar en ${platform}: ${evento.error}`);
+                }
+            }
+        });
+        return () => source.close();
+    }, [adaptations?.post_id]);
+
     const handleContentEdit = (platform, value) => {
         setEditedContent(prev => ({ ...prev, [platform]: value }));
     };
@@ -166,14 +203,16 @@ const PreviewAdaptations = () => {
 
             const data = await response.json();
 
-            if (response.ok) {
-                setPublishingStatus(prev => ({ ...prev, [platform]: 'success' }));
-                alert(`Publicado exitosamente en ${platform}! ID: ${data.id}`);
-            } else {
+            if (!response.ok) {
                 setPublishingStatus(prev => ({ ...prev, [platform]: 'error' }));
                 alert(`Error al publicar en ${platform}: ${data.error}`);
+                return;
             }
 
+            // El backend encola la publicación (202) y un worker la procesa;
+            // el resultado llega por el stream de eventos (ver useEffect)
+            singlePublishes.current.add(platform);
+
         } catch (error) {
             console.error(`Error publicando en ${platform}:`, error);
             setPublishingStatus(prev => ({ ...prev, [platform]: 'error' }));
@@ -181,13 +220,53 @@ const PreviewAdaptations = () => {
         }
     };
 
-    const handlePublishAll = () => {
-        Object.keys(editedContent).forEach(platform => {
-            if (selectedPlatforms[platform] && !publishingStatus[platform]) {
-                const publicationId = adaptations.adaptaciones[platform].id;
-                handlePublish(platform, publicationId);
+    const handlePublishAll = async () => {
+        const platforms = Object.keys(editedContent).filter(
+            platform => selectedPlatforms[platform] && !publishingStatus[platform]
+        );
+        if (platforms.length === 0) return;
+
+        // Opciones por plataforma: el backend publica todas en paralelo en una sola llamada
+        const opciones = {};
+        platforms.forEach(platform => {
+            const adaptation = adaptations.adaptaciones[platform];
+            if (platform === 'instagram' || (platform === 'facebook' && includeImage[platform])) {
+                opciones[platform] = { image_url: adaptation.generated_image_url };
+            }
+            if (platform === 'tiktok') {
+                opciones[platform] = { video_url: adaptation.generated_video_url };
+            }
+            if (platform === 'whatsapp') {
+                opciones[platform] = { whatsapp_number: whatsappNumber };
             }
         });
+
+        platforms.forEach(platform => {
+            setPublishingStatus(prev => ({ ...prev, [platform]: 'publishing' }));
+        });
+
+        try {
+            const response = await fetch(`${API_BASE_URL}/posts/${adaptations.post_id}/publicar-todo/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                // En segundo plano: responde al encolar y el progreso llega por el stream de eventos
+                body: JSON.stringify({ plataformas: platforms, opciones, en_segundo_plano: true })
+            });
+            const data = await response.json();
+
+            Object.entries(data.errores || {}).forEach(([platform, error]) => {
+                setPublishingStatus(prev => ({ ...prev, [platform]: 'error' }));
+                setPublishErrors(prev => ({ ...prev, [platform]: error }));
+            });
+        } catch (error) {
+            console.error('Error publicando en todas las plataformas:', error);
+            platforms.forEach(platform => {
+                setPublishingStatus(prev => ({ ...prev, [platform]: 'error' }));
+            });
+            alert('Error de red al publicar en todas las plataformas');
+        }
     };
 
     const getStatusBadge = (platform) => {
@@ -196,7 +275,7 @@ const PreviewAdaptations = () => {
         if (status === 'publishing') return <span className="badge bg-warning">⏳ Publicando...</span>;
         if (status === 'success') return <span className="badge bg-success">✅ Publicado</span>;
         if (status === 'manual') return <span className="badge bg-info">📋 Manual</span>;
-        if (status === 'error') return <span className="badge bg-danger">❌ Error</span>;
+        if (status === 'error') return <span className="badge bg-danger" title={publishErrors[platform] || ''}>❌ Error</span>;
     };
 
     if (!adaptations) {